@@ -0,0 +1,222 @@
+"""Batch RCA - run each agent stage across many CI jobs at once."""
+from agents import classifier, fix_suggester, fused_parser, log_parser
+from agents.graph import RCA_MODES, cacheable, finalize_rca, initial_rca_state, stage_summary
+from agents.memo import llm_memo
+from agents.telemetry import empty_usage, llm_config
+from core.config import settings
+from core.cache import rca_cache
+from core.logs import failure_id_var, get_logger
+from core.events import event_bus
+from core.metrics import rca_node_errors, rca_node_seconds
+from typing import List, Optional
+import asyncio
+import time
+
+logger = get_logger("agents.batch")
+
+# Node name -> (fast path, chain factory, state -> chain inputs, response -> state update)
+# Nodes not listed here make no LLM call and simply run once per job.
+BATCHED_AGENTS = {
+    "log_parser": (
+        log_parser.signature_update,
+        log_parser.parser_chain,
+        log_parser.parser_inputs,
+        log_parser.parser_update
+    ),
+    "fused_parser": (
+        fused_parser.signature_update,
+        fused_parser.fused_chain,
+        fused_parser.fused_inputs,
+        fused_parser.fused_update
+    ),
+    "classifier": (
+        None,
+        classifier.classifier_chain,
+        classifier.classifier_inputs,
+        classifier.classifier_update
+    ),
+    "fix_suggester": (
+        None,
+        fix_suggester.fix_chain,
+        fix_suggester.fix_inputs,
+        fix_suggester.fix_update
+    ),
+}
+
+# Node name -> (state -> memo key inputs, prompt) for agents whose responses are memoized
+MEMOIZED_AGENTS = {
+    "classifier": (classifier.classifier_inputs, classifier.CLASSIFIER_PROMPT),
+    "fix_suggester": (fix_suggester.fix_memo_inputs, fix_suggester.FIX_PROMPT),
+}
+
+def dag_levels(nodes: dict) -> List[List[str]]:
+    """Group DAG nodes into levels; every node only depends on earlier levels."""
+    level = {}
+    def depth(name):
+        if name not in level:
+            level[name] = 1 + max((depth(dep) for dep in nodes[name][1]), default=-1)
+        return level[name]
+    for name in nodes:
+        depth(name)
+    return [
+        [name for name in nodes if level[name] == n]
+        for n in range(max(level.values()) + 1)
+    ]
+
+async def in_job_context(failure_id: Optional[str], coro):
+    """Await a job's coroutine with its failure_id on every log line (gather runs it in its own context)."""
+    failure_id_var.set(failure_id)
+    return await coro
+
+def call_for_job(failure_id: Optional[str], fn, *args):
+    token = failure_id_var.set(failure_id)
+    try:
+        return fn(*args)
+    finally:
+        failure_id_var.reset(token)
+
+async def run_batched_node(
+    name: str,
+    agent,
+    states: List[dict],
+    errors: List[Optional[str]],
+    max_concurrency: int,
+    failure_ids: Optional[List[Optional[str]]] = None
+):
+    """Run one node for every job that has not failed yet."""
+    failure_ids = failure_ids or [None] * len(states)
+    active = [i for i, state in enumerate(states) if errors[i] is None]
+    usages = {i: empty_usage() for i in active}
+    started = time.time()
+    
+    if name not in BATCHED_AGENTS:
+        updates = await asyncio.gather(
+            *(in_job_context(failure_ids[i], agent(states[i])) for i in active), return_exceptions=True
+        )
+    else:
+        fast_path, make_chain, make_inputs, make_update = BATCHED_AGENTS[name]
+        updates = [call_for_job(failure_ids[i], fast_path, states[i]) if fast_path else None for i in active]
+        pending = [n for n, update in enumerate(updates) if update is None]
+        
+        # Memoized responses answer repeated prompt inputs without an LLM call
+        memo_keys = {}
+        if name in MEMOIZED_AGENTS:
+            make_key, prompt = MEMOIZED_AGENTS[name]
+            memo_keys = {n: make_key(states[active[n]]) for n in pending}
+            memoized = await asyncio.gather(*(llm_memo.get(name, memo_keys[n], prompt) for n in pending))
+            for n, response in zip(list(pending), memoized):
+                if response is not None:
+                    updates[n] = call_for_job(failure_ids[active[n]], make_update, response)
+                    pending.remove(n)
+        
+        logger.info("Batch stage %s: %d LLM calls, %d answered without one", name, len(pending), len(active) - len(pending),
+                    extra={"node": name, "llm_calls": len(pending)})
+        # One config per job, so each job's LLM usage is attributed to it
+        responses = await make_chain().abatch(
+            [make_inputs(states[active[n]]) for n in pending],
+            config=[
+                {**llm_config(name, usages[active[n]]), "max_concurrency": max_concurrency}
+                for n in pending
+            ],
+            return_exceptions=True
+        ) if pending else []
+        
+        for n, response in zip(pending, responses):
+            try:
+                updates[n] = (
+                    response if isinstance(response, Exception)
+                    else call_for_job(failure_ids[active[n]], make_update, response)
+                )
+            except Exception as e:
+                updates[n] = e
+            if n in memo_keys and not isinstance(updates[n], Exception):
+                await llm_memo.put(name, memo_keys[n], response, prompt)
+    
+    finished = time.time()
+    for i, update in zip(active, updates):
+        if isinstance(update, Exception):
+            rca_node_errors.labels(node=name).inc()
+            errors[i] = f"{name}: {update}"
+            continue
+        states[i].update(update)
+        states[i]["node_timings"][name] = {"start": started, "end": finished, **usages[i]}
+        # Each job waited for the whole stage, as its node timing records
+        rca_node_seconds.labels(node=name).observe(finished - started)
+        event_bus.publish(failure_ids[i], "stage", {
+            "node": name,
+            "duration_ms": int((finished - started) * 1000),
+            **stage_summary(update)
+        })
+    
+    return {"jobs": len(active), "duration_ms": int((finished - started) * 1000)}
+
+async def run_rca_batch(
+    items: List[dict],
+    mode: Optional[str] = None,
+    max_concurrency: Optional[int] = None,
+    failure_ids: Optional[List[str]] = None
+) -> dict:
+    """Analyse many jobs, one stage at a time across the whole batch.
+    
+    `items` hold run_rca_analysis() arguments. Returns {"results", "timing"};
+    each result is an RCA result dict or {"error": ...} for that job. Logs
+    written for a job carry its entry of `failure_ids`.
+    """
+    mode = mode or settings.rca_mode
+    max_concurrency = max_concurrency or settings.rca_batch_max_concurrency
+    nodes = RCA_MODES[mode]
+    
+    start_time = time.time()
+    states = [initial_rca_state(**item) for item in items]
+    errors: List[Optional[str]] = [None] * len(states)
+    
+    # Answer repeat failures from the cache; only misses go through the agents
+    cached = await asyncio.gather(*(rca_cache.get(state["log_fingerprint"], mode) for state in states))
+    misses = []
+    for i, hit in enumerate(cached):
+        if hit:
+            states[i].update(hit, cache_hit=True)
+        else:
+            misses.append(i)
+    
+    logger.info("Starting batch RCA: %d to analyse, %d cached", len(misses), len(states) - len(misses),
+                extra={"jobs": len(states), "cache_hits": len(states) - len(misses)})
+    
+    stage_timings = {}
+    miss_states = [states[i] for i in misses]
+    miss_errors = [None] * len(misses)
+    miss_ids = [failure_ids[i] for i in misses] if failure_ids else None
+    for level in dag_levels(nodes):
+        timings = await asyncio.gather(*(
+            run_batched_node(name, nodes[name][0], miss_states, miss_errors, max_concurrency, miss_ids)
+            for name in level
+        ))
+        stage_timings.update(zip(level, timings))
+    
+    for i, error in zip(misses, miss_errors):
+        errors[i] = error
+    
+    results = []
+    missed = set(misses)
+    for i, state in enumerate(states):
+        if errors[i]:
+            results.append({"error": errors[i]})
+            continue
+        if i in missed and cacheable(state):
+            await rca_cache.put(state["log_fingerprint"], state, mode)
+        results.append(finalize_rca(state, mode, start_time))
+    
+    total_ms = int((time.time() - start_time) * 1000)
+    logger.info("Batch RCA complete: %d jobs in %dms", len(states), total_ms,
+                extra={"jobs": len(states), "total_ms": total_ms})
+    
+    return {
+        "results": results,
+        "timing": {
+            "total_ms": total_ms,
+            "jobs": len(states),
+            "cache_hits": len(states) - len(misses),
+            "failed": sum(1 for error in errors if error),
+            "stages": stage_timings
+        }
+    }
@@ -1,28 +1,24 @@
 """Agent 2: Failure Classifier - Categorize CI failures."""
-from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from core.config import settings
-import json
-import re
+from agents.llm import get_llm
+from agents.memo import llm_memo
+from agents.telemetry import llm_config, parse_json_response
+from core.logs import get_logger
 
-llm = AzureChatOpenAI(
-    azure_endpoint=settings.azure_openai_endpoint,
-    azure_deployment=settings.azure_openai_deployment,
-    api_key=settings.azure_openai_api_key,
-    api_version=settings.azure_openai_api_version,
-    temperature=0.0
-)
+logger = get_logger("agents.classifier")
 
-CLASSIFIER_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", """You are a CI/CD failure classification expert for UBS DevCloud.
-
-Classify failures into ONE of these categories:
-1. Infrastructure - Runner issues, OOM, Docker pull failed, network timeout
+CATEGORY_GUIDE = """1. Infrastructure - Runner issues, OOM, Docker pull failed, network timeout
 2. Auth - Vault failures, token expired, namespace mismatch, permission denied
 3. Dependency - Nexus errors, npm/maven failures, artifact not found
 4. Test - JUnit failures, E2E timeout, assertion errors
 5. Misconfiguration - terraform fmt, YAML errors, missing env vars
-6. Runner - Runner timeout, no available runners
+6. Runner - Runner timeout, no available runners"""
+
+CLASSIFIER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a CI/CD failure classification expert for UBS DevCloud.
+
+Classify failures into ONE of these categories:
+""" + CATEGORY_GUIDE + """
 
 Return ONLY valid JSON:
 {{
@@ -38,45 +34,42 @@ Job: {job_name} | Stage: {stage}
 Classify this failure:""")
 ])
 
-def parse_json_response(text: str) -> dict:
-    """Extract JSON from response."""
-    text = text.strip()
-    text = re.sub(r'^```json\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^```\s*$', '', text, flags=re.MULTILINE)
-    text = text.strip()
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-        if match:
-            return json.loads(match.group())
-        return {
-            "category": "Misconfiguration",
-            "confidence": 0.5,
-            "reasoning": "Failed to classify"
-        }
+CLASSIFY_FALLBACK = {
+    "category": "Misconfiguration",
+    "confidence": 0.5,
+    "reasoning": "Failed to classify"
+}
 
-async def classifier_agent(state: dict) -> dict:
-    """Classify the failure type."""
-    print("\n[Agent 2: Classifier] Starting...")
-    
+def classifier_chain():
+    return CLASSIFIER_PROMPT | get_llm()
+
+def classifier_inputs(state: dict) -> dict:
     parsed = state["parsed_errors"]
-    
-    chain = CLASSIFIER_PROMPT | llm
-    response = await chain.ainvoke({
+    return {
         "error_type": parsed["error_type"],
         "keywords": ", ".join(parsed["keywords"]),
         "failing_tool": parsed["failing_tool"],
         "job_name": state["job_name"],
         "stage": state["stage"]
-    })
-    
-    result = parse_json_response(response.content)
+    }
+
+def classifier_update(response) -> dict:
+    """Turn the LLM response into state updates."""
+    result = parse_json_response(response.content, "classifier", CLASSIFY_FALLBACK)
     
-    print(f"[Agent 2] Category: {result['category']} ({result['confidence']:.0%})")
-    print(f"[Agent 2] Reasoning: {result['reasoning']}")
+    logger.info("Category: %s (%.0f%%)", result["category"], result["confidence"] * 100,
+                extra={"agent": "classifier", "category": result["category"], "reasoning": result["reasoning"]})
     
     return {
         "failure_category": result["category"],
         "category_confidence": result["confidence"]
     }
+
+async def classifier_agent(state: dict) -> dict:
+    """Classify the failure type."""
+    logger.debug("Classifier starting")
+    
+    response = await llm_memo.ainvoke(
+        "classifier", classifier_chain(), classifier_inputs(state), llm_config("classifier"), prompt=CLASSIFIER_PROMPT
+    )
+    return classifier_update(response)
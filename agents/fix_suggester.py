@@ -1,18 +1,13 @@
 """Agent 3: Fix Suggester - Suggest fixes using RAG."""
-from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from agents.llm import get_llm
+from agents.memo import llm_memo
+from agents.telemetry import llm_config, parse_json_response
 from core.config import settings
-from rag.knowledge_base import KNOWLEDGE_BASE
-import json
-import re
+from core.events import event_bus
+from core.logs import failure_id_var, get_logger
 
-llm = AzureChatOpenAI(
-    azure_endpoint=settings.azure_openai_endpoint,
-    azure_deployment=settings.azure_openai_deployment,
-    api_key=settings.azure_openai_api_key,
-    api_version=settings.azure_openai_api_version,
-    temperature=0.0
-)
+logger = get_logger("agents.fix_suggester")
 
 FIX_PROMPT = ChatPromptTemplate.from_messages([
     ("system", """You are a CI/CD troubleshooting expert for UBS DevCloud.
@@ -37,26 +32,6 @@ Similar past failures:
 What is the fix?""")
 ])
 
-def find_similar_cases(error_type: str, category: str, keywords: list) -> list:
-    """Simple similarity search in knowledge base."""
-    matches = []
-    
-    # Exact category match
-    for kb_item in KNOWLEDGE_BASE:
-        if kb_item["category"] == category:
-            matches.append(kb_item)
-    
-    # If no category matches, try keyword overlap
-    if not matches:
-        for kb_item in KNOWLEDGE_BASE:
-            kb_keywords = kb_item["description"].lower().split()
-            overlap = sum(1 for kw in keywords if kw.lower() in kb_keywords)
-            if overlap > 0:
-                matches.append(kb_item)
-    
-    # Return top 3
-    return matches[:3]
-
 def format_similar_cases(cases: list) -> str:
     """Format cases for prompt."""
     if not cases:
@@ -69,52 +44,60 @@ def format_similar_cases(cases: list) -> str:
         output.append(f"   Commands: {', '.join(case['commands'][:2])}")
     return "\n".join(output)
 
-def parse_json_response(text: str) -> dict:
-    """Extract JSON from response."""
-    text = text.strip()
-    text = re.sub(r'^```json\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^```\s*$', '', text, flags=re.MULTILINE)
-    text = text.strip()
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-        if match:
-            return json.loads(match.group())
-        return {
-            "suggested_fix": "Unable to determine fix. Check logs manually.",
-            "commands": ["Review logs", "Search DevCloud community"],
-            "confidence": 0.3
-        }
+FIX_FALLBACK = {
+    "suggested_fix": "Unable to determine fix. Check logs manually.",
+    "commands": ["Review logs", "Search DevCloud community"],
+    "confidence": 0.3
+}
 
-async def fix_suggester_agent(state: dict) -> dict:
-    """Suggest fixes based on classification and RAG."""
-    print("\n[Agent 3: Fix Suggester] Starting...")
-    
-    parsed = state["parsed_errors"]
-    category = state["failure_category"]
-    keywords = state["error_keywords"]
-    
-    # RAG: Find similar cases
-    similar = find_similar_cases(parsed["error_type"], category, keywords)
-    similar_text = format_similar_cases(similar)
-    
-    print(f"[Agent 3] Found {len(similar)} similar cases")
-    
-    chain = FIX_PROMPT | llm
-    response = await chain.ainvoke({
-        "error_type": parsed["error_type"],
-        "category": category,
-        "keywords": ", ".join(keywords),
-        "similar_cases": similar_text
-    })
-    
-    result = parse_json_response(response.content)
+def fix_chain():
+    return FIX_PROMPT | get_llm()
+
+def fix_inputs(state: dict) -> dict:
+    # RAG: similar cases were retrieved by the similar_finder node
+    similar = state["similar_cases"]
+    return {
+        "error_type": state["parsed_errors"]["error_type"],
+        "category": state["failure_category"],
+        "keywords": ", ".join(state["error_keywords"]),
+        "similar_cases": format_similar_cases(similar)
+    }
+
+def fix_memo_inputs(state: dict) -> dict:
+    """Memo key inputs: fix_inputs() without the similar cases' seen counts, which grow every run."""
+    return {
+        **fix_inputs(state),
+        "similar_cases": [
+            [case["error_type"], case["fix"], case["commands"][:2]]
+            for case in state["similar_cases"]
+        ]
+    }
+
+def fix_update(response) -> dict:
+    """Turn the LLM response into state updates."""
+    result = parse_json_response(response.content, "fix_suggester", FIX_FALLBACK)
     
-    print(f"[Agent 3] Fix confidence: {result['confidence']:.0%}")
-    print(f"[Agent 3] Suggested: {result['suggested_fix'][:80]}...")
+    logger.info("Fix confidence: %.0f%%", result["confidence"] * 100,
+                extra={"agent": "fix_suggester", "suggested_fix": result["suggested_fix"][:200]})
     
     return {
         "suggested_fix": result["suggested_fix"],
         "fix_commands": result["commands"]
     }
+
+async def fix_suggester_agent(state: dict) -> dict:
+    """Suggest fixes based on classification and RAG."""
+    logger.debug("Fix suggester starting")
+    
+    # Stream tokens to this failure's event stream. Every chunk is published,
+    # not only while someone listens: the bus keeps them for late subscribers
+    failure_id = failure_id_var.get()
+    on_token = None
+    if failure_id and settings.events_stream_tokens:
+        on_token = lambda text: event_bus.publish(failure_id, "token", {"node": "fix_suggester", "text": text})
+    
+    response = await llm_memo.ainvoke(
+        "fix_suggester", fix_chain(), fix_inputs(state), llm_config("fix_suggester"),
+        key_inputs=fix_memo_inputs(state), prompt=FIX_PROMPT, on_token=on_token
+    )
+    return fix_update(response)
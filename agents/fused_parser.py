@@ -0,0 +1,99 @@
+"""Agent 1+2 (fused mode): Parse and classify a CI log in a single LLM call."""
+from langchain_core.prompts import ChatPromptTemplate
+from core.config import settings
+from agents.llm import get_llm
+from agents.classifier import CATEGORY_GUIDE, CLASSIFY_FALLBACK
+from agents.log_parser import PARSE_FALLBACK
+from agents.telemetry import llm_config, parse_json_response
+from core.logs import get_logger
+from core.log_extract import extract_error_regions
+from rag.knowledge_base import category_for
+from rag.signatures import signature_engine
+from typing import Optional
+
+logger = get_logger("agents.fused_parser")
+
+FUSED_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert CI/CD log analyzer and failure classifier for UBS DevCloud (GitLab).
+Extract the PRIMARY error from the CI job log and classify it into ONE of these categories:
+""" + CATEGORY_GUIDE + """
+
+Return ONLY valid JSON, no markdown:
+{{
+  "error_type": "descriptive name like TerraformFormatError or VaultAuthFailure",
+  "keywords": ["key", "terms", "from", "error"],
+  "failing_tool": "tool/service that failed (terraform, vault, nexus, etc)",
+  "error_message": "the actual error message from logs",
+  "category": "one of the 6 categories above",
+  "confidence": 0.85,
+  "reasoning": "why this category"
+}}
+
+Focus on the FIRST meaningful error. Ignore warnings and info messages."""),
+    ("user", "Job: {job_name} | Stage: {stage} | Status: {job_status}\n\nLog excerpt (error regions, skipped lines marked):\n{log_snippet}")
+])
+
+FUSED_FALLBACK = {**PARSE_FALLBACK, **CLASSIFY_FALLBACK}
+
+def signature_update(state: dict) -> Optional[dict]:
+    """Fast path: a known signature already implies its knowledge-base category."""
+    if not settings.signature_fast_path:
+        return None
+    parsed = signature_engine.match(state["raw_log"])
+    category = parsed and category_for(parsed["error_type"])
+    # A match without a category still goes to the LLM, so it counts as a miss
+    signature_engine.record("fused_parser", bool(category))
+    if not category:
+        return None
+    logger.info("Signature match: %s -> %s", parsed["error_type"], category,
+                extra={"agent": "fused_parser", "error_type": parsed["error_type"], "category": category})
+    return {
+        "error_signatures": [parsed["error_type"]],
+        "error_keywords": parsed["keywords"],
+        "parsed_errors": parsed,
+        "failure_category": category,
+        "category_confidence": parsed["confidence"]
+    }
+
+def fused_chain():
+    return FUSED_PROMPT | get_llm().bind(response_format={"type": "json_object"})
+
+def fused_inputs(state: dict) -> dict:
+    return {
+        "job_name": state["job_name"],
+        "stage": state["stage"],
+        "job_status": state["job_status"],
+        "log_snippet": extract_error_regions(state["raw_log"])
+    }
+
+def fused_update(response) -> dict:
+    """Turn the LLM response into state updates."""
+    result = parse_json_response(response.content, "fused_parser", FUSED_FALLBACK)
+    parsed = {
+        "error_type": result["error_type"],
+        "keywords": result["keywords"],
+        "failing_tool": result["failing_tool"],
+        "error_message": result["error_message"]
+    }
+    
+    logger.info("Error type: %s, category: %s (%.0f%%)", parsed["error_type"], result["category"], result["confidence"] * 100,
+                extra={"agent": "fused_parser", "error_type": parsed["error_type"], "category": result["category"]})
+    
+    return {
+        "error_signatures": [parsed["error_type"]],
+        "error_keywords": parsed["keywords"],
+        "parsed_errors": parsed,
+        "failure_category": result["category"],
+        "category_confidence": result["confidence"]
+    }
+
+async def fused_parser_agent(state: dict) -> dict:
+    """Extract the error and assign its category with one structured-output call."""
+    logger.debug("Fused parser starting")
+    
+    update = signature_update(state)
+    if update:
+        return update
+    
+    response = await fused_chain().ainvoke(fused_inputs(state), config=llm_config("fused_parser"))
+    return fused_update(response)
@@ -1,36 +1,137 @@
 """LangGraph orchestrator - connects all agents."""
-from langgraph.graph import StateGraph, END
 from agents.state import AgentState
 from agents.log_parser import log_parser_agent
 from agents.classifier import classifier_agent
 from agents.fix_suggester import fix_suggester_agent
 from agents.similar_finder import similar_finder_agent
+from agents.fused_parser import fused_parser_agent
+from agents.telemetry import empty_usage, node_llm_usage
+from core.config import settings
+from core.cache import rca_cache
+from core.events import event_bus
+from core.fingerprint import log_fingerprint
+from core.logs import failure_id_var, get_logger
+from core.metrics import rca_analysis_seconds, rca_node_errors, rca_node_seconds
+from typing import Optional
+import threading
 import time
 
-def create_rca_graph():
-    """Create the RCA agent graph."""
+logger = get_logger("agents.graph")
+
+# Node name -> (agent, upstream nodes it waits for)
+RCA_NODES = {
+    "log_parser": (log_parser_agent, []),
+    "classifier": (classifier_agent, ["log_parser"]),
+    "similar_finder": (similar_finder_agent, ["log_parser"]),
+    "fix_suggester": (fix_suggester_agent, ["classifier", "similar_finder"]),
+}
+
+# Fused mode: one LLM call extracts the error and assigns its category
+FUSED_RCA_NODES = {
+    "fused_parser": (fused_parser_agent, []),
+    "similar_finder": (similar_finder_agent, ["fused_parser"]),
+    "fix_suggester": (fix_suggester_agent, ["similar_finder"]),
+}
+
+RCA_MODES = {
+    "chain": RCA_NODES,
+    "fused": FUSED_RCA_NODES,
+}
+
+def timed_node(name: str, agent):
+    """Wrap an agent so it records its start/end time and LLM usage in the state."""
+    async def node(state: dict) -> dict:
+        usage = empty_usage()
+        token = node_llm_usage.set(usage)
+        started = time.time()
+        try:
+            update = await agent(state)
+        except Exception:
+            rca_node_errors.labels(node=name).inc()
+            raise
+        finally:
+            node_llm_usage.reset(token)
+        finished = time.time()
+        rca_node_seconds.labels(node=name).observe(finished - started)
+        update["node_timings"] = {name: {"start": started, "end": finished, **usage}}
+        event_bus.publish(failure_id_var.get(), "stage", {
+            "node": name,
+            "duration_ms": int((finished - started) * 1000),
+            **stage_summary(update)
+        })
+        return update
+    return node
+
+# State fields sent with a node's stage event
+STAGE_EVENT_FIELDS = ["failure_category", "category_confidence", "error_keywords", "suggested_fix", "fix_commands"]
+
+def stage_summary(update: dict) -> dict:
+    """Client-facing part of a node's state update."""
+    summary = {field: update[field] for field in STAGE_EVENT_FIELDS if field in update}
+    if "parsed_errors" in update:
+        summary["error_type"] = update["parsed_errors"].get("error_type")
+    if "similar_cases" in update:
+        summary["similar_cases"] = [case["error_type"] for case in update["similar_cases"]]
+    return summary
+
+def create_rca_graph(nodes: dict = RCA_NODES):
+    """Create the RCA agent graph as a DAG.
+    
+    Nodes run as soon as all of their upstream nodes have finished, so the
+    classifier and similar_finder execute in parallel after log_parser.
+    """
+    
+    # Deferred: langgraph is only needed once a graph is compiled
+    from langgraph.graph import StateGraph, START, END
     
     workflow = StateGraph(AgentState)
     
     # Add nodes (agents)
-    workflow.add_node("log_parser", log_parser_agent)
-    workflow.add_node("classifier", classifier_agent)
-    workflow.add_node("fix_suggester", fix_suggester_agent)
-    workflow.add_node("similar_finder", similar_finder_agent)
+    for name, (agent, _) in nodes.items():
+        workflow.add_node(name, timed_node(name, agent))
     
     # Define edges (flow)
-    workflow.set_entry_point("log_parser")
-    workflow.add_edge("log_parser", "classifier")
-    workflow.add_edge("classifier", "fix_suggester")
-    workflow.add_edge("fix_suggester", "similar_finder")
-    workflow.add_edge("similar_finder", END)
+    downstream = {dep for _, deps in nodes.values() for dep in deps}
+    for name, (_, deps) in nodes.items():
+        if not deps:
+            workflow.add_edge(START, name)
+        elif len(deps) == 1:
+            workflow.add_edge(deps[0], name)
+        else:
+            workflow.add_edge(deps, name)  # Fan-in: wait for every dependency
+        if name not in downstream:
+            workflow.add_edge(name, END)
     
     return workflow.compile()
 
-# Create the graph
-rca_graph = create_rca_graph()
+def critical_path(timings: dict, nodes: dict = RCA_NODES) -> list:
+    """Chain of nodes that determined total latency (latest-finishing deps)."""
+    if not timings:
+        return []
+    current = max(timings, key=lambda name: timings[name]["end"])
+    path = [current]
+    while True:
+        deps = [dep for dep in nodes[current][1] if dep in timings]
+        if not deps:
+            return list(reversed(path))
+        current = max(deps, key=lambda name: timings[name]["end"])
+        path.append(current)
 
-async def run_rca_analysis(
+# Compiled graphs (one per mode), built on first use or by agents.llm.warm_up()
+rca_graphs = {}
+# Warm-up compiles in a worker thread while requests may already arrive
+_rca_graphs_lock = threading.Lock()
+
+def get_rca_graph(mode: str):
+    if mode not in RCA_MODES:
+        raise ValueError(f"Unknown RCA mode {mode!r} (expected one of {', '.join(RCA_MODES)})")
+    if mode not in rca_graphs:
+        with _rca_graphs_lock:
+            if mode not in rca_graphs:
+                rca_graphs[mode] = create_rca_graph(RCA_MODES[mode])
+    return rca_graphs[mode]
+
+def initial_rca_state(
     pipeline_id: str,
     project_name: str,
     job_name: str,
@@ -38,12 +139,8 @@ async def run_rca_analysis(
     raw_log: str,
     job_status: str
 ) -> dict:
-    """Run the complete RCA analysis pipeline."""
-    
-    start_time = time.time()
-    
-    # Initial state
-    initial_state = {
+    """Graph input state for one CI job."""
+    return {
         "pipeline_id": pipeline_id,
         "project_name": project_name,
         "job_name": job_name,
@@ -62,20 +159,35 @@ async def run_rca_analysis(
         "seen_count": 0,
         "final_rca": "",
         "total_confidence": 0.0,
-        "processing_time_ms": None
+        "processing_time_ms": None,
+        "log_fingerprint": log_fingerprint(raw_log),
+        "cache_hit": False,
+        "node_timings": {}
     }
-    
-    print("\n" + "="*60)
-    print("Starting RCA Analysis Pipeline")
-    print("="*60)
-    
-    # Run the graph
-    result = await rca_graph.ainvoke(initial_state)
+
+def finalize_rca(result: dict, mode: str, start_time: float) -> dict:
+    """Add timings, the critical path and the final RCA summary to a graph result."""
     
     # Calculate processing time
     processing_time = int((time.time() - start_time) * 1000)
     result["processing_time_ms"] = processing_time
     
+    # Per-node timings relative to the start of the run
+    timings = result["node_timings"]
+    result["critical_path"] = critical_path(timings, RCA_MODES[mode])
+    result["node_timings"] = {
+        name: {
+            "start_ms": int((t["start"] - start_time) * 1000),
+            "end_ms": int((t["end"] - start_time) * 1000),
+            "duration_ms": int((t["end"] - t["start"]) * 1000),
+            **{key: t[key] for key in empty_usage() if key in t}
+        }
+        for name, t in timings.items()
+    }
+    rca_analysis_seconds.labels(
+        mode=mode, cache="hit" if result.get("cache_hit") else "miss"
+    ).observe(processing_time / 1000)
+    
     # Create final RCA summary
     result["final_rca"] = f"""Root Cause Analysis Complete:
 
@@ -96,9 +208,54 @@ Similar Cases: Seen {result['seen_count']} times before in knowledge base
 """
     
     result["total_confidence"] = result.get("category_confidence", 0.5)
+    return result
+
+def cacheable(result: dict) -> bool:
+    """Unparseable logs are not worth replaying."""
+    return result["parsed_errors"].get("error_type") != "ParseError"
+
+async def run_rca_analysis(
+    pipeline_id: str,
+    project_name: str,
+    job_name: str,
+    stage: str,
+    raw_log: str,
+    job_status: str,
+    mode: Optional[str] = None
+) -> dict:
+    """Run the complete RCA analysis pipeline.
+    
+    `mode` selects the graph ("chain" or "fused"); defaults to RCA_MODE.
+    """
+    
+    mode = mode or settings.rca_mode
+    
+    start_time = time.time()
+    
+    # Initial state
+    initial_state = initial_rca_state(pipeline_id, project_name, job_name, stage, raw_log, job_status)
+    fingerprint = initial_state["log_fingerprint"]
+    
+    cached = await rca_cache.get(fingerprint, mode)
+    
+    if cached:
+        logger.info("RCA cache hit for fingerprint %s", fingerprint[:12], extra={"fingerprint": fingerprint})
+        result = {**initial_state, **cached, "cache_hit": True}
+    else:
+        logger.info("Starting RCA analysis", extra={"mode": mode, "job_name": job_name, "stage": stage})
+        
+        # Run the graph
+        result = await get_rca_graph(mode).ainvoke(initial_state)
+        
+        if cacheable(result):
+            await rca_cache.put(fingerprint, result, mode)
+    
+    result = finalize_rca(result, mode, start_time)
     
-    print("\n" + "="*60)
-    print(f"RCA Complete in {processing_time}ms")
-    print("="*60)
+    logger.info("RCA complete in %dms", result["processing_time_ms"], extra={
+        "processing_time_ms": result["processing_time_ms"],
+        "critical_path": result["critical_path"],
+        "cache_hit": result["cache_hit"]
+    })
     
     return result
@@ -0,0 +1,67 @@
+"""Shared Azure OpenAI client registry - one connection pool for every agent."""
+from core.config import settings
+from typing import Dict, Optional
+import httpx
+import threading
+
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_llms: Dict[tuple, object] = {}
+# warm_up() runs in a worker thread while requests may already create clients
+_lock = threading.RLock()
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+        keepalive_expiry=settings.llm_keepalive_seconds
+    )
+
+def http_clients():
+    """Pooled sync/async HTTP clients shared by every chat model."""
+    global _http_client, _http_async_client
+    with _lock:
+        if _http_async_client is None or _http_async_client.is_closed:
+            timeout = httpx.Timeout(settings.llm_timeout_seconds)
+            _http_client = httpx.Client(limits=_limits(), timeout=timeout)
+            _http_async_client = httpx.AsyncClient(limits=_limits(), timeout=timeout)
+        return _http_client, _http_async_client
+
+def get_llm(temperature: float = 0.0):
+    """Chat model for the configured deployment, created on first use."""
+    key = (settings.azure_openai_deployment, temperature)
+    if key in _llms:
+        return _llms[key]
+    # Deferred: langchain_openai pulls in the whole openai SDK
+    from langchain_openai import AzureChatOpenAI
+
+    with _lock:
+        if key not in _llms:
+            http_client, http_async_client = http_clients()
+            _llms[key] = AzureChatOpenAI(
+                azure_endpoint=settings.azure_openai_endpoint,
+                azure_deployment=settings.azure_openai_deployment,
+                api_key=settings.azure_openai_api_key,
+                api_version=settings.azure_openai_api_version,
+                temperature=temperature,
+                http_client=http_client,
+                http_async_client=http_async_client
+            )
+        return _llms[key]
+
+async def close_llm_clients():
+    """Close the shared connection pool (app shutdown)."""
+    global _http_client, _http_async_client
+    if _http_async_client is not None:
+        await _http_async_client.aclose()
+        _http_client.close()
+        _http_client = _http_async_client = None
+    _llms.clear()
+
+def warm_up():
+    """Create the chat model and compile every RCA graph ahead of the first request."""
+    from agents.graph import RCA_MODES, get_rca_graph
+
+    get_llm()
+    for mode in RCA_MODES:
+        get_rca_graph(mode)
@@ -1,18 +1,14 @@
 """Agent 1: Log Parser - Extract error signatures from CI logs."""
-from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from core.config import settings
-import json
-import re
+from agents.llm import get_llm
+from agents.telemetry import llm_config, parse_json_response
+from core.logs import get_logger
+from core.log_extract import extract_error_regions
+from rag.signatures import signature_engine
+from typing import Optional
 
-# Initialize Azure OpenAI
-llm = AzureChatOpenAI(
-    azure_endpoint=settings.azure_openai_endpoint,
-    azure_deployment=settings.azure_openai_deployment,
-    api_key=settings.azure_openai_api_key,
-    api_version=settings.azure_openai_api_version,
-    temperature=0.0
-)
+logger = get_logger("agents.log_parser")
 
 PARSER_PROMPT = ChatPromptTemplate.from_messages([
     ("system", """You are an expert CI/CD log analyzer for UBS DevCloud (GitLab).
@@ -27,57 +23,63 @@ JSON format:
 }}
 
 Focus on the FIRST meaningful error. Ignore warnings and info messages."""),
-    ("user", "Job: {job_name} | Stage: {stage} | Status: {job_status}\n\nLogs (last 2000 chars):\n{log_snippet}")
+    ("user", "Job: {job_name} | Stage: {stage} | Status: {job_status}\n\nLog excerpt (error regions, skipped lines marked):\n{log_snippet}")
 ])
 
-def extract_last_n_chars(log: str, n: int = 2000) -> str:
-    """Extract last N characters from log (where errors usually are)."""
-    if len(log) <= n:
-        return log
-    return "...\n" + log[-n:]
+PARSE_FALLBACK = {
+    "error_type": "ParseError",
+    "keywords": ["unknown"],
+    "failing_tool": "unknown",
+    "error_message": "Failed to parse error"
+}
 
-def parse_json_response(text: str) -> dict:
-    """Extract JSON from LLM response, handling markdown code blocks."""
-    text = text.strip()
-    # Remove markdown code blocks
-    text = re.sub(r'^```json\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^```\s*$', '', text, flags=re.MULTILINE)
-    text = text.strip()
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        # Fallback: try to find JSON object
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-        if match:
-            return json.loads(match.group())
-        return {
-            "error_type": "ParseError",
-            "keywords": ["unknown"],
-            "failing_tool": "unknown",
-            "error_message": "Failed to parse error"
-        }
+def signature_update(state: dict) -> Optional[dict]:
+    """Fast path: known signatures skip the LLM round-trip entirely."""
+    if not settings.signature_fast_path:
+        return None
+    result = signature_engine.match(state["raw_log"])
+    signature_engine.record("log_parser", result is not None)
+    if not result:
+        return None
+    logger.info("Signature match: %s (%.0f%%)", result["error_type"], result["confidence"] * 100,
+                extra={"agent": "log_parser", "error_type": result["error_type"]})
+    return {
+        "error_signatures": [result["error_type"]],
+        "error_keywords": result["keywords"],
+        "parsed_errors": result
+    }
 
-async def log_parser_agent(state: dict) -> dict:
-    """Parse CI logs and extract error signatures."""
-    print("\n[Agent 1: Log Parser] Starting...")
-    
-    log_snippet = extract_last_n_chars(state["raw_log"], 2000)
-    
-    chain = PARSER_PROMPT | llm
-    response = await chain.ainvoke({
+def parser_chain():
+    return PARSER_PROMPT | get_llm()
+
+def parser_inputs(state: dict) -> dict:
+    return {
         "job_name": state["job_name"],
         "stage": state["stage"],
         "job_status": state["job_status"],
-        "log_snippet": log_snippet
-    })
-    
-    result = parse_json_response(response.content)
+        "log_snippet": extract_error_regions(state["raw_log"])
+    }
+
+def parser_update(response) -> dict:
+    """Turn the LLM response into state updates."""
+    result = parse_json_response(response.content, "log_parser", PARSE_FALLBACK)
     
-    print(f"[Agent 1] Error Type: {result['error_type']}")
-    print(f"[Agent 1] Keywords: {result['keywords']}")
+    logger.info("Error type: %s", result["error_type"],
+                extra={"agent": "log_parser", "error_type": result["error_type"], "keywords": result["keywords"]})
     
     return {
         "error_signatures": [result["error_type"]],
         "error_keywords": result["keywords"],
         "parsed_errors": result
     }
+
+async def log_parser_agent(state: dict) -> dict:
+    """Parse CI logs and extract error signatures."""
+    logger.debug("Log parser starting")
+    
+    update = signature_update(state)
+    if update:
+        return update
+    
+    response = await parser_chain().ainvoke(parser_inputs(state), config=llm_config("log_parser"))
+    return parser_update(response)
@@ -0,0 +1,257 @@
+"""Per-agent memoization of LLM responses keyed by normalized prompt inputs.
+
+The classifier and fix suggester only see a few parser fields, which repeat far
+more often than whole logs do. Responses are kept in an in-process LRU and,
+with LLM_MEMO_PATH set, in an SQLite file shared across restarts.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from core.config import settings
+from core.metrics import llm_memo_lookups
+
+# Comma-separated prompt variables whose term order carries no meaning
+UNORDERED_FIELDS = {"keywords"}
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+# Stats counter -> llm_memo_lookups_total result label
+_LOOKUP_LABELS = {"memory_hits": "memory_hit", "disk_hits": "disk_hit", "misses": "miss"}
+# Expired rows are pruned from the SQLite tier every this many writes
+_PRUNE_EVERY = 256
+
+def normalize_inputs(inputs: dict) -> dict:
+    """Canonical form of prompt variables: collapsed whitespace, sorted unordered terms."""
+    normalized = {}
+    for name, value in inputs.items():
+        if isinstance(value, str):
+            value = " ".join(value.split())
+            if name in UNORDERED_FIELDS:
+                value = ", ".join(sorted({term.strip().lower() for term in value.split(",") if term.strip()}))
+        normalized[name] = value
+    return normalized
+
+def _message(content: str):
+    # Deferred: main imports this module and must not load langchain at startup
+    from langchain_core.messages import AIMessage
+    
+    return AIMessage(content=content)
+
+def holds_json(content) -> bool:
+    """True if the agents' parse_json_response() would find a JSON object (not its fallback)."""
+    if not isinstance(content, str):
+        return False
+    match = _JSON_OBJECT_RE.search(content)
+    try:
+        return match is not None and isinstance(json.loads(match.group()), dict)
+    except json.JSONDecodeError:
+        return False
+
+def prompt_version(prompt) -> str:
+    """Short digest of a ChatPromptTemplate's message templates (prompt edits change keys)."""
+    templates = [getattr(getattr(message, "prompt", None), "template", repr(message)) for message in prompt.messages]
+    return hashlib.sha256("\x1f".join(templates).encode("utf-8")).hexdigest()[:12]
+
+class LLMMemo:
+    """LRU with TTL in front of an optional SQLite table of LLM responses."""
+    
+    def __init__(self, max_entries: int, ttl_seconds: int, path: str = "", enabled: bool = True,
+                 disk_max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.enabled = enabled
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._versions: Dict[int, str] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+    
+    # ------------------------------------------------------------
+    # Keys and bookkeeping
+    # ------------------------------------------------------------
+    
+    def key(self, agent: str, inputs: dict, prompt=None) -> str:
+        """sha256 of the agent, deployment, prompt version and normalized inputs."""
+        version = ""
+        if prompt is not None:
+            if id(prompt) not in self._versions:
+                self._versions[id(prompt)] = prompt_version(prompt)
+            version = self._versions[id(prompt)]
+        canonical = json.dumps({
+            "agent": agent,
+            "deployment": settings.azure_openai_deployment,
+            "prompt": version,
+            "inputs": normalize_inputs(inputs),
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    
+    def _count(self, agent: str, result: str):
+        stats = self._stats.setdefault(agent, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0})
+        stats[result] += 1
+        if result in _LOOKUP_LABELS:
+            llm_memo_lookups.labels(agent=agent, result=_LOOKUP_LABELS[result]).inc()
+    
+    def _fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.ttl_seconds
+    
+    def _remember(self, key: str, agent: str, stored_at: float, content: str):
+        self._entries[key] = (agent, stored_at, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            _, (evicted_agent, _, _) = self._entries.popitem(last=False)
+            self._count(evicted_agent, "evictions")
+    
+    # ------------------------------------------------------------
+    # SQLite tier (blocking; called through asyncio.to_thread)
+    # ------------------------------------------------------------
+    
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_memo ("
+                "key TEXT PRIMARY KEY, agent TEXT NOT NULL, content TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_llm_memo_stored_at ON llm_memo (stored_at)")
+        return self._db
+    
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            return self._connection().execute(
+                "SELECT stored_at, content FROM llm_memo WHERE key = ?", (key,)
+            ).fetchone()
+    
+    def _disk_put(self, key: str, agent: str, stored_at: float, content: str):
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_memo (key, agent, content, stored_at) VALUES (?, ?, ?, ?)",
+                (key, agent, content, stored_at)
+            )
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                db.execute("DELETE FROM llm_memo WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+                db.execute(
+                    "DELETE FROM llm_memo WHERE stored_at < ("
+                    "SELECT stored_at FROM llm_memo ORDER BY stored_at DESC LIMIT 1 OFFSET ?)",
+                    (self.disk_max_entries - 1,)
+                )
+            db.commit()
+    
+    def _disk_clear(self, agent: Optional[str]):
+        with self._db_lock:
+            db = self._connection()
+            if agent is None:
+                db.execute("DELETE FROM llm_memo")
+            else:
+                db.execute("DELETE FROM llm_memo WHERE agent = ?", (agent,))
+            db.commit()
+    
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    
+    async def get(self, agent: str, inputs: dict, prompt=None):
+        """Memoized response for these prompt inputs, if any and still fresh."""
+        if not self.enabled:
+            return None
+        
+        key = self.key(agent, inputs, prompt)
+        entry = self._entries.get(key)
+        if entry:
+            _, stored_at, content = entry
+            if self._fresh(stored_at):
+                self._entries.move_to_end(key)
+                self._count(agent, "memory_hits")
+                return _message(content)
+            del self._entries[key]
+        
+        if self.path:
+            row = await asyncio.to_thread(self._disk_get, key)
+            if row and self._fresh(row[0]):
+                self._remember(key, agent, row[0], row[1])
+                self._count(agent, "disk_hits")
+                return _message(row[1])
+        
+        self._count(agent, "misses")
+        return None
+    
+    async def put(self, agent: str, inputs: dict, response, prompt=None):
+        """Remember a response; ones without a JSON object would only replay a parse fallback."""
+        content = getattr(response, "content", response)
+        if not self.enabled or not holds_json(content):
+            return
+        
+        key = self.key(agent, inputs, prompt)
+        stored_at = time.time()
+        self._remember(key, agent, stored_at, content)
+        if self.path:
+            await asyncio.to_thread(self._disk_put, key, agent, stored_at, content)
+    
+    async def ainvoke(self, agent: str, chain, inputs: dict, config: dict, key_inputs: Optional[dict] = None,
+                      prompt=None, on_token: Optional[Callable[[str], None]] = None):
+        """chain.ainvoke(inputs) unless a memoized response exists.
+        
+        `key_inputs` overrides what the key is built from (defaults to `inputs`).
+        With `on_token` the response is streamed and every chunk of text is
+        passed to it (a memoized response arrives as one chunk).
+        """
+        key_inputs = inputs if key_inputs is None else key_inputs
+        response = await self.get(agent, key_inputs, prompt)
+        if response is not None:
+            if on_token is not None:
+                on_token(response.content)
+            return response
+        
+        if on_token is None:
+            response = await chain.ainvoke(inputs, config=config)
+        else:
+            async for chunk in chain.astream(inputs, config=config):
+                response = chunk if response is None else response + chunk
+                if chunk.content:
+                    on_token(chunk.content)
+        await self.put(agent, key_inputs, response, prompt)
+        return response
+    
+    async def clear(self, agent: Optional[str] = None):
+        """Drop one agent's (or every) entry from both tiers."""
+        for key in [key for key, entry in self._entries.items() if agent is None or entry[0] == agent]:
+            del self._entries[key]
+        if self.path:
+            await asyncio.to_thread(self._disk_clear, agent)
+    
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+    
+    def stats(self) -> dict:
+        agents = {}
+        for agent, counts in self._stats.items():
+            hits = counts["memory_hits"] + counts["disk_hits"]
+            total = hits + counts["misses"]
+            agents[agent] = {**counts, "hit_ratio": hits / total if total else 0.0}
+        return {
+            "enabled": self.enabled,
+            "entries_in_memory": len(self._entries),
+            "disk_tier": bool(self.path),
+            "agents": agents,
+        }
+
+llm_memo = LLMMemo(
+    max_entries=settings.llm_memo_max_entries,
+    ttl_seconds=settings.llm_memo_ttl_seconds,
+    path=settings.llm_memo_path,
+    enabled=settings.llm_memo_enabled,
+    disk_max_entries=settings.llm_memo_disk_max_entries,
+)
@@ -1,30 +1,52 @@
 """Agent 4: Similar Case Finder - Find past similar failures."""
-from rag.knowledge_base import KNOWLEDGE_BASE
+from core.config import settings
+from core.logs import get_logger
+from rag.index import similarity_index
+
+logger = get_logger("agents.similar_finder")
+
+def find_similar_cases(error_type: str, keywords: list, k: int = 3) -> list:
+    """Top-k BM25 matches over the knowledge base and past failures.
+    
+    Results are collapsed per error type so repeats of one past failure do not
+    crowd out other candidates.
+    """
+    query = " ".join([error_type, error_type] + list(keywords))
+    matches = []
+    seen_types = set()
+    for hit in similarity_index.search(query, k=k * 5):
+        payload = hit["payload"]
+        if payload["error_type"] in seen_types:
+            continue
+        seen_types.add(payload["error_type"])
+        matches.append({
+            "error_type": payload["error_type"],
+            "category": payload["category"],
+            "seen_count": payload["seen_count"],
+            "fix": payload["fix"],
+            "commands": payload["commands"],
+            "source": payload.get("source", "kb"),
+            "score": round(hit["score"], 4)
+        })
+        if len(matches) == k:
+            break
+    return matches
 
 async def similar_finder_agent(state: dict) -> dict:
-    """Find similar past failures from knowledge base."""
-    print("\n[Agent 4: Similar Finder] Starting...")
+    """Find similar past failures from knowledge base and history."""
+    logger.debug("Similar finder starting")
     
-    category = state["failure_category"]
     error_type = state["parsed_errors"]["error_type"]
+    keywords = state["error_keywords"]
     
-    # Simple lookup in knowledge base
-    similar_cases = []
-    seen_count = 0
-    
-    for kb_item in KNOWLEDGE_BASE:
-        if kb_item["category"] == category or error_type.lower() in kb_item["error_type"].lower():
-            similar_cases.append({
-                "error_type": kb_item["error_type"],
-                "seen_count": kb_item["seen_count"],
-                "fix": kb_item["fix"]
-            })
-            seen_count += kb_item["seen_count"]
+    # Runs alongside the classifier, so only parser output is available here
+    similar_cases = find_similar_cases(error_type, keywords, k=settings.similarity_top_k)
+    seen_count = sum(case["seen_count"] for case in similar_cases)
     
-    print(f"[Agent 4] Found {len(similar_cases)} similar cases")
-    print(f"[Agent 4] Total occurrences: {seen_count}")
+    logger.info("Found %d similar cases (%d occurrences)", len(similar_cases), seen_count,
+                extra={"agent": "similar_finder", "similar_cases": len(similar_cases), "seen_count": seen_count})
     
     return {
-        "similar_cases": similar_cases[:3],  # Top 3
+        "similar_cases": similar_cases,
         "seen_count": seen_count
     }
@@ -1,5 +1,9 @@
 """LangGraph agent state definitions."""
-from typing import TypedDict, List, Dict, Optional
+from typing import TypedDict, List, Dict, Optional, Annotated
+
+def merge_timings(left: Dict, right: Dict) -> Dict:
+    """Reducer so parallel nodes can each report their own timing."""
+    return {**left, **right}
 
 class AgentState(TypedDict):
     """Shared state between all agents in the graph."""
@@ -25,11 +29,16 @@ class AgentState(TypedDict):
     suggested_fix: str
     fix_commands: List[str]
     
-    # Agent 4: Similar Finder Output
-    similar_cases: List[Dict[str, str]]
+    # Agent 4: Similar Finder Output (runs in parallel with the classifier)
+    similar_cases: List[Dict]
     seen_count: int
     
+    # Node name -> {"start", "end"} wall-clock timestamps
+    node_timings: Annotated[Dict[str, Dict[str, float]], merge_timings]
+    
     # Final Output
     final_rca: str
     total_confidence: float
     processing_time_ms: Optional[int]
+    log_fingerprint: str
+    cache_hit: bool
@@ -0,0 +1,102 @@
+"""LLM call instrumentation: latency, token usage and per-node usage totals."""
+from contextvars import ContextVar
+from typing import Dict, Optional
+import copy
+import json
+import re
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from core.metrics import llm_json_fallbacks, llm_request_seconds, llm_tokens
+
+# LLM usage of the graph node currently running (set by graph.timed_node)
+node_llm_usage: ContextVar[Optional[dict]] = ContextVar("node_llm_usage", default=None)
+
+def empty_usage() -> dict:
+    return {"llm_calls": 0, "llm_ms": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+def _token_usage(response) -> Dict[str, int]:
+    """Prompt/completion tokens from an LLMResult (OpenAI llm_output or message usage metadata)."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {"prompt": usage.get("prompt_tokens", 0), "completion": usage.get("completion_tokens", 0)}
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt += metadata.get("input_tokens", 0)
+            completion += metadata.get("output_tokens", 0)
+    return {"prompt": prompt, "completion": completion}
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Records every chat model call made by one agent.
+    
+    Totals are also added to `usage` (the running node's usage by default),
+    which ends up in CIFailure.agent_timings.
+    """
+    run_inline = True  # Cheap bookkeeping; no need for an executor hop
+    
+    def __init__(self, agent: str, usage: Optional[dict] = None):
+        self.agent = agent
+        self.usage = usage if usage is not None else node_llm_usage.get()
+        self._started: Dict[object, float] = {}
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+    
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+    
+    def _finish(self, run_id, status: str) -> float:
+        elapsed = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        llm_request_seconds.labels(agent=self.agent, status=status).observe(elapsed)
+        if self.usage is not None:
+            self.usage["llm_calls"] += 1
+            self.usage["llm_ms"] += int(elapsed * 1000)
+        return elapsed
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, "ok")
+        tokens = _token_usage(response)
+        llm_tokens.labels(agent=self.agent, type="prompt").inc(tokens["prompt"])
+        llm_tokens.labels(agent=self.agent, type="completion").inc(tokens["completion"])
+        if self.usage is not None:
+            self.usage["prompt_tokens"] += tokens["prompt"]
+            self.usage["completion_tokens"] += tokens["completion"]
+    
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+def llm_config(agent: str, usage: Optional[dict] = None) -> dict:
+    """Runnable config that instruments the LLM calls of an agent chain."""
+    return {
+        "callbacks": [LLMMetricsHandler(agent, usage)],
+        "metadata": {"agent": agent},
+        "run_name": agent
+    }
+
+def record_json_fallback(agent: str, kind: str):
+    """parse_json_response had to dig JSON out of text ("extracted") or give up ("default")."""
+    llm_json_fallbacks.labels(agent=agent, kind=kind).inc()
+
+def parse_json_response(text: str, agent: str, fallback: dict) -> dict:
+    """Extract JSON from an agent's LLM response, handling markdown code blocks.
+    
+    Returns a copy of `fallback` when the response holds no JSON object.
+    """
+    text = text.strip()
+    # Remove markdown code blocks
+    text = re.sub(r'^```json\s*', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^```\s*$', '', text, flags=re.MULTILINE)
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # Fallback: try to find JSON object
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        if match:
+            record_json_fallback(agent, "extracted")
+            return json.loads(match.group())
+        record_json_fallback(agent, "default")
+        return copy.deepcopy(fallback)
@@ -0,0 +1,337 @@
+"""Offline end-to-end throughput and latency benchmark.
+
+Drives run_rca_analysis, POST /api/analyze and POST /api/analyze-latest under
+concurrency against a fake chat model (configurable latency) and a local fake
+GitLab (configurable trace size), with a scratch database and log store.
+Prints a summary to stderr and a JSON report to stdout (or --json).
+
+    python -m benchmarks.e2e --requests 200 --concurrency 16 --llm-latency-ms 300 --trace-kb 512
+
+Report per scenario: operations, errors, throughput, latency p50/p95/p99 (ms)
+and DB rows written per second; plus the process peak RSS.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from benchmarks.fakes import FakeGitLab, install_fake_llm
+
+SCENARIOS = ["rca", "analyze", "analyze-latest"]
+
+
+def configure_environment(args, gitlab: FakeGitLab):
+    """Point the app at scratch storage and the fake GitLab (before core.config is imported)."""
+    scratch = tempfile.mkdtemp(prefix="rca-bench-")
+    os.environ.update({
+        "DATABASE_URL": "sqlite+aiosqlite:///" + os.path.join(scratch, "bench.db"),
+        "LOG_STORE_PATH": os.path.join(scratch, "log_store"),
+        "GITLAB_URL": gitlab.url,
+        "GITLAB_TOKEN": "benchmark",
+        "PROJECT_ID": "benchmark",
+        "AZURE_OPENAI_API_KEY": os.environ.get("AZURE_OPENAI_API_KEY") or "benchmark",
+        "AZURE_OPENAI_ENDPOINT": os.environ.get("AZURE_OPENAI_ENDPOINT") or "https://benchmark.invalid/",
+        "RCA_WORKERS": str(args.workers),
+        "RCA_QUEUE_MAX_PENDING": str(max(1000, args.requests * 2, args.pipelines * args.jobs_per_pipeline * 2)),
+        "RCA_QUEUE_POLL_SECONDS": "0.2",
+        "RCA_CACHE_ENABLED": "true" if args.with_cache else "false",
+        "LLM_MEMO_ENABLED": "true" if args.with_cache else "false",
+        "SIGNATURE_FAST_PATH": "true" if args.with_signatures else "false",
+        "LOG_LEVEL": args.log_level,
+    })
+    return scratch
+
+
+# Everything below imports the app, so it only runs after configure_environment()
+
+import asyncio
+import json
+import resource
+import statistics
+import time
+
+
+def percentiles(values_ms: list) -> dict:
+    if not values_ms:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    ordered = sorted(values_ms)
+
+    def rank(q):
+        return round(ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))], 1)
+
+    return {
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "mean": round(statistics.mean(ordered), 1),
+        "max": round(ordered[-1], 1),
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def count_failures() -> int:
+    from sqlalchemy import func, select
+    from db.database import async_session_maker
+    from db.models import CIFailure
+
+    async with async_session_maker() as session:
+        return await session.scalar(select(func.count(CIFailure.id)))
+
+
+async def wait_for_jobs(job_ids: list, timeout: float) -> dict:
+    """Poll until every job is done or failed; returns {job_id: (status, finished_at)}."""
+    from sqlalchemy import select
+    from db.database import async_session_maker
+    from db.models import RCAJob
+
+    deadline = time.time() + timeout
+    while True:
+        async with async_session_maker() as session:
+            rows = (await session.execute(
+                select(RCAJob.id, RCAJob.status, RCAJob.finished_at).where(RCAJob.id.in_(job_ids))
+            )).all()
+        finished = {row.id: (row.status, row.finished_at) for row in rows if row.status in ("done", "failed")}
+        if len(finished) == len(job_ids) or time.time() > deadline:
+            return finished
+        await asyncio.sleep(0.05)
+
+
+def scenario_report(name, operations, errors, started, finished, latencies_ms, rows_written, **extra) -> dict:
+    duration = max(finished - started, 1e-9)
+    report = {
+        "scenario": name,
+        "operations": operations,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_per_s": round((operations - errors) / duration, 2),
+        "latency_ms": percentiles(latencies_ms),
+        "db_rows_written": rows_written,
+        "db_write_rows_per_s": round(rows_written / duration, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    report.update(extra)
+    return report
+
+
+async def bounded(concurrency: int, calls):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(call):
+        async with semaphore:
+            return await call()
+
+    return await asyncio.gather(*(run(call) for call in calls), return_exceptions=True)
+
+
+# ============================================================
+# SCENARIOS
+# ============================================================
+
+async def bench_rca(args, samples, gitlab) -> dict:
+    """run_rca_analysis directly (graph + agents, no HTTP, no DB writes)."""
+    from agents.graph import run_rca_analysis
+
+    traces = [trace.decode("utf-8") for trace in gitlab.traces]
+    latencies = []
+
+    def call(n):
+        async def run():
+            sample = samples[n % len(samples)]
+            began = time.perf_counter()
+            await run_rca_analysis(
+                pipeline_id="benchmark", project_name="benchmark", job_name=sample["job_name"],
+                stage=sample["stage"], raw_log=traces[n % len(traces)], job_status="failed",
+                mode=args.mode
+            )
+            latencies.append((time.perf_counter() - began) * 1000)
+        return run
+
+    started = time.perf_counter()
+    results = await bounded(args.concurrency, [call(n) for n in range(args.requests)])
+    finished = time.perf_counter()
+    errors = sum(1 for result in results if isinstance(result, Exception))
+    return scenario_report("run_rca_analysis", args.requests, errors, started, finished, latencies, 0)
+
+
+async def bench_analyze(args, samples, gitlab, client) -> dict:
+    """POST /api/analyze; latency is submit -> job finished by the worker pool."""
+    traces = [trace.decode("utf-8") for trace in gitlab.traces]
+    submitted = {}
+    submit_latencies = []
+
+    def call(n):
+        async def run():
+            sample = samples[n % len(samples)]
+            began = time.time()
+            response = await client.post("/api/analyze", json={
+                "pipeline_id": f"bench-{n}", "project_name": "benchmark", "job_name": sample["job_name"],
+                "stage": sample["stage"], "raw_log": traces[n % len(traces)], "job_status": "failed",
+            })
+            submit_latencies.append((time.time() - began) * 1000)
+            response.raise_for_status()
+            submitted[response.json()["failure_id"]] = began
+        return run
+
+    rows_before = await count_failures()
+    started = time.time()
+    results = await bounded(args.concurrency, [call(n) for n in range(args.requests)])
+    finished_jobs = await wait_for_jobs(list(submitted), args.timeout)
+    finished = max([at for _, at in finished_jobs.values() if at] or [time.time()])
+    rows_written = await count_failures() - rows_before
+
+    latencies = [(finished_jobs[job_id][1] - began) * 1000 for job_id, began in submitted.items()
+                 if job_id in finished_jobs and finished_jobs[job_id][0] == "done"]
+    errors = (sum(1 for result in results if isinstance(result, Exception))
+              + sum(1 for status, _ in finished_jobs.values() if status == "failed")
+              + len(submitted) - len(finished_jobs))
+    return scenario_report(
+        "analyze", args.requests, errors, started, finished, latencies, rows_written,
+        submit_latency_ms=percentiles(submit_latencies)
+    )
+
+
+async def bench_analyze_latest(args, samples, gitlab, client) -> dict:
+    """POST /api/analyze-latest (GitLab fetch + trace download + enqueue), then wait for its jobs."""
+    job_started = {}
+    request_latencies = []
+    failures_queued = 0
+    analyses_queued = 0
+
+    def call(n):
+        async def run():
+            nonlocal failures_queued, analyses_queued
+            began = time.time()
+            response = await client.post("/api/analyze-latest")
+            request_latencies.append((time.time() - began) * 1000)
+            response.raise_for_status()
+            body = response.json()
+            if "error" in body:
+                raise RuntimeError(body["error"])
+            failures_queued += body["failures_queued"]
+            analyses_queued += body["analyses_queued"]
+            for result in body["results"]:
+                job_started[result["failure_id"]] = began
+        return run
+
+    rows_before = await count_failures()
+    requests_before = gitlab.requests
+    started = time.time()
+    results = await bounded(args.concurrency, [call(n) for n in range(args.pipelines)])
+    finished_jobs = await wait_for_jobs(list(job_started), args.timeout)
+    finished = max([at for _, at in finished_jobs.values() if at] or [time.time()])
+    rows_written = await count_failures() - rows_before
+
+    latencies = [(finished_jobs[job_id][1] - began) * 1000 for job_id, began in job_started.items()
+                 if job_id in finished_jobs and finished_jobs[job_id][0] == "done"]
+    errors = sum(1 for result in results if isinstance(result, Exception))
+    return scenario_report(
+        "analyze_latest", args.pipelines, errors, started, finished, latencies, rows_written,
+        request_latency_ms=percentiles(request_latencies),
+        failures_queued=failures_queued,
+        analyses_queued=analyses_queued,
+        failed_jobs=sum(1 for status, _ in finished_jobs.values() if status == "failed"),
+        gitlab_requests=gitlab.requests - requests_before,
+    )
+
+
+async def main(args, gitlab: FakeGitLab, scratch: str) -> dict:
+    import httpx
+    import main as app_module
+    from benchmarks.samples import load_samples
+
+    model = install_fake_llm(args.llm_latency_ms, args.llm_jitter_ms)
+    samples = load_samples()
+    scenarios = args.scenarios.split(",")
+
+    await app_module.startup()
+    reports = []
+    try:
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout) as client:
+            for scenario in scenarios:
+                print(f"Running {scenario}...", file=sys.stderr)
+                if scenario == "rca":
+                    reports.append(await bench_rca(args, samples, gitlab))
+                elif scenario == "analyze":
+                    reports.append(await bench_analyze(args, samples, gitlab, client))
+                elif scenario == "analyze-latest":
+                    reports.append(await bench_analyze_latest(args, samples, gitlab, client))
+    finally:
+        await app_module.shutdown()
+
+    return {
+        "config": {
+            "requests": args.requests,
+            "pipelines": args.pipelines,
+            "jobs_per_pipeline": args.jobs_per_pipeline,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "mode": args.mode,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "trace_kb": args.trace_kb,
+            "cache": args.with_cache,
+            "signature_fast_path": args.with_signatures,
+            "scratch_dir": scratch,
+        },
+        "scenarios": reports,
+        "llm_calls": model.calls,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_summary(report: dict):
+    print(f"\n{'scenario':<18} {'ops':>5} {'err':>4} {'ops/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rows/s':>8}",
+          file=sys.stderr)
+    for row in report["scenarios"]:
+        latency = row["latency_ms"]
+        print(
+            f"{row['scenario']:<18} {row['operations']:>5} {row['errors']:>4} {row['throughput_per_s']:>8.2f} "
+            f"{latency['p50'] or 0:>9.0f} {latency['p95'] or 0:>9.0f} {latency['p99'] or 0:>9.0f} "
+            f"{row['db_write_rows_per_s']:>8.1f}",
+            file=sys.stderr
+        )
+    print(f"peak RSS {report['peak_rss_mb']} MB, {report['llm_calls']} LLM calls", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=100, help="Analyses for the rca and analyze scenarios")
+    parser.add_argument("--pipelines", type=int, default=10, help="/api/analyze-latest calls")
+    parser.add_argument("--jobs-per-pipeline", type=int, default=10, help="Jobs per fake pipeline (half failed)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--workers", type=int, default=4, help="RCA worker pool size")
+    parser.add_argument("--mode", default="chain", choices=["chain", "fused"], help="RCA graph mode")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Fake LLM latency per call")
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--trace-kb", type=int, default=256, help="Size of each fake job trace")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the RCA result cache and LLM memo enabled")
+    parser.add_argument("--with-signatures", action="store_true", help="Keep the rule-based fast path enabled")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Max seconds to wait for queued jobs")
+    parser.add_argument("--keep-scratch", action="store_true", help="Keep the scratch database and log store")
+    parser.add_argument("--log-level", default="WARNING", help="App log level during the run")
+    parser.add_argument("--json", help="Write the report to this file instead of stdout")
+    args = parser.parse_args()
+
+    gitlab = FakeGitLab(trace_bytes=args.trace_kb * 1024, jobs_per_pipeline=args.jobs_per_pipeline).start()
+    scratch = configure_environment(args, gitlab)
+    try:
+        report = asyncio.run(main(args, gitlab, scratch))
+    finally:
+        gitlab.stop()
+        if not args.keep_scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    print_summary(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
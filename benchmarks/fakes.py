@@ -0,0 +1,287 @@
+"""Offline stand-ins for Azure OpenAI and GitLab used by the benchmarks.
+
+FakeChatModel answers every agent prompt with canned JSON after a configurable
+delay; FakeGitLab is a local HTTP server that serves pipelines, jobs and
+traces built from the scenarios in gitlab-ci-failure-samples.md.
+
+Importing this module does not import the app (core.config reads the
+environment at import time, so benchmarks configure it first).
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from benchmarks.samples import load_samples
+
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_CHARS = 16
+JOB_RE = re.compile(r"Job: (\S+)")
+
+# ============================================================
+# FAKE CHAT MODEL
+# ============================================================
+
+
+def canned_response(system: str, user: str, samples: List[dict]) -> dict:
+    """JSON the real agent would expect, labelled from the sample with the prompt's job name."""
+    job = JOB_RE.search(user)
+    sample = next((s for s in samples if job and s["job_name"] == job.group(1)), None)
+    error_type = sample["expected_error_type"] if sample else "UnknownFailure"
+    category = sample["expected_category"] if sample else "Misconfiguration"
+
+    parsed = {
+        "error_type": error_type,
+        "keywords": [word.lower() for word in re.findall(r"[A-Z][a-z]+", error_type)] or ["failure"],
+        "failing_tool": sample["job_name"].split("-")[0] if sample else "unknown",
+        "error_message": f"{error_type} in {sample['job_name']}" if sample else "Unknown failure",
+    }
+    classified = {"category": category, "confidence": 0.9, "reasoning": "benchmark"}
+
+    if "troubleshooting expert" in system:
+        return {
+            "suggested_fix": f"Resolve the {error_type} and re-run the job.",
+            "commands": ["git pull", "make ci"],
+            "confidence": 0.8,
+        }
+    if "classification expert" in system:
+        return classified
+    if '"category"' in system:
+        return {**parsed, **classified}  # Fused parse + classify
+    return parsed
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model with configurable latency that returns canned agent JSON."""
+
+    latency_ms: float = 200.0
+    jitter_ms: float = 50.0
+    samples: List[dict] = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-fake"
+
+    def _respond(self, messages) -> ChatResult:
+        self.calls += 1
+        system, user = messages[0].content, messages[-1].content
+        content = json.dumps(canned_response(system, user, self.samples))
+        prompt_chars = sum(len(message.content) for message in messages)
+        message = AIMessage(content=content, usage_metadata={
+            "input_tokens": prompt_chars // CHARS_PER_TOKEN,
+            "output_tokens": len(content) // CHARS_PER_TOKEN,
+            "total_tokens": (prompt_chars + len(content)) // CHARS_PER_TOKEN,
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return self._respond(messages)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        """Same response, delivered in small chunks spread over the latency."""
+        content = self._respond(messages).generations[0].message.content
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        delay = self._delay() / max(1, len(pieces))
+        for piece in pieces:
+            await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+
+def install_fake_llm(latency_ms: float = 200.0, jitter_ms: float = 50.0) -> FakeChatModel:
+    """Register the fake as the shared chat model returned by agents.llm.get_llm()."""
+    from agents import llm
+    from core.config import settings
+
+    model = FakeChatModel(latency_ms=latency_ms, jitter_ms=jitter_ms, samples=load_samples())
+    llm._llms[(settings.azure_openai_deployment, 0.0)] = model
+    return model
+
+# ============================================================
+# FAKE GITLAB
+# ============================================================
+
+RUNNER_PREAMBLE = """Running with gitlab-runner 16.6.0 (3046fee8)
+  on shared-runner-42 zXy12abC, system ID: s_0123456789ab
+Preparing the "docker" executor
+Using Docker executor with image python:3.11 ...
+Getting source from Git repository
+Fetching changes with git depth set to 20...
+Checking out 4f2a9c1d as detached HEAD (ref is main)...
+"""
+
+NOISE_LINES = [
+    "Downloading https://registry.example.com/packages/lib-{n}.tar.gz ({n} kB)",
+    "  Collecting dependency-{n}==1.{n}.0",
+    "[INFO] Compiling module {n} of 4096",
+    "Step {n}: RUN ./scripts/build.sh --target component-{n}",
+    "ok   github.com/example/service/pkg{n}  0.{n}s",
+    "  PASS  tests/unit/test_module_{n}.py::test_case_{n}",
+]
+
+
+def build_trace(sample: dict, size_bytes: int, seed: int = 0) -> str:
+    """A job trace of about `size_bytes`: runner output, filler, then the sample's failure."""
+    rng = random.Random(seed)
+    failure = sample["raw_log"].rstrip("\n") + "\nCleaning up project directory and file based variables\nERROR: Job failed: exit code 1\n"
+    lines = [RUNNER_PREAMBLE]
+    size = len(RUNNER_PREAMBLE) + len(failure)
+    while size < size_bytes:
+        line = rng.choice(NOISE_LINES).format(n=rng.randrange(10000)) + "\n"
+        lines.append(line)
+        size += len(line)
+    lines.append(failure)
+    return "".join(lines)
+
+
+class FakeGitLab:
+    """Local GitLab API (/api/v4) serving generated pipelines, jobs and traces.
+
+    Every pipelines request reports a new pipeline, so repeated
+    /api/analyze-latest calls analyse fresh jobs. Traces honour Range headers
+    like GitLab does (206 with Content-Range, 416 past the end).
+    """
+
+    def __init__(self, trace_bytes: int = 256 * 1024, jobs_per_pipeline: int = 10, failed_ratio: float = 0.5):
+        self.samples = load_samples()
+        self.jobs_per_pipeline = jobs_per_pipeline
+        self.failed_ratio = failed_ratio
+        # One trace per scenario, built once; job ids map onto them
+        self.traces = [
+            build_trace(sample, trace_bytes, seed=n).encode("utf-8")
+            for n, sample in enumerate(self.samples)
+        ]
+        self.pipeline_counter = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGitLab":
+        gitlab = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with gitlab._lock:
+                    gitlab.requests += 1
+                gitlab.handle(self)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # ------------------------------------------------------------
+
+    def jobs(self, pipeline_id: int) -> List[dict]:
+        failed = max(1, round(self.jobs_per_pipeline * self.failed_ratio))
+        jobs = []
+        for n in range(self.jobs_per_pipeline):
+            job_id = pipeline_id * 1000 + n
+            sample = self.samples[job_id % len(self.samples)]
+            jobs.append({
+                "id": job_id,
+                "name": sample["job_name"],
+                "stage": sample["stage"],
+                "status": "failed" if n < failed else "success",
+                "pipeline": {"id": pipeline_id},
+            })
+        return jobs
+
+    def trace(self, job_id: int) -> bytes:
+        return self.traces[job_id % len(self.traces)]
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        url = urlparse(request.path)
+        parts = url.path.strip("/").split("/")
+        query = parse_qs(url.query)
+        # /api/v4/projects/:id/...
+        route = parts[4:] if parts[:3] == ["api", "v4", "projects"] else None
+
+        if route == ["pipelines"]:
+            with self._lock:
+                self.pipeline_counter += 1
+                pipeline_id = self.pipeline_counter
+            self._json(request, [{
+                "id": pipeline_id, "status": "failed", "ref": "main",
+                "web_url": f"{self.url}/bench/-/pipelines/{pipeline_id}",
+            }])
+        elif route and len(route) == 3 and route[0] == "pipelines" and route[2] == "jobs":
+            jobs = self.jobs(int(route[1]))
+            per_page = int(query.get("per_page", ["20"])[0])
+            page = int(query.get("page", ["1"])[0])
+            headers = {"X-Next-Page": str(page + 1)} if page * per_page < len(jobs) else {}
+            self._json(request, jobs[(page - 1) * per_page:page * per_page], headers)
+        elif route and len(route) == 3 and route[0] == "jobs" and route[2] == "trace":
+            self._trace(request, self.trace(int(route[1])))
+        else:
+            self._json(request, {"message": "404 Not Found"}, status=404)
+
+    def _json(self, request, body, headers: Optional[dict] = None, status: int = 200):
+        data = json.dumps(body).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _trace(self, request, data: bytes):
+        status, start, end = 200, 0, len(data)
+        match = re.match(r"bytes=(\d*)-(\d*)", request.headers.get("Range", ""))
+        if match and (not data or (match.group(1) and int(match.group(1)) >= len(data))):
+            # Nothing at or past the requested offset (e.g. a tailer poll with no new output)
+            request.send_response(416)
+            request.send_header("Content-Range", f"bytes */{len(data)}")
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+        if match:
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(len(data), int(last) + 1 if last else len(data))
+            elif last:
+                start = max(0, len(data) - int(last))
+            status = 206
+        request.send_response(status)
+        request.send_header("Content-Type", "text/plain; charset=utf-8")
+        request.send_header("Content-Length", str(end - start))
+        if status == 206:
+            request.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+        request.end_headers()
+        request.wfile.write(data[start:end])
@@ -0,0 +1,86 @@
+"""Compare accuracy and latency of the fused and chained RCA graphs.
+
+Runs every scenario from gitlab-ci-failure-samples.md through both modes
+against the configured Azure OpenAI deployment and prints a summary.
+
+    python -m benchmarks.fused_vs_chain --repeat 3 --json report.json
+
+The signature fast path and the result cache are disabled by default so the
+numbers reflect LLM behaviour; pass --with-signatures to keep the fast path.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from agents.graph import run_rca_analysis
+from benchmarks.samples import load_samples
+from core.cache import rca_cache
+from core.config import settings
+
+MODES = ["chain", "fused"]
+
+
+async def run_mode(mode: str, samples: list, repeat: int) -> dict:
+    latencies = []
+    category_hits = 0
+    error_type_hits = 0
+    runs = 0
+
+    for _ in range(repeat):
+        for sample in samples:
+            started = time.perf_counter()
+            result = await run_rca_analysis(
+                pipeline_id="benchmark",
+                project_name="benchmark",
+                job_name=sample["job_name"],
+                stage=sample["stage"],
+                raw_log=sample["raw_log"],
+                job_status="failed",
+                mode=mode,
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            runs += 1
+            if result["failure_category"] == sample["expected_category"]:
+                category_hits += 1
+            if result["parsed_errors"].get("error_type") == sample["expected_error_type"]:
+                error_type_hits += 1
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "runs": runs,
+        "category_accuracy": category_hits / runs,
+        "error_type_accuracy": error_type_hits / runs,
+        "latency_ms_p50": statistics.median(latencies),
+        "latency_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "latency_ms_mean": statistics.mean(latencies),
+    }
+
+
+async def main(args):
+    rca_cache.enabled = False
+    settings.signature_fast_path = args.with_signatures
+
+    samples = load_samples()
+    report = [await run_mode(mode, samples, args.repeat) for mode in MODES]
+
+    print(f"\n{'mode':<8} {'runs':>5} {'cat acc':>8} {'type acc':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in report:
+        print(
+            f"{row['mode']:<8} {row['runs']:>5} {row['category_accuracy']:>8.0%} "
+            f"{row['error_type_accuracy']:>9.0%} {row['latency_ms_p50']:>9.0f} {row['latency_ms_p95']:>9.0f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the sample set per mode")
+    parser.add_argument("--with-signatures", action="store_true", help="Keep the rule-based fast path enabled")
+    parser.add_argument("--json", help="Write the report to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,43 @@
+"""Load the labelled failure scenarios from gitlab-ci-failure-samples.md."""
+import re
+from pathlib import Path
+from typing import List
+
+SAMPLES_PATH = Path(__file__).resolve().parent.parent / "gitlab-ci-failure-samples.md"
+
+SECTION_RE = re.compile(r"^## \d+\. .*$", re.MULTILINE)
+JOB_RE = re.compile(r"^(\S[\w-]*):\n\s+stage: (\S+)", re.MULTILINE)
+DETECTS_RE = re.compile(r"RCA detects: (\w+) → (\w+)")
+LOG_RE = re.compile(r"\*\*(?:Log output|What GitLab shows):\*\*\s*```\n(.*?)```", re.DOTALL)
+TABLE_ROW_RE = re.compile(r"^\| \d+ \| .*? \| .*? \| (\w+) \| (\w+) \|$", re.MULTILINE)
+
+
+def load_samples(path: Path = SAMPLES_PATH) -> List[dict]:
+    """Return one dict per scenario: job_name, stage, raw_log, expected labels."""
+    text = path.read_text()
+    starts = [m.start() for m in SECTION_RE.finditer(text)]
+    sections = [text[a:b] for a, b in zip(starts, starts[1:] + [len(text)])]
+
+    samples = []
+    for section in sections:
+        log = LOG_RE.search(section)
+        if not log:
+            continue
+        detects = DETECTS_RE.search(section)
+        jobs = JOB_RE.findall(section)
+        # The broken-YAML sample has no "RCA detects" marker; fall back to the table
+        if detects:
+            error_type, category = detects.groups()
+        else:
+            title = section.splitlines()[0]
+            rows = [row for row in TABLE_ROW_RE.findall(text) if row[1] in title.replace(" ", "")]
+            category, error_type = rows[0] if rows else ("Unknown", "Unknown")
+        job_name, stage = jobs[-1] if jobs else ("pipeline", "unknown")
+        samples.append({
+            "job_name": job_name,
+            "stage": stage,
+            "raw_log": log.group(1),
+            "expected_error_type": error_type,
+            "expected_category": category,
+        })
+    return samples
@@ -0,0 +1,119 @@
+"""Measure GET /api/search query latency on a large synthetic corpus.
+
+Fills a scratch SQLite database with failures built from the labelled
+scenarios in gitlab-ci-failure-samples.md (varied ids, paths and numbers),
+then times ranked top-20 searches and fails (exit code 1) when p95 exceeds
+the budget. The target is p95 under 100 ms at one million failures.
+
+    python -m benchmarks.search_latency --rows 1000000 --budget-ms 100
+
+The database URL is taken from --database (default: a fresh file in /tmp),
+so the configured DATABASE_URL is never written to.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+if __name__ == "__main__":
+    # Must be set before core.config is imported
+    _database = next((a.split("=", 1)[1] for a in sys.argv if a.startswith("--database=")), None)
+    os.environ["DATABASE_URL"] = _database or "sqlite+aiosqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="search-bench-"), "search.db"
+    )
+
+import asyncio
+import statistics
+
+from sqlalchemy import insert, text
+
+from benchmarks.samples import load_samples
+from db.database import async_session_maker, init_db
+from db.models import CIFailure
+from db.search import SQLITE_INSERT, search_failures
+
+QUERIES = [
+    "permission denied", "timeout", "npm ERR", "peer dependency", "terraform lock",
+    "OOMKilled", "connection refused", "x509 certificate", "assertion", "vault",
+    "image pull", "yaml", "exit code 137", "module not found", "docker*",
+]
+INSERT_BATCH = 5000
+
+
+def synthetic_rows(samples: list, start: int, count: int, rng: random.Random):
+    failures, documents = [], []
+    for n in range(start, start + count):
+        sample = samples[n % len(samples)]
+        log = sample["raw_log"].replace("1", str(rng.randrange(10))) + f"\nservice-{rng.randrange(500)} build {n}"
+        failures.append({
+            "id": n + 1,
+            "failure_id": f"bench-{n}",
+            "project_name": f"project-{n % 50}",
+            "job_name": sample["job_name"],
+            "stage": sample["stage"],
+            "error_type": sample["expected_error_type"],
+            "failure_category": sample["expected_category"],
+            "root_cause": log.splitlines()[-2] if "\n" in log else log,
+            "suggested_fix": f"Fix the {sample['expected_error_type']} in {sample['job_name']}",
+            "error_keywords": [sample["expected_error_type"], sample["stage"]],
+        })
+        documents.append({
+            "id": n + 1,
+            "error_type": sample["expected_error_type"],
+            "root_cause": failures[-1]["root_cause"],
+            "suggested_fix": failures[-1]["suggested_fix"],
+            "error_keywords": f"{sample['expected_error_type']} {sample['stage']}",
+            "log_text": log,
+        })
+    return failures, documents
+
+
+async def populate(first: int, rows: int):
+    samples = load_samples()
+    rng = random.Random(7)
+    started = time.perf_counter()
+    async with async_session_maker() as session:
+        for start in range(first, rows, INSERT_BATCH):
+            failures, documents = synthetic_rows(samples, start, min(INSERT_BATCH, rows - start), rng)
+            await session.execute(insert(CIFailure), failures)
+            await session.execute(text(SQLITE_INSERT), documents)
+            await session.commit()
+    print(f"Inserted {rows - first} failures in {time.perf_counter() - started:.1f}s")
+
+
+async def main(args) -> int:
+    await init_db()
+    async with async_session_maker() as session:
+        existing = await session.scalar(text("SELECT count(*) FROM ci_failures"))
+    if existing < args.rows:
+        await populate(existing, args.rows)
+
+    latencies = []
+    async with async_session_maker() as session:
+        for n in range(args.queries):
+            query = QUERIES[n % len(QUERIES)]
+            started = time.perf_counter()
+            await search_failures(session, query, limit=20)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"search top-20: p50 {p50:.1f} ms, p95 {p95:.1f} ms over {args.queries} queries "
+          f"(budget p95 {args.budget_ms:.0f} ms)")
+    if p95 > args.budget_ms:
+        print(f"❌ Search latency budget exceeded by {p95 - args.budget_ms:.1f} ms")
+        return 1
+    print("✅ Search latency within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Failures in the corpus")
+    parser.add_argument("--queries", type=int, default=300, help="Searches to time")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Max p95 latency (ms)")
+    parser.add_argument("--database", help="SQLAlchemy URL of the scratch database, as --database=URL (reused if populated)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
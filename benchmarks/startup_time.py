@@ -0,0 +1,63 @@
+"""Check that importing the API stays within the startup-time budget.
+
+Imports `main` in fresh interpreters and fails (exit code 1) when the median
+import time exceeds the budget, or when LLM/graph libraries are loaded at
+import time instead of on first use or warm-up.
+
+    python -m benchmarks.startup_time --runs 5 --budget 2.0
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Target for `import main` on a developer laptop / standard container
+STARTUP_BUDGET_SECONDS = 2.0
+
+# Must only be imported lazily (agents.llm.get_llm, agents.graph.get_rca_graph)
+DEFERRED_MODULES = ["langchain_openai", "openai", "langgraph", "agents.graph"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED_MODULES,)
+
+
+def measure_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(args) -> int:
+    runs = [measure_once() for _ in range(args.runs)]
+    seconds = sorted(run["seconds"] for run in runs)
+    median = statistics.median(seconds)
+    loaded = sorted({module for run in runs for module in run["loaded"]})
+
+    print(f"import main: median {median:.3f}s, min {seconds[0]:.3f}s, max {seconds[-1]:.3f}s "
+          f"over {args.runs} runs (budget {args.budget:.2f}s)")
+
+    failed = False
+    if median > args.budget:
+        print(f"❌ Startup budget exceeded by {median - args.budget:.3f}s")
+        failed = True
+    if loaded:
+        print(f"❌ Loaded at import time, should be deferred: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("✅ Startup within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="Max median import time (seconds)")
+    sys.exit(main(parser.parse_args()))
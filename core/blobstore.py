@@ -0,0 +1,145 @@
+"""Content-addressed, compressed log store on the local filesystem.
+
+Logs are split into fixed-size chunks that are compressed independently, so
+any byte range can be read by decompressing only the chunks it touches.
+Identical logs hash to the same file and are stored once.
+
+File layout (little-endian):
+    magic "CILB" | version u8 | codec u8 | chunk_size u32 | size u64 | chunks u32
+    offsets u64 * (chunks + 1)   # chunk boundaries, relative to the data section
+    compressed chunks
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from typing import Optional, Tuple
+
+from core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # Optional: falls back to zlib
+    zstandard = None
+
+MAGIC = b"CILB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBIQI")
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {"zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+
+class LogBlobStore:
+    """Stores logs under the sha256 of their UTF-8 bytes."""
+
+    def __init__(self, root: str, codec: str = "auto", chunk_bytes: int = 256 * 1024):
+        self.root = root
+        self.chunk_bytes = chunk_bytes
+        if codec == "auto":
+            codec = "zstd" if zstandard is not None else "zlib"
+        if codec == "zstd" and zstandard is None:
+            raise RuntimeError("LOG_STORE_CODEC=zstd requires the 'zstandard' package")
+        self.codec = CODECS[codec]
+
+    def path(self, ref: str) -> str:
+        return os.path.join(self.root, ref[:2], ref[2:4], ref)
+
+    def exists(self, ref: str) -> bool:
+        return os.path.exists(self.path(ref))
+
+    # ============================================================
+    # WRITE
+    # ============================================================
+
+    def _compress(self, chunk: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return zstandard.ZstdCompressor(level=3).compress(chunk)
+        return zlib.compress(chunk, 6)
+
+    def put(self, text: str) -> Tuple[str, int]:
+        """Store a log; returns (ref, uncompressed size in bytes)."""
+        data = text.encode("utf-8")
+        ref = hashlib.sha256(data).hexdigest()
+        path = self.path(ref)
+        if os.path.exists(path):
+            return ref, len(data)  # Deduplicated
+
+        chunks = [
+            self._compress(data[start:start + self.chunk_bytes])
+            for start in range(0, len(data), self.chunk_bytes)
+        ]
+        offsets = [0]
+        for chunk in chunks:
+            offsets.append(offsets[-1] + len(chunk))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename, so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, self.codec, self.chunk_bytes, len(data), len(chunks)))
+                f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return ref, len(data)
+
+    # ============================================================
+    # READ
+    # ============================================================
+
+    def size(self, ref: str) -> int:
+        with open(self.path(ref), "rb") as f:
+            return HEADER.unpack(f.read(HEADER.size))[4]
+
+    def read_bytes(self, ref: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Uncompressed bytes [start, end) of a stored log."""
+        with open(self.path(ref), "rb") as f:
+            if os.fstat(f.fileno()).st_size == HEADER.size + 8:
+                return b""  # Empty log: header and a single offset, nothing to map
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                magic, version, codec, chunk_size, size, count = HEADER.unpack_from(view, 0)
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError(f"Not a log blob: {ref}")
+
+                end = size if end is None else min(end, size)
+                start = max(0, start)
+                if start >= end:
+                    return b""
+
+                offsets = struct.unpack_from(f"<{count + 1}Q", view, HEADER.size)
+                data_start = HEADER.size + 8 * (count + 1)
+                first, last = start // chunk_size, (end - 1) // chunk_size
+                parts = []
+                for n in range(first, last + 1):
+                    compressed = view[data_start + offsets[n]:data_start + offsets[n + 1]]
+                    parts.append(self._decompress(codec, compressed))
+
+        data = b"".join(parts)
+        skip = first * chunk_size
+        return data[start - skip:end - skip]
+
+    def _decompress(self, codec: int, chunk: bytes) -> bytes:
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Blob is zstd-compressed but 'zstandard' is not installed")
+            return zstandard.ZstdDecompressor().decompress(chunk)
+        return zlib.decompress(chunk)
+
+    def read(self, ref: str, start: int = 0, end: Optional[int] = None) -> str:
+        """Decoded text of bytes [start, end); partial characters at the edges are replaced."""
+        return self.read_bytes(ref, start, end).decode("utf-8", errors="replace")
+
+
+log_store = LogBlobStore(
+    root=settings.log_store_path,
+    codec=settings.log_store_codec,
+    chunk_bytes=settings.log_store_chunk_bytes,
+)
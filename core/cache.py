@@ -0,0 +1,148 @@
+"""Two-tier RCA result cache keyed by RCA mode and log fingerprint (in-process LRU + DB)."""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import delete
+
+from core.config import settings
+from core.metrics import rca_cache_lookups
+from db.database import async_session_maker
+from db.models import RCACacheEntry
+from rag.knowledge_base import knowledge_base_version, on_knowledge_base_change
+
+# AgentState fields reused verbatim on a cache hit
+CACHED_FIELDS = [
+    "error_signatures",
+    "error_keywords",
+    "parsed_errors",
+    "failure_category",
+    "category_confidence",
+    "suggested_fix",
+    "fix_commands",
+    "similar_cases",
+    "seen_count",
+]
+
+
+def cache_key(fingerprint: str, mode: str) -> str:
+    """Results of the chain and fused graphs differ, so each mode has its own entries."""
+    return f"{mode}:{fingerprint}"
+
+
+class RCAResultCache:
+    """LRU with TTL in front of the rca_cache table."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _fresh(self, stored_at: float, kb_version: str) -> bool:
+        return (
+            kb_version == knowledge_base_version()
+            and time.time() - stored_at < self.ttl_seconds
+        )
+
+    def _remember(self, fingerprint: str, stored_at: float, kb_version: str, payload: dict):
+        self._entries[fingerprint] = (stored_at, kb_version, payload)
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, fingerprint: str, mode: str) -> Optional[dict]:
+        """Return the cached result fields for a fingerprint analysed in `mode`, if still valid."""
+        if not self.enabled:
+            return None
+        fingerprint = cache_key(fingerprint, mode)
+
+        entry = self._entries.get(fingerprint)
+        if entry:
+            stored_at, kb_version, payload = entry
+            if self._fresh(stored_at, kb_version):
+                self._entries.move_to_end(fingerprint)
+                self.memory_hits += 1
+                rca_cache_lookups.labels(result="memory_hit").inc()
+                return payload
+            del self._entries[fingerprint]
+
+        async with async_session_maker() as session:
+            row = await session.get(RCACacheEntry, fingerprint)
+            if row and self._fresh(row.stored_at, row.kb_version):
+                row.hit_count = (row.hit_count or 0) + 1
+                await session.commit()
+                self._remember(fingerprint, row.stored_at, row.kb_version, row.payload)
+                self.db_hits += 1
+                rca_cache_lookups.labels(result="db_hit").inc()
+                return row.payload
+
+        self.misses += 1
+        rca_cache_lookups.labels(result="miss").inc()
+        return None
+
+    async def put(self, fingerprint: str, result: dict, mode: str):
+        """Store the reusable parts of an RCA result under a fingerprint and mode."""
+        if not self.enabled:
+            return
+        fingerprint = cache_key(fingerprint, mode)
+
+        payload = {field: result[field] for field in CACHED_FIELDS}
+        stored_at = time.time()
+        kb_version = knowledge_base_version()
+        self._remember(fingerprint, stored_at, kb_version, payload)
+
+        async with async_session_maker() as session:
+            await session.merge(RCACacheEntry(
+                fingerprint=fingerprint,
+                kb_version=kb_version,
+                error_type=payload["parsed_errors"].get("error_type", "Unknown"),
+                failure_category=payload["failure_category"],
+                payload=payload,
+                stored_at=stored_at,
+                hit_count=0
+            ))
+            await session.commit()
+
+    def invalidate_memory(self, fingerprint: Optional[str] = None):
+        """Drop one fingerprint's (or every) in-process entry, in every mode."""
+        if fingerprint is None:
+            self._entries.clear()
+        else:
+            for key in [key for key in self._entries if key.endswith(f":{fingerprint}")]:
+                del self._entries[key]
+
+    async def invalidate(self, fingerprint: Optional[str] = None):
+        """Drop one fingerprint's (or every) entry from both tiers."""
+        self.invalidate_memory(fingerprint)
+        async with async_session_maker() as session:
+            query = delete(RCACacheEntry)
+            if fingerprint is not None:
+                query = query.where(RCACacheEntry.fingerprint.like(f"%:{fingerprint}"))
+            await session.execute(query)
+            await session.commit()
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.db_hits
+        total = hits + self.misses
+        return {
+            "entries_in_memory": len(self._entries),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+
+
+rca_cache = RCAResultCache(
+    max_entries=settings.rca_cache_max_entries,
+    ttl_seconds=settings.rca_cache_ttl_seconds,
+    enabled=settings.rca_cache_enabled,
+)
+
+# Stored rows carry the KB version they were computed against, so DB entries
+# go stale on their own; only the in-process tier needs clearing.
+on_knowledge_base_change(lambda version, error_types: rca_cache.invalidate_memory())
@@ -1,15 +1,55 @@
 """Core configuration settings."""
 import os
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Graphs of agents/graph.py RCA_MODES
+RCA_MODE_NAMES = ("chain", "fused")
+
 class Settings(BaseSettings):
     # GitLab
     gitlab_token: str = os.getenv("GITLAB_TOKEN", "")
     project_id: str = os.getenv("PROJECT_ID", "")
     gitlab_url: str = os.getenv("GITLAB_URL", "https://gitlab.com")
+    gitlab_max_connections: int = int(os.getenv("GITLAB_MAX_CONNECTIONS", "20"))
+    gitlab_max_concurrency: int = int(os.getenv("GITLAB_MAX_CONCURRENCY", "8"))
+    gitlab_timeout_seconds: float = float(os.getenv("GITLAB_TIMEOUT_SECONDS", "30"))
+    gitlab_max_retries: int = int(os.getenv("GITLAB_MAX_RETRIES", "3"))
+    gitlab_retry_backoff_seconds: float = float(os.getenv("GITLAB_RETRY_BACKOFF_SECONDS", "0.5"))
+    # Job statuses whose traces are downloaded (comma-separated)
+    gitlab_trace_statuses: str = os.getenv("GITLAB_TRACE_STATUSES", "failed")
+    # Streaming trace download: only trailing bytes are requested via Range,
+    # and only the tail plus early error regions are kept in memory
+    gitlab_trace_range_bytes: int = int(os.getenv("GITLAB_TRACE_RANGE_BYTES", str(16 * 1024 * 1024)))
+    trace_tail_chars: int = int(os.getenv("TRACE_TAIL_CHARS", "20000"))
+    trace_max_regions: int = int(os.getenv("TRACE_MAX_REGIONS", "5"))
+    trace_context_lines: int = int(os.getenv("TRACE_CONTEXT_LINES", "5"))
+    
+    # GitLab webhooks (POST /api/webhooks/gitlab); empty secret rejects every delivery
+    gitlab_webhook_secret: str = os.getenv("GITLAB_WEBHOOK_SECRET", "")
+    webhook_debounce_seconds: float = float(os.getenv("WEBHOOK_DEBOUNCE_SECONDS", "3"))
+    webhook_max_wait_seconds: float = float(os.getenv("WEBHOOK_MAX_WAIT_SECONDS", "15"))
+    
+    # Live tailing of running jobs (early, provisional RCA)
+    trace_tailer_enabled: bool = os.getenv("TRACE_TAILER_ENABLED", "false").lower() == "true"
+    trace_tailer_poll_seconds: float = float(os.getenv("TRACE_TAILER_POLL_SECONDS", "5"))
+    trace_tailer_max_jobs: int = int(os.getenv("TRACE_TAILER_MAX_JOBS", "50"))
+    trace_tailer_discover: bool = os.getenv("TRACE_TAILER_DISCOVER", "true").lower() == "true"
+    
+    # Multi-project pipeline scanner (PROJECT_IDS comma-separated; empty = PROJECT_ID)
+    gitlab_project_ids: str = os.getenv("PROJECT_IDS", "")
+    scanner_enabled: bool = os.getenv("SCANNER_ENABLED", "false").lower() == "true"
+    scanner_concurrency: int = int(os.getenv("SCANNER_CONCURRENCY", "4"))
+    scanner_min_interval_seconds: float = float(os.getenv("SCANNER_MIN_INTERVAL_SECONDS", "60"))
+    scanner_max_interval_seconds: float = float(os.getenv("SCANNER_MAX_INTERVAL_SECONDS", "900"))
+    scanner_max_pipelines_per_scan: int = int(os.getenv("SCANNER_MAX_PIPELINES_PER_SCAN", "10"))
+    # Share of the GitLab rate limit the scanner leaves unused (webhooks, API calls)
+    scanner_rate_limit_reserve: float = float(os.getenv("SCANNER_RATE_LIMIT_RESERVE", "0.2"))
+    # Active pipelines older than this are treated as settled (0 = wait forever)
+    scanner_max_active_pipeline_age_seconds: float = float(os.getenv("SCANNER_MAX_ACTIVE_PIPELINE_AGE_SECONDS", "86400"))
     
     # Azure OpenAI
     azure_openai_api_key: str = os.getenv("AZURE_OPENAI_API_KEY", "")
@@ -17,16 +57,114 @@ class Settings(BaseSettings):
     azure_openai_deployment: str = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
     azure_openai_api_version: str = os.getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview")
     
+    # Shared LLM connection pool (agents/llm.py)
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    llm_max_keepalive_connections: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    llm_keepalive_seconds: float = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+    llm_timeout_seconds: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    llm_warm_up: bool = os.getenv("LLM_WARM_UP", "true").lower() == "true"
+    
+    # Log excerpt sent to the parser: error regions packed into a token budget
+    llm_log_token_budget: int = int(os.getenv("LLM_LOG_TOKEN_BUDGET", "600"))
+    llm_log_context_lines: int = int(os.getenv("LLM_LOG_CONTEXT_LINES", "3"))
+    
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./ci_rca.db")
     
+    # Full job logs: compressed, content-addressed blobs (codec: auto, zstd or zlib)
+    log_store_path: str = os.getenv("LOG_STORE_PATH", "./log_store")
+    log_store_codec: str = os.getenv("LOG_STORE_CODEC", "auto")
+    log_store_chunk_bytes: int = int(os.getenv("LOG_STORE_CHUNK_BYTES", "262144"))
+    
+    # RCA graph: "chain" (parser -> classifier LLM calls) or "fused" (one call)
+    rca_mode: str = os.getenv("RCA_MODE", "chain")
+    
+    # Signature fast path (rule-based pre-parser)
+    signature_fast_path: bool = os.getenv("SIGNATURE_FAST_PATH", "true").lower() == "true"
+    signature_rules_path: str = os.getenv("SIGNATURE_RULES_PATH", "")
+    signature_min_score: float = float(os.getenv("SIGNATURE_MIN_SCORE", "1.0"))
+    
+    # RCA result cache (keyed by log fingerprint)
+    rca_cache_enabled: bool = os.getenv("RCA_CACHE_ENABLED", "true").lower() == "true"
+    rca_cache_max_entries: int = int(os.getenv("RCA_CACHE_MAX_ENTRIES", "1024"))
+    rca_cache_ttl_seconds: int = int(os.getenv("RCA_CACHE_TTL_SECONDS", "86400"))
+    
+    # Per-agent LLM response memo (keyed by normalized prompt inputs)
+    llm_memo_enabled: bool = os.getenv("LLM_MEMO_ENABLED", "true").lower() == "true"
+    llm_memo_max_entries: int = int(os.getenv("LLM_MEMO_MAX_ENTRIES", "4096"))
+    llm_memo_ttl_seconds: int = int(os.getenv("LLM_MEMO_TTL_SECONDS", "86400"))
+    llm_memo_path: str = os.getenv("LLM_MEMO_PATH", "")  # SQLite file; empty = memory only
+    llm_memo_disk_max_entries: int = int(os.getenv("LLM_MEMO_DISK_MAX_ENTRIES", "100000"))
+    
+    # Similarity retrieval (BM25 over KB + past failures)
+    similarity_top_k: int = int(os.getenv("SIMILARITY_TOP_K", "3"))
+    similarity_history_limit: int = int(os.getenv("SIMILARITY_HISTORY_LIMIT", "50000"))
+    
+    # Near-duplicate grouping (MinHash/LSH over normalized error regions).
+    # Changing num_perm/shingle size makes stored signatures incomparable.
+    minhash_num_perm: int = int(os.getenv("MINHASH_NUM_PERM", "64"))
+    minhash_bands: int = int(os.getenv("MINHASH_BANDS", "16"))
+    minhash_shingle_size: int = int(os.getenv("MINHASH_SHINGLE_SIZE", "3"))
+    minhash_threshold: float = float(os.getenv("MINHASH_THRESHOLD", "0.8"))
+    
+    # Full-text search: tokens of each log's error regions to index (0 = whole log)
+    search_log_token_budget: int = int(os.getenv("SEARCH_LOG_TOKEN_BUDGET", "2000"))
+    search_max_page_size: int = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "100"))
+    # Only the newest N matches are ranked, bounding latency on large corpora (0 = all)
+    search_rank_window: int = int(os.getenv("SEARCH_RANK_WINDOW", "2000"))
+    
+    # Knowledge base growth: unseen error types become entries after N occurrences
+    kb_promote_threshold: int = int(os.getenv("KB_PROMOTE_THRESHOLD", "3"))
+    # X-Admin-Token for the knowledge base admin API; empty rejects every request
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
+    
+    # RCA job queue / worker pool
+    rca_workers: int = int(os.getenv("RCA_WORKERS", "4"))
+    rca_max_attempts: int = int(os.getenv("RCA_MAX_ATTEMPTS", "3"))
+    rca_retry_backoff_seconds: float = float(os.getenv("RCA_RETRY_BACKOFF_SECONDS", "5"))
+    rca_job_lease_seconds: float = float(os.getenv("RCA_JOB_LEASE_SECONDS", "600"))
+    rca_queue_poll_seconds: float = float(os.getenv("RCA_QUEUE_POLL_SECONDS", "2"))
+    rca_queue_max_pending: int = int(os.getenv("RCA_QUEUE_MAX_PENDING", "1000"))
+    
+    # Batch analysis (POST /api/analyze/batch)
+    rca_batch_max_items: int = int(os.getenv("RCA_BATCH_MAX_ITEMS", "200"))
+    rca_batch_max_concurrency: int = int(os.getenv("RCA_BATCH_MAX_CONCURRENCY", "8"))
+    rca_batch_max_requests: int = int(os.getenv("RCA_BATCH_MAX_REQUESTS", "2"))
+    
+    # Server-Sent Events (/api/failures/{id}/events, /api/events)
+    events_queue_size: int = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+    events_history_failures: int = int(os.getenv("EVENTS_HISTORY_FAILURES", "1000"))
+    events_heartbeat_seconds: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    # Stream the fix suggester's tokens (streamed calls report no token usage before API 2024-09-01-preview)
+    events_stream_tokens: bool = os.getenv("EVENTS_STREAM_TOKENS", "true").lower() == "true"
+    
+    # Metrics: max points returned by /api/metrics/timeseries
+    metrics_max_points: int = int(os.getenv("METRICS_MAX_POINTS", "2000"))
+    
     # App
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "json")  # json or text
+    
+    @field_validator("rca_mode")
+    @classmethod
+    def check_rca_mode(cls, value: str) -> str:
+        if value not in RCA_MODE_NAMES:
+            raise ValueError(f"RCA_MODE must be one of {', '.join(RCA_MODE_NAMES)}, got {value!r}")
+        return value
     
     @property
     def api_base(self):
         return f"{self.gitlab_url}/api/v4"
     
+    @property
+    def project_ids(self):
+        ids = list(dict.fromkeys(p.strip() for p in self.gitlab_project_ids.split(",") if p.strip()))
+        return ids or ([self.project_id] if self.project_id else [])
+    
+    @property
+    def trace_statuses(self):
+        return {s.strip() for s in self.gitlab_trace_statuses.split(",") if s.strip()}
+    
     @property
     def gitlab_headers(self):
         return {"PRIVATE-TOKEN": self.gitlab_token}
@@ -0,0 +1,90 @@
+"""In-process event bus behind the Server-Sent Events endpoints.
+
+RCA progress is published per failure_id: "started", one "stage" per graph
+node, "token" chunks of the Fix Suggester's output, then "done" or "failed"
+(and "retrying" between attempts). Every terminal event also goes to the
+firehose. Subscribers that connect late get a replay of the failure's events
+so far; fix tokens are replayed as one chunk.
+"""
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from core.config import settings
+from core.metrics import sse_events, sse_subscribers
+
+TERMINAL_EVENTS = {"done", "failed"}
+FIREHOSE = "*"
+
+
+class EventBus:
+    """Fan-out of RCA events to bounded per-subscriber queues."""
+
+    def __init__(self, queue_size: int = 1000, history_failures: int = 1000):
+        self.queue_size = queue_size
+        self.history_failures = history_failures
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        # failure_id -> {"events": [...], "tokens": str} for late subscribers
+        self._history: "OrderedDict[str, dict]" = OrderedDict()
+
+    def subscribe(self, failure_id: str = FIREHOSE) -> asyncio.Queue:
+        """Queue receiving (event, data) for one failure (or every terminal event)."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        history = self._history.get(failure_id)
+        if history:
+            for item in history["events"]:
+                queue.put_nowait(item)
+            if history["tokens"]:
+                queue.put_nowait(("token", {"text": history["tokens"], "replay": True}))
+        self._subscribers.setdefault(failure_id, set()).add(queue)
+        sse_subscribers.labels(stream="firehose" if failure_id == FIREHOSE else "failure").inc()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, failure_id: str = FIREHOSE):
+        subscribers = self._subscribers.get(failure_id)
+        if subscribers and queue in subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[failure_id]
+            sse_subscribers.labels(stream="firehose" if failure_id == FIREHOSE else "failure").dec()
+
+    def publish(self, failure_id: Optional[str], event: str, data: dict):
+        """Deliver an event to the failure's subscribers (terminal events also to the firehose)."""
+        if not failure_id:
+            return
+        item = (event, {"failure_id": failure_id, **data})
+        sse_events.labels(event=event).inc()
+        self._record(failure_id, event, item)
+
+        targets = list(self._subscribers.get(failure_id, ()))
+        if event in TERMINAL_EVENTS:
+            targets += self._subscribers.get(FIREHOSE, ())
+        for queue in targets:
+            if queue.full():
+                queue.get_nowait()  # Slow consumer: drop its oldest event, never the newest
+            queue.put_nowait(item)
+
+    def _record(self, failure_id: str, event: str, item: tuple):
+        if event in TERMINAL_EVENTS:
+            self._history.pop(failure_id, None)  # Stored in the DB from now on
+            return
+        history = self._history.get(failure_id)
+        if history is None or event == "started":  # A retry starts over
+            history = self._history[failure_id] = {"events": [], "tokens": ""}
+            while len(self._history) > self.history_failures:
+                self._history.popitem(last=False)
+        if event == "token":
+            history["tokens"] += item[1]["text"]
+        else:
+            history["events"].append(item)
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+event_bus = EventBus(
+    queue_size=settings.events_queue_size,
+    history_failures=settings.events_history_failures,
+)
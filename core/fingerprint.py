@@ -0,0 +1,79 @@
+"""Log normalization and fingerprinting for recognising repeat failures."""
+import hashlib
+import re
+from collections import deque
+from typing import Dict, List
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+SECTION_RE = re.compile(r"section_(?:start|end):\d+:[\w.-]+(?:\[[^\]]*\])?\r?")
+
+# Order matters: broader masks (timestamps, UUIDs) run before generic numbers.
+MASKS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<TS>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<TS>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE), "<UUID>"),
+    (re.compile(r"\b(?=[0-9a-f]*[a-f])[0-9a-f]{7,64}\b"), "<SHA>"),
+    (re.compile(r"(?:/tmp|/var/folders|/private/var|/var/tmp)/\S*"), "<TMP>"),
+    (re.compile(r"/builds/[\w.-]+/[\w./-]*?(?=[\s:'\"]|$)"), "<BUILD>"),
+    (re.compile(r"\b(job|pipeline|runner|project)([\s#:/-]+)\d+", re.IGNORECASE), r"\1\2<ID>"),
+    (re.compile(r"\b\d{5,}\b"), "<N>"),
+]
+
+ERROR_LINE_RE = re.compile(
+    r"\b(error|errors|failed|failure|fatal|exception|denied|forbidden|timeout|timed out|"
+    r"killed|expired|exit code|not found|could not|cannot|unable to)\b",
+    re.IGNORECASE,
+)
+
+MAX_REGION_LINES = 20
+
+
+def strip_control(log: str) -> str:
+    """Remove ANSI escapes and GitLab section markers."""
+    return SECTION_RE.sub("", ANSI_RE.sub("", log))
+
+
+def normalize_line(line: str) -> str:
+    """Mask volatile tokens (timestamps, IDs, SHAs, UUIDs, temp paths)."""
+    for pattern, repl in MASKS:
+        line = pattern.sub(repl, line)
+    return " ".join(line.split())
+
+
+def error_region(log: str, max_lines: int = MAX_REGION_LINES) -> List[str]:
+    """Return the normalized lines that describe the failure.
+
+    Uses the first lines matching error heuristics, falling back to the last
+    non-empty lines when nothing looks like an error.
+    """
+    region = []
+    seen = set()
+    tail = deque(maxlen=max_lines)
+    for raw in strip_control(log).splitlines():
+        if not raw.strip():
+            continue
+        tail.append(raw)
+        if not ERROR_LINE_RE.search(raw):
+            continue
+        line = normalize_line(raw)
+        if line not in seen:
+            seen.add(line)
+            region.append(line)
+            if len(region) >= max_lines:
+                break
+
+    return region or [normalize_line(line) for line in tail]
+
+
+def log_fingerprint(log: str) -> str:
+    """Stable hash of a log's normalized error region."""
+    region = "\n".join(error_region(log))
+    return hashlib.sha256(region.encode("utf-8")).hexdigest()
+
+
+def cluster_by_fingerprint(logs: List[str]) -> Dict[str, List[int]]:
+    """Group log indexes by fingerprint, in first-seen order."""
+    clusters: Dict[str, List[int]] = {}
+    for i, log in enumerate(logs):
+        clusters.setdefault(log_fingerprint(log), []).append(i)
+    return clusters
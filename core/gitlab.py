@@ -0,0 +1,303 @@
+"""Shared async GitLab API client with connection pooling, bounded concurrency and retries."""
+import asyncio
+import codecs
+import random
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import httpx
+
+from core.config import settings
+from core.metrics import endpoint_label, gitlab_rate_limit_remaining, gitlab_request_seconds, gitlab_retries
+from core.trace_reader import TraceBuffer
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Awaited before every request attempt made in this context (set by the project scanner)
+request_pacer: ContextVar[Optional[Callable[[], Awaitable[None]]]] = ContextVar("request_pacer", default=None)
+
+
+class GitLabError(Exception):
+    """Raised when GitLab returns a non-success response after retries."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"GitLab API error {status_code}: {detail[:200]}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class GitLabClient:
+    """Async GitLab REST client shared by all request handlers."""
+
+    def __init__(
+        self,
+        api_base: str,
+        token: str,
+        max_connections: int = 20,
+        max_concurrency: int = 8,
+        timeout_seconds: float = 30.0,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        trace_range_bytes: int = 0,
+        trace_buffer_factory=TraceBuffer,
+    ):
+        self.api_base = api_base
+        self.token = token
+        self.max_connections = max_connections
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.trace_range_bytes = trace_range_bytes
+        self.trace_buffer_factory = trace_buffer_factory
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        # From the RateLimit-* headers of the latest response (None until GitLab sends them)
+        self.rate_limit: Optional[int] = None
+        self.rate_limit_remaining: Optional[int] = None
+        self.rate_limit_reset_at: Optional[float] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_base,
+                headers={"PRIVATE-TOKEN": self.token},
+                timeout=httpx.Timeout(self.timeout_seconds),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                event_hooks={"response": [self._track_rate_limit]},
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _track_rate_limit(self, response: httpx.Response):
+        headers = response.headers
+        try:
+            if "RateLimit-Remaining" in headers:
+                self.rate_limit_remaining = int(headers["RateLimit-Remaining"])
+                gitlab_rate_limit_remaining.set(self.rate_limit_remaining)
+            if "RateLimit-Limit" in headers:
+                self.rate_limit = int(headers["RateLimit-Limit"])
+            if "RateLimit-Reset" in headers:
+                self.rate_limit_reset_at = float(headers["RateLimit-Reset"])
+        except ValueError:
+            pass
+
+    def request_interval(self, reserve: float = 0.0) -> float:
+        """Seconds between requests that spread the remaining rate-limit budget until its reset.
+        
+        `reserve` is the fraction of the limit to leave unused; once the budget
+        is spent the interval is the time left until the reset. 0 while GitLab
+        sends no RateLimit headers or the window has already reset.
+        """
+        if self.rate_limit_remaining is None or self.rate_limit_reset_at is None:
+            return 0.0
+        window = self.rate_limit_reset_at - time.time()
+        if window <= 0:
+            return 0.0
+        budget = self.rate_limit_remaining - reserve * (self.rate_limit or 0)
+        return window if budget < 1 else window / budget
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                return float(response.headers["Retry-After"])
+            except ValueError:
+                pass
+        return self.backoff_seconds * (2 ** attempt) * (1 + random.random() * 0.1)
+
+    async def _with_retries(self, attempt_fn, path: str):
+        """Run `attempt_fn`, retrying transient failures with exponential backoff.
+        
+        `attempt_fn` performs one request and returns its result, or the
+        retryable httpx.Response when GitLab answered with a transient status.
+        Every attempt is timed under the templated `path` and first waits
+        for the context's `request_pacer`, if one is set.
+        """
+        endpoint = endpoint_label(path)
+        pace = request_pacer.get()
+        for attempt in range(self.max_retries + 1):
+            if pace is not None:
+                await pace()
+            response = None
+            status = "error"
+            started = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()  # Exclude time queued on the semaphore
+                    result = await attempt_fn()
+                status = str(result.status_code) if isinstance(result, httpx.Response) else "ok"
+                if not isinstance(result, httpx.Response) or result.status_code not in RETRY_STATUSES:
+                    return result
+                response = result
+                if attempt == self.max_retries:
+                    raise GitLabError(response.status_code, response.text)
+            except GitLabError as e:
+                status = str(e.status_code)
+                raise
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                status = "timeout" if isinstance(e, httpx.TimeoutException) else "transport_error"
+                if attempt == self.max_retries:
+                    raise
+            finally:
+                gitlab_request_seconds.labels(endpoint=endpoint, status=status).observe(time.perf_counter() - started)
+
+            gitlab_retries.labels(endpoint=endpoint).inc()
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying transient failures."""
+        async def attempt():
+            response = await self.client.request(method, path, **kwargs)
+            if response.status_code >= 400 and response.status_code not in RETRY_STATUSES:
+                raise GitLabError(response.status_code, response.text)
+            return response
+
+        return await self._with_retries(attempt, path)
+
+    async def get_json(self, path: str, params: Optional[dict] = None):
+        response = await self.request("GET", path, params=params)
+        return response.json()
+
+    # ============================================================
+    # API HELPERS
+    # ============================================================
+
+    async def latest_pipeline(self, project_id: str) -> Optional[dict]:
+        pipelines = await self.get_json(f"/projects/{project_id}/pipelines", params={"per_page": 1})
+        return pipelines[0] if pipelines else None
+
+    async def _all_pages(self, path: str, params: Optional[dict] = None) -> List[dict]:
+        """Every item of a paginated list endpoint."""
+        items = []
+        page = 1
+        while True:
+            response = await self.request("GET", path, params={**(params or {}), "per_page": 100, "page": page})
+            items.extend(response.json())
+            next_page = response.headers.get("X-Next-Page")
+            if not next_page:
+                return items
+            page = int(next_page)
+
+    async def pipelines_after(self, project_id: str, after_id: int) -> List[dict]:
+        """Pipelines with an id above `after_id`, newest first (no id filter exists, so pages stop at it)."""
+        pipelines = []
+        page = 1
+        while True:
+            response = await self.request("GET", f"/projects/{project_id}/pipelines", params={
+                "order_by": "id", "sort": "desc", "per_page": 100, "page": page
+            })
+            batch = response.json()
+            pipelines.extend(p for p in batch if p["id"] > after_id)
+            next_page = response.headers.get("X-Next-Page")
+            if not next_page or not batch or batch[-1]["id"] <= after_id:
+                return pipelines
+            page = int(next_page)
+
+    async def pipeline_jobs(self, project_id: str, pipeline_id) -> List[dict]:
+        """All jobs of a pipeline, following pagination."""
+        return await self._all_pages(f"/projects/{project_id}/pipelines/{pipeline_id}/jobs")
+
+    async def running_jobs(self, project_id: str) -> List[dict]:
+        """Jobs of a project that are running right now."""
+        return await self._all_pages(f"/projects/{project_id}/jobs", params={"scope[]": "running"})
+
+    async def job(self, project_id: str, job_id) -> dict:
+        return await self.get_json(f"/projects/{project_id}/jobs/{job_id}")
+
+    async def trace_range(self, project_id: str, job_id, start: int = 0, last_bytes: int = 0) -> Tuple[bytes, int]:
+        """Trace bytes from offset `start` (or only the last `last_bytes`) and the offset they begin at.
+        
+        Tailing a running job asks only for the bytes appended since the
+        previous poll; `416 Range Not Satisfiable` means nothing new yet.
+        """
+        headers = {"Range": f"bytes=-{last_bytes}" if last_bytes else f"bytes={start}-"}
+        path = f"/projects/{project_id}/jobs/{job_id}/trace"
+
+        async def attempt():
+            response = await self.client.get(path, headers=headers)
+            if response.status_code == 416:
+                return b"", start
+            if response.status_code >= 400:
+                if response.status_code in RETRY_STATUSES:
+                    return response
+                raise GitLabError(response.status_code, response.text)
+            if response.status_code == 206:
+                return response.content, _range_start(response.headers.get("Content-Range", ""))
+            # Range ignored: the whole trace came back
+            data = response.content
+            if last_bytes:
+                return data[-last_bytes:], max(0, len(data) - last_bytes)
+            return data[start:], min(start, len(data))
+
+        return await self._with_retries(attempt, path)
+
+    async def stream_trace(self, project_id: str, job_id) -> TraceBuffer:
+        """Stream a job trace into a bounded TraceBuffer.
+        
+        When `trace_range_bytes` is set, only that many trailing bytes are
+        requested; servers that ignore the Range header stream the whole
+        trace, which the buffer still holds in constant memory. The
+        rendered buffer is all that is kept: logs stored from a GitLab trace
+        are its tail plus early error regions, not the full trace.
+        """
+        headers = {}
+        if self.trace_range_bytes:
+            headers["Range"] = f"bytes=-{self.trace_range_bytes}"
+
+        path = f"/projects/{project_id}/jobs/{job_id}/trace"
+
+        async def attempt():
+            buffer = self.trace_buffer_factory()
+            async with self.client.stream("GET", path, headers=headers) as response:
+                if response.status_code == 416:
+                    return buffer  # Empty trace
+                if response.status_code >= 400:
+                    await response.aread()
+                    if response.status_code in RETRY_STATUSES:
+                        return response
+                    raise GitLabError(response.status_code, response.text)
+                if response.status_code == 206:
+                    buffer.skipped_bytes = _range_start(response.headers.get("Content-Range", ""))
+
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                async for chunk in response.aiter_bytes():
+                    buffer.feed(decoder.decode(chunk))
+                buffer.feed(decoder.decode(b"", final=True))
+                buffer.close()
+            return buffer
+
+        return await self._with_retries(attempt, path)
+
+
+def _range_start(content_range: str) -> int:
+    """Parse the first byte offset from `Content-Range: bytes START-END/TOTAL`."""
+    try:
+        return int(content_range.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return 0
+
+
+gitlab_client = GitLabClient(
+    api_base=settings.api_base,
+    token=settings.gitlab_token,
+    max_connections=settings.gitlab_max_connections,
+    max_concurrency=settings.gitlab_max_concurrency,
+    timeout_seconds=settings.gitlab_timeout_seconds,
+    max_retries=settings.gitlab_max_retries,
+    backoff_seconds=settings.gitlab_retry_backoff_seconds,
+    trace_range_bytes=settings.gitlab_trace_range_bytes,
+    trace_buffer_factory=lambda: TraceBuffer(
+        tail_chars=settings.trace_tail_chars,
+        max_regions=settings.trace_max_regions,
+        context_lines=settings.trace_context_lines,
+    ),
+)
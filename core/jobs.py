@@ -0,0 +1,281 @@
+"""Durable, DB-backed RCA job queue with a bounded worker pool."""
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.events import event_bus
+from core.logs import failure_id_var, get_logger
+from core.metrics import rca_job_wait_seconds, rca_jobs, rca_workers_busy
+from db.database import async_session_maker
+from db.models import RCAJob
+
+logger = get_logger("core.jobs")
+
+
+class QueueFullError(Exception):
+    """Raised when enqueueing would exceed the pending-job limit."""
+
+
+def enqueue_rca(
+    session: AsyncSession,
+    failure_id: str,
+    raw_log: str,
+    leader_id: Optional[str] = None,
+    **payload
+) -> RCAJob:
+    """Add an RCA job to the caller's transaction (commit, then call rca_queue.notify()).
+    
+    With `leader_id` the job is never claimed itself; it waits for the leader's
+    RCA and is finished together with it.
+    """
+    job = RCAJob(
+        id=failure_id,
+        status="waiting" if leader_id else "queued",
+        leader_id=leader_id,
+        attempts=0,
+        payload=payload,
+        raw_log=raw_log,
+        available_at=time.time()
+    )
+    session.add(job)
+    return job
+
+
+async def waiting_jobs(session: AsyncSession, leader_id: str) -> List[RCAJob]:
+    """Jobs that share the RCA of `leader_id`."""
+    result = await session.scalars(
+        select(RCAJob).where(RCAJob.leader_id == leader_id).where(RCAJob.status == "waiting")
+    )
+    return result.all()
+
+
+async def mark_job_done(session: AsyncSession, failure_id: str):
+    """Mark a job (and the jobs waiting on it) done inside the transaction that stores its result.
+    
+    The spooled log is dropped: the stored failure references it in the log store.
+    """
+    await session.execute(
+        update(RCAJob)
+        .where(or_(RCAJob.id == failure_id, RCAJob.leader_id == failure_id))
+        .values(status="done", finished_at=time.time(), last_error=None, raw_log=None)
+    )
+
+
+class RCAWorkerPool:
+    """Claims queued jobs from the rca_jobs table and runs them with bounded concurrency.
+
+    Jobs are claimed with a conditional UPDATE, so several processes can share
+    one table. A claimed job holds a lease; if the process dies the lease
+    expires and another worker picks the job up again.
+    """
+
+    def __init__(
+        self,
+        handler: Optional[Callable[[RCAJob], Awaitable[None]]] = None,
+        workers: int = 4,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 5.0,
+        lease_seconds: float = 600.0,
+        poll_seconds: float = 2.0,
+        max_pending: int = 1000,
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_pending = max_pending
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self, handler: Optional[Callable[[RCAJob], Awaitable[None]]] = None):
+        if handler is not None:
+            self.handler = handler
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after new jobs were committed."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def check_capacity(self, session: AsyncSession, incoming: int = 1):
+        """Raise QueueFullError if `incoming` more jobs would exceed max_pending."""
+        pending = await session.scalar(
+            select(func.count(RCAJob.id)).where(RCAJob.status.in_(["queued", "running"]))
+        )
+        if pending + incoming > self.max_pending:
+            raise QueueFullError(f"RCA queue is full ({pending} jobs pending)")
+
+    async def stats(self) -> dict:
+        async with async_session_maker() as session:
+            rows = await session.execute(
+                select(RCAJob.status, func.count(RCAJob.id)).group_by(RCAJob.status)
+            )
+            counts = {status: count for status, count in rows.all()}
+        return {"workers": len(self._tasks), "jobs": counts}
+
+    def _lease_expired(self, now: float, retryable: bool = True):
+        condition = (RCAJob.status == "running") & (RCAJob.lease_expires_at < now)
+        if retryable:
+            return condition & (RCAJob.attempts < self.max_attempts)
+        return condition & (RCAJob.attempts >= self.max_attempts)
+
+    async def _fail_exhausted(self, session: AsyncSession, now: float):
+        """Fail jobs whose lease expired on their last attempt, with the jobs waiting on them."""
+        exhausted = (await session.scalars(select(RCAJob.id).where(self._lease_expired(now, retryable=False)))).all()
+        for job_id in exhausted:
+            error = f"Lease expired after {self.max_attempts} attempts"
+            failed = await session.execute(
+                update(RCAJob)
+                .where(RCAJob.id == job_id)
+                .where(self._lease_expired(now, retryable=False))
+                .values(status="failed", finished_at=now, last_error=error)
+            )
+            if failed.rowcount != 1:
+                await session.rollback()  # Another worker failed it first
+                continue
+            members = (await session.scalars(
+                select(RCAJob.id).where(RCAJob.leader_id == job_id).where(RCAJob.status == "waiting")
+            )).all()
+            await session.execute(
+                update(RCAJob)
+                .where(RCAJob.leader_id == job_id)
+                .where(RCAJob.status == "waiting")
+                .values(status="failed", finished_at=now, last_error=error)
+            )
+            await session.commit()
+            rca_jobs.labels(outcome="failed").inc()
+            for failure_id in [job_id, *members]:
+                event_bus.publish(failure_id, "failed", {"error": error})
+            logger.error("RCA job failed: %s", error, extra={"failure_id": job_id, "will_retry": False})
+
+    async def _claim(self) -> Optional[RCAJob]:
+        now = time.time()
+        async with async_session_maker() as session:
+            await self._fail_exhausted(session, now)
+            candidates = await session.scalars(
+                select(RCAJob.id)
+                .where(or_(
+                    (RCAJob.status == "queued") & (RCAJob.available_at <= now),
+                    self._lease_expired(now),
+                ))
+                .order_by(RCAJob.available_at)
+                .limit(self.workers)
+            )
+            for job_id in candidates.all():
+                # Conditional update: only one worker (in any process) wins
+                claimed = await session.execute(
+                    update(RCAJob)
+                    .where(RCAJob.id == job_id)
+                    .where(or_(RCAJob.status == "queued", self._lease_expired(now)))
+                    .values(
+                        status="running",
+                        attempts=RCAJob.attempts + 1,
+                        lease_expires_at=now + self.lease_seconds
+                    )
+                )
+                await session.commit()
+                if claimed.rowcount == 1:
+                    job = await session.get(RCAJob, job_id)
+                    rca_job_wait_seconds.observe(max(0.0, now - job.available_at))
+                    return job
+        return None
+
+    async def _finish_failed(self, job: RCAJob, error: Exception):
+        retry = job.attempts < self.max_attempts
+        values = {"last_error": str(error)[:2000]}
+        if retry:
+            values.update(
+                status="queued",
+                available_at=time.time() + self.retry_backoff_seconds * (2 ** (job.attempts - 1))
+            )
+        else:
+            values.update(status="failed", finished_at=time.time())
+        members = []
+        async with async_session_maker() as session:
+            # Only a job still running is requeued: one whose result was committed stays done
+            updated = await session.execute(
+                update(RCAJob).where(RCAJob.id == job.id).where(RCAJob.status == "running").values(**values)
+            )
+            if updated.rowcount != 1:
+                logger.warning("RCA job error after it was finished, not retried: %s", error)
+                return
+            if not retry:
+                # Jobs sharing this RCA fail with it
+                members = (await session.scalars(
+                    select(RCAJob.id).where(RCAJob.leader_id == job.id).where(RCAJob.status == "waiting")
+                )).all()
+                await session.execute(
+                    update(RCAJob)
+                    .where(RCAJob.leader_id == job.id)
+                    .where(RCAJob.status == "waiting")
+                    .values(status="failed", finished_at=values["finished_at"], last_error=values["last_error"])
+                )
+            await session.commit()
+        rca_jobs.labels(outcome="retried" if retry else "failed").inc()
+        if retry:
+            event_bus.publish(job.id, "retrying", {
+                "attempt": job.attempts, "error": values["last_error"], "available_at": values["available_at"]
+            })
+        else:
+            for failure_id in [job.id, *members]:
+                event_bus.publish(failure_id, "failed", {"error": values["last_error"]})
+        logger.error("RCA job failed (attempt %d/%d): %s", job.attempts, self.max_attempts, error,
+                     extra={"attempts": job.attempts, "will_retry": retry})
+
+    async def _worker(self, n: int):
+        while True:
+            # Clear before claiming so a notify() during the claim is not lost
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.exception("RCA worker %d: claim failed", n)
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Logs written while handling the job carry its failure_id
+            token = failure_id_var.set(job.id)
+            rca_workers_busy.inc()
+            try:
+                await self.handler(job)
+                rca_jobs.labels(outcome="completed").inc()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                try:
+                    await self._finish_failed(job, e)
+                except Exception:
+                    # The lease expires and the job is claimed again; the worker lives on
+                    logger.exception("RCA worker %d: could not record job failure", n)
+            finally:
+                rca_workers_busy.dec()
+                failure_id_var.reset(token)
+
+
+rca_queue = RCAWorkerPool(
+    workers=settings.rca_workers,
+    max_attempts=settings.rca_max_attempts,
+    retry_backoff_seconds=settings.rca_retry_backoff_seconds,
+    lease_seconds=settings.rca_job_lease_seconds,
+    poll_seconds=settings.rca_queue_poll_seconds,
+    max_pending=settings.rca_queue_max_pending,
+)
@@ -0,0 +1,204 @@
+"""Token-budgeted error-region extraction for LLM prompts."""
+import io
+import re
+from collections import deque
+from typing import List, Optional, Tuple
+
+from core.config import settings
+from core.fingerprint import ANSI_RE, SECTION_RE
+
+# (pattern, weight): a line's score is the sum of the weights it matches
+LINE_SCORES = [
+    # Generic error markers
+    (re.compile(r"\b(ERROR|FATAL|FAILED|FAILURE)\b"), 3.0),
+    (re.compile(r"\b(error|failed|failure|fatal|exception|panic)\b", re.IGNORECASE), 1.5),
+    (re.compile(r"\b(denied|forbidden|unauthorized|expired|timed? ?out|not found|could not|cannot|unable to|refused)\b", re.IGNORECASE), 1.0),
+    # Exit codes
+    (re.compile(r"exit (?:code|status) [1-9]\d*|exited with (?:code )?[1-9]\d*|Job failed", re.IGNORECASE), 3.0),
+    # Stack traces
+    (re.compile(r"Traceback \(most recent call last\)|^\s*Caused by:|^\s+at [\w.$<>]+\(|^\w+(?:\.\w+)*(?:Error|Exception):"), 2.0),
+    # Tool-specific
+    (re.compile(r"^Error: |^│ Error: "), 2.0),  # terraform
+    (re.compile(r"npm ERR!|\[ERROR\]|BUILD FAILURE|Could not resolve dependencies"), 2.0),  # npm / maven
+    (re.compile(r"Tests run: \d+, Failures: [1-9]|AssertionError|expected:? .* but (?:was|got)", re.IGNORECASE), 2.0),  # tests
+    (re.compile(r"OOMKilled|Out of memory|Killed\b|code=\d{3}|permission denied|x509:|ImagePullBackOff"), 2.0),  # runtime / vault / docker
+    (re.compile(r"^\s*(?:\w+\.)?ya?ml:|mapping values are not allowed|did not find expected key"), 2.0),  # YAML
+]
+
+# Cheap literal pre-check on the lowercased line; must cover every LINE_SCORES
+# pattern. Most log lines fail it and are never run through LINE_SCORES.
+CANDIDATE_RE = re.compile(
+    r"error|fail|fatal|exception|panic|denied|forbidden|unauthori|expired|time|not found|"
+    r"could not|cannot|unable|refused|exit|traceback|caused by|killed|memory|code=|x509|"
+    r"imagepull|assert|expected|err!|yml:|yaml:|mapping values|did not find|^\s+at "
+)
+
+# Lines that look like errors but are routine runner output
+NOISE_RE = re.compile(
+    r"^(?:Running with gitlab-runner|Preparing|Getting source|Fetching changes|Checking out|"
+    r"Skipping|Downloading|Uploading artifacts|Cleaning up|Saving cache|Restoring cache|Executing \"step_)|"
+    r"ignore_errors|allow_failure|\b0 errors?\b|\bFailures: 0\b",
+    re.IGNORECASE,
+)
+
+MIN_LINE_SCORE = 1.0
+MAX_WINDOW_LINES = 40
+MAX_WINDOWS = 64
+MAX_LINE_CHARS = 500
+TAIL_LINES = 10
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for log text)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def score_line(line: str) -> float:
+    """Heuristic error value of a single (cleaned) log line."""
+    if not CANDIDATE_RE.search(line.lower()) or NOISE_RE.search(line):
+        return 0.0
+    return sum(weight for pattern, weight in LINE_SCORES if pattern.search(line))
+
+
+def clean_line(raw: str) -> str:
+    line = raw.rstrip("\r\n")
+    if "\x1b" in line or "section_" in line:
+        line = SECTION_RE.sub("", ANSI_RE.sub("", line))
+    # Carriage returns redraw progress bars; only the final state is visible
+    if "\r" in line:
+        line = line.rsplit("\r", 1)[-1]
+    line = line.rstrip()
+    if len(line) > MAX_LINE_CHARS:
+        line = line[:MAX_LINE_CHARS] + " ..."
+    return line
+
+
+class _Window:
+    """Consecutive log lines around one or more high-scoring lines."""
+    __slots__ = ("start", "lines", "score", "after", "hit")
+
+    def __init__(self, start: int, lines: List[str]):
+        self.start = start
+        self.lines = lines
+        self.score = 0.0
+        self.after = 0  # Trailing context lines still to collect
+        self.hit = len(lines) - 1  # Index of the first high-scoring line
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.lines)
+
+    def tokens(self) -> int:
+        return sum(estimate_tokens(line) for line in self.lines)
+
+
+def _scan(log: str, context_lines: int) -> Tuple[List[_Window], List[Tuple[int, str]], int]:
+    """Single pass: collect scored windows and the last lines of the log."""
+    windows: List[_Window] = []
+    before = deque(maxlen=context_lines)
+    tail = deque(maxlen=TAIL_LINES)
+    current: Optional[_Window] = None
+    previous = None
+    n = 0
+
+    for raw in io.StringIO(log):
+        line = clean_line(raw)
+        if not line.strip() or line == previous:
+            continue  # Blank and repeated lines carry no information
+        previous = line
+        tail.append((n, line))
+        score = score_line(line)
+
+        if current is not None:
+            current.lines.append(line)
+            if score >= MIN_LINE_SCORE:
+                current.score += score
+                current.after = context_lines
+            else:
+                current.after -= 1
+            if current.after <= 0 or len(current.lines) >= MAX_WINDOW_LINES:
+                windows.append(current)
+                current = None
+                if len(windows) > MAX_WINDOWS:
+                    windows.remove(min(windows, key=lambda w: w.score))
+        elif score >= MIN_LINE_SCORE:
+            current = _Window(n - len(before), list(before) + [line])
+            current.score = score
+            current.after = context_lines
+            before.clear()
+        else:
+            before.append(line)
+        n += 1
+
+    if current is not None:
+        windows.append(current)
+    return windows, list(tail), n
+
+
+def extract_error_regions(
+    log: str,
+    token_budget: Optional[int] = None,
+    context_lines: Optional[int] = None
+) -> str:
+    """The most informative parts of a log that fit in `token_budget` tokens.
+
+    ANSI escapes and GitLab section markers are stripped, lines are scored
+    with error heuristics and the best windows (hits plus surrounding
+    context) are packed into the budget, then the remaining budget goes to
+    the last lines of the log. Output keeps log order, with skipped spans
+    marked.
+    """
+    token_budget = token_budget or settings.llm_log_token_budget
+    context_lines = settings.llm_log_context_lines if context_lines is None else context_lines
+
+    windows, tail, total_lines = _scan(log, context_lines)
+
+    # Highest-value windows first; earlier ones win ties (first error matters most)
+    chosen: List[_Window] = []
+    used = 0
+    for window in sorted(windows, key=lambda w: (-w.score, w.start)):
+        cost = window.tokens()
+        if used + cost > token_budget:
+            continue
+        chosen.append(window)
+        used += cost
+
+    if windows and not chosen:
+        # Even the best window is too large: keep what fits from its first hit on
+        best = max(windows, key=lambda w: w.score)
+        best.start += best.hit
+        lines = []
+        for line in best.lines[best.hit:]:
+            if used + estimate_tokens(line) > token_budget:
+                break
+            lines.append(line)
+            used += estimate_tokens(line)
+        best.lines = lines
+        chosen.append(best)
+
+    # Fill what is left with the end of the log (job result, final errors)
+    covered = {n for window in chosen for n in range(window.start, window.end)}
+    tail_lines = []
+    for n, line in reversed(tail):
+        if n in covered:
+            continue
+        if used + estimate_tokens(line) > token_budget:
+            break
+        tail_lines.insert(0, (n, line))
+        used += estimate_tokens(line)
+
+    spans = [(window.start, window.lines) for window in chosen]
+    spans += [(n, [line]) for n, line in tail_lines]
+    spans.sort(key=lambda span: span[0])
+
+    output = []
+    position = 0
+    for start, lines in spans:
+        if start > position:
+            output.append(f"... [{start - position} lines skipped] ...")
+        output.extend(lines)
+        position = start + len(lines)
+    if position < total_lines and output:
+        output.append(f"... [{total_lines - position} lines skipped] ...")
+    return "\n".join(output)
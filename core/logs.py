@@ -0,0 +1,44 @@
+"""Structured (JSON) logging; every record carries the failure_id being analysed."""
+import logging
+import sys
+from contextvars import ContextVar
+from typing import Optional
+
+from core.config import settings
+
+# Set while a failure is analysed; copied into tasks and threads it starts
+failure_id_var: ContextVar[Optional[str]] = ContextVar("failure_id", default=None)
+
+
+class FailureIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "failure_id"):
+            record.failure_id = failure_id_var.get()
+        return True
+
+
+def configure_logging():
+    """Send app logs to stdout as JSON (LOG_FORMAT=json) or plain text."""
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        from pythonjsonlogger import jsonlogger
+
+        handler.setFormatter(jsonlogger.JsonFormatter(
+            "%(asctime)s %(levelname)s %(name)s %(message)s %(failure_id)s",
+            rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"}
+        ))
+    else:
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(failure_id)s] %(message)s"
+        ))
+    handler.addFilter(FailureIdFilter())
+
+    logger = logging.getLogger("ci_rca")
+    logger.handlers = [handler]
+    logger.setLevel(settings.log_level.upper())
+    logger.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the app's "ci_rca" namespace, e.g. get_logger("agents.classifier")."""
+    return logging.getLogger(f"ci_rca.{name}")
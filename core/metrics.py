@@ -0,0 +1,125 @@
+"""Prometheus metrics for the RCA pipeline, LLM calls, caches, GitLab and the job queue.
+
+Exposed in text format on GET /metrics.
+"""
+import re
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Seconds; LLM calls and whole analyses run from ~100 ms to over a minute
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# ============================================================
+# RCA PIPELINE
+# ============================================================
+
+rca_analysis_seconds = Histogram(
+    "rca_analysis_duration_seconds", "End-to-end RCA analysis time",
+    ["mode", "cache"], buckets=LATENCY_BUCKETS
+)
+rca_node_seconds = Histogram(
+    "rca_node_duration_seconds", "Time spent in each RCA graph node",
+    ["node"], buckets=LATENCY_BUCKETS
+)
+rca_node_errors = Counter(
+    "rca_node_errors_total", "RCA graph node executions that raised", ["node"]
+)
+signature_fast_path_hits = Counter(
+    "rca_signature_fast_path_total", "Parser LLM calls skipped by a signature match", ["agent"]
+)
+
+# ============================================================
+# LLM
+# ============================================================
+
+llm_request_seconds = Histogram(
+    "llm_request_duration_seconds", "Chat model call latency",
+    ["agent", "status"], buckets=LATENCY_BUCKETS
+)
+llm_tokens = Counter(
+    "llm_tokens_total", "Tokens used by chat model calls", ["agent", "type"]
+)
+llm_memo_lookups = Counter(
+    "llm_memo_lookups_total", "Agent LLM response memo lookups (memory_hit, disk_hit, miss)", ["agent", "result"]
+)
+llm_json_fallbacks = Counter(
+    "llm_json_fallbacks_total",
+    "LLM responses that were not plain JSON (extracted: JSON found in surrounding text; default: unparseable)",
+    ["agent", "kind"]
+)
+
+# ============================================================
+# CACHE / GITLAB / QUEUE
+# ============================================================
+
+rca_cache_lookups = Counter(
+    "rca_cache_lookups_total", "RCA result cache lookups", ["result"]
+)
+gitlab_request_seconds = Histogram(
+    "gitlab_request_duration_seconds", "GitLab API request latency (per attempt)",
+    ["endpoint", "status"], buckets=LATENCY_BUCKETS
+)
+gitlab_retries = Counter(
+    "gitlab_retries_total", "GitLab requests retried after a transient failure", ["endpoint"]
+)
+webhook_events = Counter(
+    "gitlab_webhook_events_total", "GitLab webhook deliveries (accepted, ignored, rejected)", ["event", "result"]
+)
+webhook_jobs = Counter(
+    "gitlab_webhook_jobs_total", "Failed jobs reported by webhooks (new, duplicate, queued, flush_failed)", ["result"]
+)
+gitlab_rate_limit_remaining = Gauge(
+    "gitlab_rate_limit_remaining", "RateLimit-Remaining of the latest GitLab response"
+)
+project_scans = Counter(
+    "gitlab_project_scans_total", "Project pipeline scans (busy, idle, error)", ["result"]
+)
+project_scan_lag_seconds = Histogram(
+    "gitlab_project_scan_lag_seconds", "Time a project scan started after it was due",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600)
+)
+tail_bytes = Counter(
+    "gitlab_trace_tail_bytes_total", "Trace bytes read while tailing running jobs"
+)
+provisional_rcas = Counter(
+    "rca_provisional_total", "Provisional RCAs of running jobs (started, confirmed, discarded, failed)", ["outcome"]
+)
+provisional_lead_seconds = Histogram(
+    "rca_provisional_lead_seconds", "Time a confirmed provisional RCA started before its job ended",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200, 2400)
+)
+rca_jobs = Counter(
+    "rca_jobs_total", "RCA queue job outcomes (completed, retried, failed)", ["outcome"]
+)
+rca_job_wait_seconds = Histogram(
+    "rca_job_wait_seconds", "Time from enqueue to a worker claiming the job",
+    buckets=LATENCY_BUCKETS
+)
+rca_jobs_by_status = Gauge(
+    "rca_queue_jobs", "RCA queue jobs by status (sampled on scrape)", ["status"]
+)
+rca_workers_busy = Gauge(
+    "rca_queue_workers_busy", "Workers currently running a job"
+)
+
+# ============================================================
+# SERVER-SENT EVENTS
+# ============================================================
+
+sse_subscribers = Gauge(
+    "sse_subscribers", "Open Server-Sent Events streams", ["stream"]
+)
+sse_events = Counter(
+    "sse_events_total", "RCA events published to SSE subscribers", ["event"]
+)
+
+_ID_SEGMENT_RE = re.compile(r"(?<=/projects/)[^/]+|(?<=/)\d+(?=/|$)")
+
+
+def endpoint_label(path: str) -> str:
+    """GitLab path with ids replaced, e.g. /projects/:id/jobs/:id/trace (bounded label values)."""
+    return _ID_SEGMENT_RE.sub(":id", path)
+
+
+def render_metrics() -> bytes:
+    return generate_latest()
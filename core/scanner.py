@@ -0,0 +1,288 @@
+"""Concurrent scanning of many GitLab projects for newly failed pipelines.
+
+Each project has a ProjectCursor: the pipelines up to `last_pipeline_id` are
+settled, so a scan only looks at newer ones. Scans run on a bounded number of
+slots, earliest-due project first; busy projects are rescheduled sooner and
+idle ones later. Every GitLab request of a scan (pages, jobs, traces) is
+paced from GitLab's RateLimit headers so the scanner spends only its share of
+the budget. Replicas sharing the database claim each scan with a conditional
+UPDATE of the cursor's next_scan_at, so a project is scanned by one at a time.
+"""
+import asyncio
+import heapq
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import update
+
+from core.config import settings
+from core.gitlab import gitlab_client, request_pacer
+from core.logs import get_logger
+from core.metrics import project_scan_lag_seconds, project_scans
+from db.database import async_session_maker
+from db.models import ProjectCursor
+
+logger = get_logger("core.scanner")
+
+# Pipelines that may still fail; the cursor does not move past them
+ACTIVE_PIPELINE_STATUSES = {"created", "waiting_for_resource", "preparing", "pending", "running"}
+
+# (project_id, pipeline_id, jobs) -> None; fetches traces and queues the RCA
+FailureHandler = Callable[[str, str, List[dict]], Awaitable[None]]
+# Job ids already handled elsewhere (webhooks, trace tailer)
+JobFilter = Callable[[object], bool]
+
+
+class ProjectScanner:
+    """Schedules pipeline scans of a set of projects within the GitLab rate limit.
+
+    A project's next scan is due `interval_seconds` after its last one; the
+    interval halves after a scan that found settled pipelines and grows by
+    half after an idle one, within [min_interval, max_interval]. Every project
+    holds at most one of the `concurrency` slots and settles at most
+    `max_pipelines` failed pipelines per scan, so a busy project cannot
+    starve the others; the rest waits for its next scan.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        min_interval: float = 60.0,
+        max_interval: float = 900.0,
+        max_pipelines: int = 10,
+        rate_limit_reserve: float = 0.2,
+        max_active_age: float = 86400.0,
+    ):
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_pipelines = max_pipelines
+        self.rate_limit_reserve = rate_limit_reserve
+        self.max_active_age = max_active_age
+        self.handler: Optional[FailureHandler] = None
+        self.skip_job: Optional[JobFilter] = None
+        self._cursors: Dict[str, ProjectCursor] = {}
+        self._due: List[tuple] = []  # Heap of (next_scan_at, project_id)
+        self._wake = asyncio.Event()
+        self._next_request = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._scans: set = set()
+
+    async def start(self, project_ids: List[str], handler: FailureHandler, skip_job: Optional[JobFilter] = None):
+        """Load (or create) the projects' cursors and start scheduling scans."""
+        self.handler, self.skip_job = handler, skip_job
+        now = time.time()
+        async with async_session_maker() as db:
+            for i, project_id in enumerate(project_ids):
+                cursor = await db.get(ProjectCursor, project_id)
+                if cursor is None:
+                    # Spread first scans over one interval instead of starting them all at once
+                    cursor = ProjectCursor(
+                        project_id=project_id,
+                        interval_seconds=self.min_interval,
+                        next_scan_at=now + self.min_interval * i / len(project_ids),
+                        seen_pipeline_ids=[],
+                        pipelines_scanned=0,
+                        failures_queued=0,
+                    )
+                    db.add(cursor)
+                self._cursors[project_id] = cursor
+                heapq.heappush(self._due, (cursor.next_scan_at or now, project_id))
+            await db.commit()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in list(self._scans):
+            task.cancel()
+        await asyncio.gather(*self._scans, return_exceptions=True)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    # ------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------
+
+    async def _run(self):
+        slots = asyncio.Semaphore(self.concurrency)
+        while True:
+            self._wake.clear()
+            if not self._due:
+                await self._wake.wait()
+                continue
+            delay = self._due[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await slots.acquire()
+            due, project_id = heapq.heappop(self._due)
+            project_scan_lag_seconds.observe(max(0.0, time.time() - due))
+            task = asyncio.create_task(self._scan_and_reschedule(project_id))
+            self._scans.add(task)
+
+            def release(task):
+                self._scans.discard(task)
+                slots.release()
+
+            task.add_done_callback(release)
+
+    async def _claim(self, project_id: str) -> Optional[ProjectCursor]:
+        """Take the project's due scan, or None if another replica has taken it.
+
+        The claim moves next_scan_at a max_interval ahead, so a replica that dies
+        mid-scan only delays the project. Either way the cursor is reloaded:
+        another replica may have moved it.
+        """
+        now = time.time()
+        async with async_session_maker() as db:
+            claimed = await db.execute(
+                update(ProjectCursor)
+                .where(ProjectCursor.project_id == project_id)
+                .where(ProjectCursor.next_scan_at <= now)
+                .values(next_scan_at=now + self.max_interval)
+            )
+            await db.commit()
+            cursor = await db.get(ProjectCursor, project_id)
+        if cursor is None:
+            return None
+        self._cursors[project_id] = cursor
+        return cursor if claimed.rowcount == 1 else None
+
+    async def _scan_and_reschedule(self, project_id: str):
+        try:
+            cursor = await self._claim(project_id)
+        except Exception as e:
+            logger.error("Could not claim scan of project %s: %s", project_id, e, extra={"project_id": project_id})
+            cursor = None
+        if cursor is None:
+            # Claimed elsewhere (or unreachable DB): check again when it is next due
+            cursor = self._cursors[project_id]
+            heapq.heappush(self._due, (max(cursor.next_scan_at or 0, time.time() + self.min_interval / 2), project_id))
+            self._wake.set()
+            return
+
+        # Every GitLab request made for this scan, including trace fetches by the handler, is paced
+        request_pacer.set(self._pace)
+        try:
+            settled = await self.scan(cursor)
+            cursor.last_error = None
+            if settled:
+                cursor.interval_seconds = max(self.min_interval, cursor.interval_seconds / 2)
+            else:
+                cursor.interval_seconds = min(self.max_interval, cursor.interval_seconds * 1.5)
+            project_scans.labels(result="busy" if settled else "idle").inc()
+        except Exception as e:
+            cursor.last_error = str(e)[:500]
+            cursor.interval_seconds = min(self.max_interval, cursor.interval_seconds * 2)
+            project_scans.labels(result="error").inc()
+            logger.warning("Scan of project %s failed: %s", project_id, e, extra={"project_id": project_id})
+
+        cursor.last_scan_at = time.time()
+        cursor.next_scan_at = cursor.last_scan_at + cursor.interval_seconds
+        try:
+            async with async_session_maker() as db:
+                await db.merge(cursor)
+                await db.commit()
+        except Exception as e:
+            logger.error("Could not save cursor of project %s: %s", project_id, e, extra={"project_id": project_id})
+        heapq.heappush(self._due, (cursor.next_scan_at, project_id))
+        self._wake.set()
+
+    async def _pace(self):
+        """Wait for the scanner's next request slot, spaced by the remaining rate-limit budget."""
+        interval = gitlab_client.request_interval(self.rate_limit_reserve)
+        now = time.monotonic()
+        slot = max(now, self._next_request)
+        self._next_request = slot + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    # ------------------------------------------------------------
+    # Scanning
+    # ------------------------------------------------------------
+
+    async def scan(self, cursor: ProjectCursor) -> int:
+        """Handle the project's pipelines settled since the last scan; returns how many."""
+        project_id = cursor.project_id
+        if cursor.last_pipeline_id is None:
+            # First scan: start from the newest pipeline instead of the project's history
+            latest = await gitlab_client.latest_pipeline(project_id)
+            cursor.last_pipeline_id = latest["id"] if latest else 0
+            return 0
+
+        pipelines = sorted(
+            await gitlab_client.pipelines_after(project_id, cursor.last_pipeline_id), key=lambda p: p["id"]
+        )
+        seen = set(cursor.seen_pipeline_ids or [])
+        settled = 0
+        failed = 0
+        try:
+            for pipeline in pipelines:
+                if pipeline["id"] in seen:
+                    continue
+                if pipeline["status"] in ACTIVE_PIPELINE_STATUSES and not self._stuck(pipeline):
+                    continue
+                if pipeline["status"] == "failed":
+                    if failed == self.max_pipelines:
+                        break
+                    failed += 1
+                    cursor.failures_queued = (cursor.failures_queued or 0) + await self._queue_failed_jobs(
+                        project_id, pipeline["id"]
+                    )
+                seen.add(pipeline["id"])
+                settled += 1
+        finally:
+            # Move the cursor over the settled prefix; remember the ones past a still active pipeline
+            for pipeline in pipelines:
+                if pipeline["id"] not in seen:
+                    break
+                cursor.last_pipeline_id = pipeline["id"]
+            cursor.seen_pipeline_ids = sorted(i for i in seen if i > cursor.last_pipeline_id)
+            cursor.pipelines_scanned = (cursor.pipelines_scanned or 0) + settled
+        return settled
+
+    def _stuck(self, pipeline: dict) -> bool:
+        """An active pipeline older than max_active_age (e.g. waiting on a manual job) no longer holds the cursor."""
+        if not self.max_active_age or not pipeline.get("created_at"):
+            return False
+        created = datetime.fromisoformat(pipeline["created_at"].replace("Z", "+00:00"))
+        return time.time() - created.timestamp() > self.max_active_age
+
+    async def _queue_failed_jobs(self, project_id: str, pipeline_id) -> int:
+        jobs = [
+            {
+                "project_id": project_id,
+                "pipeline_id": str(pipeline_id),
+                "job_id": job["id"],
+                "job_name": job["name"],
+                "stage": job.get("stage") or "unknown",
+            }
+            for job in await gitlab_client.pipeline_jobs(project_id, pipeline_id)
+            if job["status"] == "failed" and not (self.skip_job and self.skip_job(job["id"]))
+        ]
+        if jobs:
+            await self.handler(project_id, str(pipeline_id), jobs)
+        return len(jobs)
+
+    def snapshot(self) -> List[dict]:
+        return [cursor.to_dict() for cursor in sorted(self._cursors.values(), key=lambda c: c.next_scan_at or 0)]
+
+
+project_scanner = ProjectScanner(
+    concurrency=settings.scanner_concurrency,
+    min_interval=settings.scanner_min_interval_seconds,
+    max_interval=settings.scanner_max_interval_seconds,
+    max_pipelines=settings.scanner_max_pipelines_per_scan,
+    rate_limit_reserve=settings.scanner_rate_limit_reserve,
+    max_active_age=settings.scanner_max_active_pipeline_age_seconds,
+)
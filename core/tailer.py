@@ -0,0 +1,297 @@
+"""Live tailing of running jobs' traces with an early, provisional RCA.
+
+Each poll fetches only the bytes appended since the previous one (Range
+requests). Once a fatal line shows up, a provisional analysis starts while
+the job is still tearing down; it is confirmed (saved) if the job ends
+failed and discarded otherwise.
+"""
+import asyncio
+import codecs
+import re
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from core.config import settings
+from core.fingerprint import ANSI_RE, SECTION_RE
+from core.gitlab import GitLabError, gitlab_client
+from core.logs import get_logger
+from core.metrics import provisional_lead_seconds, provisional_rcas, tail_bytes
+from core.trace_reader import MAX_LINE_CHARS, TraceBuffer
+from core.webhooks import webhook_coalescer
+
+logger = get_logger("core.tailer")
+
+# Lines that mean the job is going to fail; generic "error" lines are too
+# common in healthy output to start an analysis on
+FATAL_LINE_RE = re.compile(
+    r"^ERROR: Job failed"
+    r"|^\s*(FAILED|FAIL)\b"
+    r"|\bfatal: "
+    r"|^Traceback \(most recent call last\)"
+    r"|\bBUILD FAILURE\b"
+    r"|^npm ERR!"
+    r"|^panic: "
+    r"|\bOOMKilled\b"
+    r"|\bSegmentation fault\b"
+    r"|\bexit(?:ed)? (?:with )?(?:code|status) [1-9]"
+    r"|\bTests run: \d+, Failures: [1-9]"
+    r"|\bError response from daemon\b"
+)
+
+ACTIVE_STATUSES = {"created", "pending", "running"}
+# Job lookups that will not succeed on a later poll (job deleted, access revoked)
+GONE_STATUS_CODES = {403, 404}
+
+AnalyzeHandler = Callable[["LiveTrace", str], Awaitable[dict]]
+ConfirmHandler = Callable[["LiveTrace", dict, str], Awaitable[None]]
+QueueHandler = Callable[["LiveTrace", str], Awaitable[None]]
+
+
+class LiveTrace:
+    """Read position and bounded content of one running job's trace."""
+
+    def __init__(self, project_id: str, job_id, job_name: str, stage: str, pipeline_id: str):
+        self.project_id = project_id
+        self.job_id = job_id
+        self.job_name = job_name
+        self.stage = stage
+        self.pipeline_id = pipeline_id
+        self.failure_id = str(uuid.uuid4())  # Of the provisional RCA, once it is confirmed
+        self.offset: Optional[int] = None  # Next byte to request; None before the first read
+        self.buffer = TraceBuffer(
+            tail_chars=settings.trace_tail_chars,
+            max_regions=settings.trace_max_regions,
+            context_lines=settings.trace_context_lines,
+        )
+        self.fatal_line: Optional[str] = None
+        self.provisional: Optional[asyncio.Task] = None
+        self.provisional_started: Optional[float] = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._carry = ""
+
+    def feed(self, data: bytes, start: int) -> bool:
+        """Consume bytes that begin at offset `start`; True when the first fatal line appears."""
+        if self.offset is None:
+            self.buffer.skipped_bytes = start
+        self.offset = start + len(data)
+        text = self._decoder.decode(data)
+        self.buffer.feed(text)
+        if self.fatal_line is not None:
+            return False
+
+        lines = (self._carry + text).split("\n")
+        self._carry = lines.pop()[-MAX_LINE_CHARS:]
+        for line in lines:
+            # Runners colour output and wrap steps in section markers; match on the plain text
+            line = SECTION_RE.sub("", ANSI_RE.sub("", line))
+            if FATAL_LINE_RE.search(line):
+                self.fatal_line = line.strip()[:500]
+                return True
+        return False
+
+    def log(self) -> str:
+        return self.buffer.render()
+
+    def snapshot(self) -> dict:
+        status = "none"
+        result = None
+        if self.provisional is not None:
+            if not self.provisional.done():
+                status = "running"
+            elif self.provisional.cancelled() or self.provisional.exception():
+                status = "failed"
+            else:
+                status = "ready"
+                result = self.provisional.result()
+        return {
+            "project_id": self.project_id,
+            "pipeline_id": self.pipeline_id,
+            "job_id": self.job_id,
+            "failure_id": self.failure_id,
+            "job_name": self.job_name,
+            "stage": self.stage,
+            "bytes_read": self.offset or 0,
+            "fatal_line": self.fatal_line,
+            "provisional_rca": status,
+            "error_type": result["parsed_errors"].get("error_type") if result else None,
+            "failure_category": result["failure_category"] if result else None,
+            "suggested_fix": result["suggested_fix"] if result else None,
+        }
+
+
+class TraceTailer:
+    """Polls running jobs, tails their traces and manages provisional RCAs.
+
+    Jobs come from the running-jobs lists of the configured projects (with
+    `discover`) and from `watch()` (e.g. webhook "running" job events). A
+    job that leaves the running list has its final status fetched: failed
+    jobs get their provisional RCA confirmed (or a regular queued RCA when
+    none was ready), anything else discards it. Finishing runs in its own
+    task, so waiting for a provisional RCA never holds up the polls.
+    """
+
+    def __init__(self, poll_seconds: float = 5.0, max_jobs: int = 50, discover: bool = True):
+        self.poll_seconds = poll_seconds
+        self.max_jobs = max_jobs
+        self.discover = discover
+        self.analyze: Optional[AnalyzeHandler] = None
+        self.confirm: Optional[ConfirmHandler] = None
+        self.queue: Optional[QueueHandler] = None
+        self._jobs: Dict[object, LiveTrace] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._finishing: set = set()
+
+    def start(self, analyze: AnalyzeHandler, confirm: ConfirmHandler, queue: QueueHandler):
+        self.analyze, self.confirm, self.queue = analyze, confirm, queue
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in list(self._finishing):
+            task.cancel()
+        await asyncio.gather(*self._finishing, return_exceptions=True)
+        for live in self._jobs.values():
+            if live.provisional is not None:
+                live.provisional.cancel()
+        self._jobs.clear()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def watch(self, project_id: str, job_id, job_name: str, stage: str, pipeline_id: str) -> bool:
+        """Start tailing a job; False if it is already tailed or the job limit is reached."""
+        if job_id in self._jobs or len(self._jobs) >= self.max_jobs:
+            return False
+        self._jobs[job_id] = LiveTrace(str(project_id), job_id, job_name, stage or "unknown", str(pipeline_id))
+        return True
+
+    def watching(self, job_id) -> bool:
+        return job_id in self._jobs
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error("Trace tailer poll failed: %s", e)
+            await asyncio.sleep(self.poll_seconds)
+
+    async def poll_once(self):
+        """Refresh the running-job lists, finish ended jobs and read new trace bytes."""
+        discovered = {str(project_id) for project_id in settings.project_ids} if self.discover else set()
+        projects = {live.project_id for live in self._jobs.values()} | discovered
+
+        for project_id in projects:
+            try:
+                running = {job["id"]: job for job in await gitlab_client.running_jobs(project_id)}
+            except GitLabError as e:
+                logger.warning("Running jobs of project %s unavailable: %s", project_id, e,
+                               extra={"project_id": project_id})
+                continue
+            if project_id in discovered:
+                for job in running.values():
+                    self.watch(project_id, job["id"], job["name"], job.get("stage"), job.get("pipeline", {}).get("id", ""))
+            ended = [
+                live for live in self._jobs.values()
+                if live.project_id == project_id and live.job_id not in running
+            ]
+            for live in ended:
+                try:
+                    status = (await gitlab_client.job(project_id, live.job_id))["status"]
+                except GitLabError as e:
+                    if e.status_code in GONE_STATUS_CODES:
+                        self._drop(live)
+                        logger.warning("Stopped tailing job %s: %s", live.job_id, e, extra={"job_id": live.job_id})
+                    else:
+                        logger.warning("Status of job %s unavailable: %s", live.job_id, e, extra={"job_id": live.job_id})
+                    continue
+                if status in ACTIVE_STATUSES:
+                    continue
+                await self._read(live)
+                self._release(live)
+                task = asyncio.create_task(self._finish_logged(live, status))
+                self._finishing.add(task)
+                task.add_done_callback(self._finishing.discard)
+
+        await asyncio.gather(*(self._read(live) for live in list(self._jobs.values())))
+
+    async def _read(self, live: LiveTrace):
+        try:
+            if live.offset is None and settings.gitlab_trace_range_bytes:
+                data, start = await gitlab_client.trace_range(
+                    live.project_id, live.job_id, last_bytes=settings.gitlab_trace_range_bytes
+                )
+            else:
+                data, start = await gitlab_client.trace_range(live.project_id, live.job_id, start=live.offset or 0)
+        except GitLabError as e:
+            logger.warning("Trace read failed for job %s: %s", live.job_id, e, extra={"job_id": live.job_id})
+            return
+        tail_bytes.inc(len(data))
+        if live.feed(data, start) and self.analyze is not None:
+            live.provisional_started = time.time()
+            live.provisional = asyncio.create_task(self.analyze(live, live.log()))
+            # Discarded analyses are never awaited; keep their errors from being reported as unhandled
+            live.provisional.add_done_callback(lambda task: task.cancelled() or task.exception())
+            provisional_rcas.labels(outcome="started").inc()
+            logger.info("Fatal line in running job %s; provisional RCA started", live.job_name,
+                        extra={"job_id": live.job_id, "fatal_line": live.fatal_line})
+
+    def _release(self, live: LiveTrace):
+        """Stop tailing an ended job; late webhook events and project scans must not queue it a second time."""
+        # Remembered first: already_queued() must find the job in one place or the other throughout
+        webhook_coalescer.remember([live.job_id])
+        self._jobs.pop(live.job_id, None)
+
+    def _drop(self, live: LiveTrace):
+        self._jobs.pop(live.job_id, None)
+        if live.provisional is not None:
+            live.provisional.cancel()
+
+    async def _finish_logged(self, live: LiveTrace, status: str):
+        try:
+            await self._finish(live, status)
+        except Exception as e:
+            logger.error("Could not finish tailed job %s: %s", live.job_id, e, extra={"job_id": live.job_id})
+
+    async def _finish(self, live: LiveTrace, status: str):
+        self._release(live)
+        result = None
+        if live.provisional is not None:
+            if status == "failed":
+                try:
+                    result = await live.provisional
+                except Exception as e:
+                    provisional_rcas.labels(outcome="failed").inc()
+                    logger.warning("Provisional RCA failed for job %s: %s", live.job_id, e)
+            else:
+                live.provisional.cancel()
+
+        if status != "failed":
+            if live.provisional is not None:
+                provisional_rcas.labels(outcome="discarded").inc()
+                logger.info("Job %s ended %s; provisional RCA discarded", live.job_name, status,
+                            extra={"job_id": live.job_id})
+            return
+
+        if result is not None:
+            provisional_lead_seconds.observe(time.time() - live.provisional_started)
+            await self.confirm(live, result, live.log())
+            provisional_rcas.labels(outcome="confirmed").inc()
+            logger.info("Job %s failed; provisional RCA confirmed", live.job_name, extra={"job_id": live.job_id})
+        else:
+            await self.queue(live, live.log())
+
+    def snapshot(self) -> List[dict]:
+        return [live.snapshot() for live in self._jobs.values()]
+
+
+trace_tailer = TraceTailer(
+    poll_seconds=settings.trace_tailer_poll_seconds,
+    max_jobs=settings.trace_tailer_max_jobs,
+    discover=settings.trace_tailer_discover,
+)
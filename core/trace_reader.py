@@ -0,0 +1,125 @@
+"""Bounded-memory view of streamed job traces: the tail plus early error regions."""
+from collections import deque
+from typing import List
+
+from core.fingerprint import ERROR_LINE_RE, strip_control
+
+MAX_LINE_CHARS = 8192
+
+
+class TraceBuffer:
+    """Consumes decoded trace text incrementally, keeping memory bounded.
+
+    Only the last `tail_chars` characters and up to `max_regions` error
+    regions (matching lines plus surrounding context) are retained, no matter
+    how large the trace is.
+    """
+
+    def __init__(
+        self,
+        tail_chars: int = 20000,
+        max_regions: int = 5,
+        context_lines: int = 5,
+        max_region_chars: int = 4000,
+    ):
+        self.tail_chars = tail_chars
+        self.max_regions = max_regions
+        self.context_lines = context_lines
+        self.max_region_chars = max_region_chars
+
+        self.total_chars = 0
+        self.skipped_bytes = 0  # Bytes before a Range request's start offset
+
+        self._tail = deque()
+        self._tail_len = 0
+        self._carry = ""
+        self._before = deque(maxlen=context_lines)
+        self._regions: List[List[str]] = []
+        self._region_chars = 0
+        self._after = 0
+
+    def feed(self, text: str):
+        """Add a decoded chunk of the trace."""
+        if not text:
+            return
+        self.total_chars += len(text)
+        self._append_tail(text)
+
+        lines = (self._carry + text).split("\n")
+        self._carry = lines.pop()
+        if len(self._carry) > MAX_LINE_CHARS:
+            # Pathological line without newlines: scan what we have, drop the rest
+            lines.append(self._carry[:MAX_LINE_CHARS])
+            self._carry = ""
+        for line in lines:
+            self._scan_line(line)
+
+    def close(self):
+        """Flush the final partial line."""
+        if self._carry:
+            self._scan_line(self._carry)
+            self._carry = ""
+
+    def _append_tail(self, text: str):
+        self._tail.append(text)
+        self._tail_len += len(text)
+        while self._tail_len - len(self._tail[0]) >= self.tail_chars:
+            self._tail_len -= len(self._tail.popleft())
+
+    def _scan_line(self, line: str):
+        if self._after > 0 and self._regions:
+            self._add_to_region(line)
+            self._after -= 1
+            if ERROR_LINE_RE.search(strip_control(line)):
+                self._after = self.context_lines
+            return
+
+        if len(self._regions) < self.max_regions and ERROR_LINE_RE.search(strip_control(line)):
+            self._regions.append(list(self._before))
+            self._region_chars = sum(len(l) + 1 for l in self._before)
+            self._add_to_region(line)
+            self._before.clear()
+            self._after = self.context_lines
+            return
+
+        self._before.append(line)
+
+    def _add_to_region(self, line: str):
+        if self._region_chars + len(line) + 1 <= self.max_region_chars:
+            self._regions[-1].append(line)
+            self._region_chars += len(line) + 1
+
+    @property
+    def truncated(self) -> bool:
+        return self.skipped_bytes > 0 or self.total_chars > self.tail_chars
+
+    def tail(self) -> str:
+        text = "".join(self._tail)
+        if len(text) <= self.tail_chars:
+            return text
+        # Start the tail on a line boundary
+        text = text[-self.tail_chars:]
+        newline = text.find("\n")
+        return text[newline + 1:] if 0 <= newline < len(text) - 1 else text
+
+    def render(self) -> str:
+        """Error regions that fell out of the tail, followed by the tail."""
+        tail = self.tail()
+        if not self.truncated:
+            return tail
+
+        parts = []
+        for region in self._regions:
+            region_text = "\n".join(region)
+            if region_text and region_text not in tail:
+                parts.append(region_text)
+
+        omitted = self.total_chars - len(tail)
+        header = f"... [{omitted} chars omitted"
+        if self.skipped_bytes:
+            header += f", {self.skipped_bytes} leading bytes not downloaded"
+        header += "] ..."
+
+        if parts:
+            return "\n".join([header, *parts, "... [log tail] ...", tail])
+        return "\n".join([header, tail])
@@ -0,0 +1,171 @@
+"""GitLab webhook ingestion: token check and per-pipeline coalescing of failed jobs."""
+import asyncio
+import hmac
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from core.config import settings
+from core.logs import get_logger
+from core.metrics import webhook_jobs
+
+logger = get_logger("core.webhooks")
+
+# (project_id, pipeline_id, jobs) -> None; fetches traces and queues the RCA
+FlushHandler = Callable[[str, str, List[dict]], Awaitable[None]]
+
+
+def verify_token(received: Optional[str], secret: str) -> bool:
+    """Constant-time X-Gitlab-Token check; always False while no secret is configured."""
+    if not secret or received is None:
+        return False
+    return hmac.compare_digest(received.encode("utf-8"), secret.encode("utf-8"))
+
+
+def jobs_from_event(event: dict, status: str = "failed") -> List[dict]:
+    """Jobs a Job ("build") or Pipeline event reports in `status`.
+
+    Each job is {"project_id", "pipeline_id", "job_id", "job_name", "stage"};
+    other events (and jobs in any other state) yield nothing.
+    """
+    kind = event.get("object_kind")
+    if kind == "build":
+        if event.get("build_status") != status:
+            return []
+        return [{
+            "project_id": str(event["project_id"]),
+            "pipeline_id": str(event["pipeline_id"]),
+            "job_id": event["build_id"],
+            "job_name": event["build_name"],
+            "stage": event.get("build_stage") or "unknown",
+        }]
+    if kind == "pipeline":
+        project_id = str(event["project"]["id"])
+        pipeline_id = str(event["object_attributes"]["id"])
+        return [
+            {
+                "project_id": project_id,
+                "pipeline_id": pipeline_id,
+                "job_id": build["id"],
+                "job_name": build["name"],
+                "stage": build.get("stage") or "unknown",
+            }
+            for build in event.get("builds") or []
+            if build.get("status") == status
+        ]
+    return []
+
+
+class WebhookCoalescer:
+    """Collects failed jobs per pipeline and hands them on once the burst is over.
+
+    A pipeline's batch is flushed `debounce_seconds` after its last new job,
+    or `max_wait_seconds` after its first, so a matrix failing shard by shard
+    becomes one flush the handler can cluster. Flushed job ids are remembered,
+    so a Pipeline event repeating earlier Job events queues nothing; a batch
+    whose handler raised is forgotten, so a later event can retry it.
+    """
+
+    def __init__(
+        self,
+        handler: Optional[FlushHandler] = None,
+        debounce_seconds: float = 3.0,
+        max_wait_seconds: float = 15.0,
+        remember_jobs: int = 10000,
+    ):
+        self.handler = handler
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.remember_jobs = remember_jobs
+        self._pending: Dict[tuple, dict] = {}
+        self._flushed: "OrderedDict[object, None]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self, handler: Optional[FlushHandler] = None):
+        if handler is not None:
+            self.handler = handler
+
+    def add(self, jobs: List[dict]) -> int:
+        """Add failed jobs from one event; returns how many were not seen before."""
+        added = 0
+        now = time.monotonic()
+        for job in jobs:
+            key = (job["project_id"], job["pipeline_id"])
+            batch = self._pending.get(key)
+            if job["job_id"] in self._flushed or (batch and job["job_id"] in batch["jobs"]):
+                webhook_jobs.labels(result="duplicate").inc()
+                continue
+            if batch is None:
+                batch = self._pending[key] = {"jobs": {}, "first": now, "last": now}
+                batch["task"] = asyncio.create_task(self._flush_when_quiet(key))
+                self._tasks.add(batch["task"])
+                batch["task"].add_done_callback(self._tasks.discard)
+            batch["jobs"][job["job_id"]] = job
+            batch["last"] = now
+            added += 1
+            webhook_jobs.labels(result="new").inc()
+        return added
+
+    def seen(self, job_id) -> bool:
+        """True if the job is pending or was handed on already."""
+        return job_id in self._flushed or any(job_id in batch["jobs"] for batch in self._pending.values())
+
+    def remember(self, job_ids):
+        """Record jobs queued by another source (e.g. the project scanner) so events for them are ignored."""
+        for job_id in job_ids:
+            self._flushed[job_id] = None
+        while len(self._flushed) > self.remember_jobs:
+            self._flushed.popitem(last=False)
+
+    def forget(self, job_ids):
+        """Let later events queue these jobs again (e.g. their trace could not be fetched)."""
+        for job_id in job_ids:
+            self._flushed.pop(job_id, None)
+
+    async def _flush_when_quiet(self, key: tuple):
+        batch = self._pending[key]
+        while True:
+            deadline = min(batch["last"] + self.debounce_seconds, batch["first"] + self.max_wait_seconds)
+            delay = deadline - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await self.flush(key)
+
+    async def flush(self, key: tuple):
+        """Hand one pipeline's pending jobs to the handler."""
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        jobs = list(batch["jobs"].values())
+        self.remember(batch["jobs"])
+
+        project_id, pipeline_id = key
+        try:
+            await self.handler(project_id, pipeline_id, jobs)
+            webhook_jobs.labels(result="queued").inc(len(jobs))
+        except Exception as e:
+            self.forget(batch["jobs"])
+            webhook_jobs.labels(result="flush_failed").inc(len(jobs))
+            logger.error("Webhook flush failed for pipeline %s: %s", pipeline_id, e,
+                         extra={"project_id": project_id, "pipeline_id": pipeline_id, "jobs": len(jobs)})
+
+    async def stop(self):
+        """Flush every pending batch now and wait for flushes in progress (app shutdown)."""
+        for batch in self._pending.values():
+            batch["task"].cancel()
+        await asyncio.gather(*(self.flush(key) for key in list(self._pending)))
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending_pipelines": len(self._pending),
+            "pending_jobs": sum(len(batch["jobs"]) for batch in self._pending.values()),
+            "remembered_jobs": len(self._flushed),
+        }
+
+
+webhook_coalescer = WebhookCoalescer(
+    debounce_seconds=settings.webhook_debounce_seconds,
+    max_wait_seconds=settings.webhook_max_wait_seconds,
+)
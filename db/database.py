@@ -1,15 +1,75 @@
 """Database session management."""
+from sqlalchemy import DateTime, inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from core.config import settings
 from db.models import Base
+from db.search import create_search_index
 
 engine = create_async_engine(settings.database_url, echo=False)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# PRAGMA user_version of an SQLite database whose datetimes were normalized
+SQLITE_DATETIMES_NORMALIZED = 1
+
+def _add_missing_columns(conn):
+    """ALTER TABLE ... ADD COLUMN for model columns an existing table lacks.
+    
+    create_all only creates missing tables, so databases from before a column
+    was added would fail on their first query. Added columns are nullable;
+    code reading them treats NULL as "not computed yet".
+    """
+    inspector = inspect(conn)
+    preparer = conn.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            conn.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=conn.dialect)}"
+            ))
+
+def _normalize_sqlite_datetimes(conn):
+    """Give second-precision SQLite timestamps a fractional part.
+    
+    SQLite compares datetimes as text. Rows written by CURRENT_TIMESTAMP
+    (server defaults, databases from before created_at was set client-side)
+    lack the ".ffffff" SQLAlchemy writes, so they would sort before equal
+    keyset cursor values.
+    
+    Runs once per database: the user_version pragma records that it did, and
+    ci_failures rows are written with a client-side created_at since.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    if conn.execute(text("PRAGMA user_version")).scalar() >= SQLITE_DATETIMES_NORMALIZED:
+        return
+    preparer = conn.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if isinstance(column.type, DateTime):
+                name = preparer.format_column(column)
+                conn.execute(text(
+                    f"UPDATE {preparer.format_table(table)} SET {name} = {name} || '.000000' "
+                    f"WHERE length({name}) = 19"
+                ))
+    conn.execute(text(f"PRAGMA user_version = {SQLITE_DATETIMES_NORMALIZED}"))
+
+def _create_missing_indexes(conn):
+    # create_all skips indexes of tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
 async def init_db():
     """Initialize database tables."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_normalize_sqlite_datetimes)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(create_search_index)
 
 async def get_session() -> AsyncSession:
     """Get database session."""
@@ -1,12 +1,22 @@
 """Database models for storing CI failures and RCA results."""
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, JSON, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 
 Base = declarative_base()
 
+def utcnow():
+    return datetime.now(timezone.utc)
+
 class CIFailure(Base):
     __tablename__ = "ci_failures"
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), alone or after an equality filter
+        Index("ix_ci_failures_created_id", "created_at", "id"),
+        Index("ix_ci_failures_category_created_id", "failure_category", "created_at", "id"),
+        Index("ix_ci_failures_project_created_id", "project_name", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     failure_id = Column(String, unique=True, index=True)
@@ -18,8 +28,10 @@ class CIFailure(Base):
     stage = Column(String)
     job_status = Column(String)
     
-    # Log Content
+    # Log Content: full log in the blob store; raw_log only for rows written before it
     raw_log = Column(Text)
+    log_ref = Column(String, index=True)  # sha256 of the log in core.blobstore.log_store
+    log_size = Column(Integer)  # Uncompressed bytes
     
     # RCA Results
     error_type = Column(String)
@@ -32,11 +44,18 @@ class CIFailure(Base):
     
     # Similar Cases
     similar_cases = Column(JSON)  # List of similar failure IDs
+    similarity_scores = Column(JSON)  # error_type -> BM25 score
     seen_count = Column(Integer, default=0)
     
     # Metadata
+    log_fingerprint = Column(String, index=True)
+    rca_source_id = Column(String, index=True)  # failure_id whose RCA this row shares (same-cause jobs)
+    minhash = Column(JSON)  # MinHash signature of the normalized error region
+    failure_group_id = Column(String, index=True)  # Near-duplicate group (failure_id of its first member)
     processing_time_ms = Column(Integer)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    agent_timings = Column(JSON)  # Node -> duration_ms, llm_calls, llm_ms, prompt/completion tokens
+    # Set client-side (microseconds) so keyset cursors compare exactly with stored values
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     
     def to_dict(self):
         return {
@@ -47,6 +66,7 @@ class CIFailure(Base):
             "job_name": self.job_name,
             "stage": self.stage,
             "job_status": self.job_status,
+            "log_size": self.log_size,
             "error_type": self.error_type,
             "error_keywords": self.error_keywords,
             "failure_category": self.failure_category,
@@ -55,7 +75,163 @@ class CIFailure(Base):
             "fix_commands": self.fix_commands,
             "confidence": self.confidence,
             "similar_cases": self.similar_cases,
+            "similarity_scores": self.similarity_scores,
             "seen_count": self.seen_count,
+            "log_fingerprint": self.log_fingerprint,
+            "rca_source_id": self.rca_source_id,
+            "failure_group_id": self.failure_group_id,
             "processing_time_ms": self.processing_time_ms,
+            "agent_timings": self.agent_timings,
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
+
+
+class RCACacheEntry(Base):
+    """Persisted RCA results keyed by normalized log fingerprint."""
+    __tablename__ = "rca_cache"
+    
+    fingerprint = Column(String, primary_key=True)
+    kb_version = Column(String)
+    
+    # Denormalized for inspection; the full result lives in payload
+    error_type = Column(String)
+    failure_category = Column(String)
+    payload = Column(JSON)
+    
+    stored_at = Column(Float)  # Unix timestamp, used for TTL
+    hit_count = Column(Integer, default=0)
+
+
+class KnowledgeEntry(Base):
+    """Persisted knowledge base entry, grown from analysed failures."""
+    __tablename__ = "knowledge_entries"
+    
+    id = Column(Integer, primary_key=True)
+    error_type = Column(String, unique=True, index=True)
+    category = Column(String)
+    description = Column(Text)
+    fix = Column(Text)
+    commands = Column(JSON)
+    seen_count = Column(Integer, default=0)
+    
+    # active: used for retrieval | candidate: below promotion threshold
+    # merged: folded into merged_into | retired: hidden by a curator
+    status = Column(String, default="active", index=True)
+    merged_into = Column(String)
+    curated = Column(Boolean, default=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def to_kb_item(self):
+        """Shape used by KNOWLEDGE_BASE and the retrieval index."""
+        return {
+            "error_type": self.error_type,
+            "category": self.category,
+            "description": self.description,
+            "fix": self.fix,
+            "commands": self.commands or [],
+            "seen_count": self.seen_count or 0
+        }
+    
+    def to_dict(self):
+        return {
+            **self.to_kb_item(),
+            "status": self.status,
+            "merged_into": self.merged_into,
+            "curated": self.curated,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class RCAJob(Base):
+    """Durable RCA work item; the id becomes the resulting CIFailure.failure_id."""
+    __tablename__ = "rca_jobs"
+    
+    id = Column(String, primary_key=True)
+    status = Column(String, default="queued", index=True)  # queued, running, waiting, done, failed
+    leader_id = Column(String, index=True)  # Waiting jobs reuse the RCA of this job
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text)
+    
+    # Analysis input
+    payload = Column(JSON)  # pipeline_id, project_name, job_name, stage, job_status
+    raw_log = Column(Text)
+    
+    # Scheduling (Unix timestamps)
+    available_at = Column(Float, index=True)  # Not claimable before this (retry backoff)
+    lease_expires_at = Column(Float)  # Running jobs past their lease are reclaimed
+    finished_at = Column(Float)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def to_dict(self):
+        return {
+            "failure_id": self.id,
+            "status": self.status,
+            "rca_source_id": self.leader_id,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class ProjectCursor(Base):
+    """Scan position and schedule of one GitLab project (core/scanner.py)."""
+    __tablename__ = "project_cursors"
+    
+    project_id = Column(String, primary_key=True)
+    # Every pipeline up to this id is settled; newer ones already handled are in seen_pipeline_ids
+    last_pipeline_id = Column(Integer)
+    seen_pipeline_ids = Column(JSON)
+    
+    # Scheduling (Unix timestamps); the interval adapts to how busy the project is
+    interval_seconds = Column(Float)
+    next_scan_at = Column(Float)
+    last_scan_at = Column(Float)
+    last_error = Column(Text)
+    
+    pipelines_scanned = Column(Integer, default=0)
+    failures_queued = Column(Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            "project_id": self.project_id,
+            "last_pipeline_id": self.last_pipeline_id,
+            "interval_seconds": self.interval_seconds,
+            "next_scan_at": self.next_scan_at,
+            "last_scan_at": self.last_scan_at,
+            "last_error": self.last_error,
+            "pipelines_scanned": self.pipelines_scanned,
+            "failures_queued": self.failures_queued
+        }
+
+
+class MetricsRollup(Base):
+    """Failure counts and latency histogram per hour, project and category.
+
+    Maintained incrementally in the transaction that inserts CIFailure rows
+    (see db/rollups.py), so dashboards never aggregate the full table.
+    """
+    __tablename__ = "metrics_rollup"
+    
+    hour = Column(Integer, primary_key=True)  # Unix timestamp of the start of the hour (UTC)
+    project_name = Column(String, primary_key=True)
+    failure_category = Column(String, primary_key=True)
+    
+    failure_count = Column(Integer, default=0)
+    processing_time_sum = Column(Integer, default=0)  # ms
+    processing_time_count = Column(Integer, default=0)  # Rows with a processing time
+    confidence_sum = Column(Float, default=0.0)
+    
+    # Processing time histogram: count of failures with time <= bound (ms)
+    latency_le_100 = Column(Integer, default=0)
+    latency_le_250 = Column(Integer, default=0)
+    latency_le_500 = Column(Integer, default=0)
+    latency_le_1000 = Column(Integer, default=0)
+    latency_le_2500 = Column(Integer, default=0)
+    latency_le_5000 = Column(Integer, default=0)
+    latency_le_10000 = Column(Integer, default=0)
+    latency_le_30000 = Column(Integer, default=0)
+    latency_le_inf = Column(Integer, default=0)
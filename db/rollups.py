@@ -0,0 +1,230 @@
+"""Incremental metrics rollups (hour x project x category) over ci_failures."""
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import CIFailure, MetricsRollup
+
+HOUR = 3600
+
+# Histogram upper bounds (ms) and their columns; the last bin is unbounded
+LATENCY_BINS: List[Tuple[float, str]] = [
+    (100, "latency_le_100"),
+    (250, "latency_le_250"),
+    (500, "latency_le_500"),
+    (1000, "latency_le_1000"),
+    (2500, "latency_le_2500"),
+    (5000, "latency_le_5000"),
+    (10000, "latency_le_10000"),
+    (30000, "latency_le_30000"),
+    (float("inf"), "latency_le_inf"),
+]
+
+COUNTER_COLUMNS = [
+    "failure_count",
+    "processing_time_sum",
+    "processing_time_count",
+    "confidence_sum",
+] + [column for _, column in LATENCY_BINS]
+
+DIALECT_INSERTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
+
+def hour_of(timestamp: float) -> int:
+    return int(timestamp) // HOUR * HOUR
+
+
+def latency_column(processing_time_ms: float) -> str:
+    for bound, column in LATENCY_BINS:
+        if processing_time_ms <= bound:
+            return column
+    return LATENCY_BINS[-1][1]
+
+
+def _aggregate(rows) -> Dict[tuple, dict]:
+    """Fold (hour, project, category, processing_time_ms, confidence) rows into rollup deltas."""
+    deltas: Dict[tuple, dict] = {}
+    for hour, project, category, processing_time_ms, confidence in rows:
+        key = (hour, project or "", category or "Unknown")
+        delta = deltas.setdefault(key, dict.fromkeys(COUNTER_COLUMNS, 0))
+        delta["failure_count"] += 1
+        delta["confidence_sum"] += confidence or 0.0
+        if processing_time_ms is not None:
+            delta["processing_time_sum"] += processing_time_ms
+            delta["processing_time_count"] += 1
+            delta[latency_column(processing_time_ms)] += 1
+    return deltas
+
+
+async def _apply(session: AsyncSession, deltas: Dict[tuple, dict]):
+    """Add deltas to the rollup with one upsert statement."""
+    if not deltas:
+        return
+    values = [
+        {"hour": hour, "project_name": project, "failure_category": category, **delta}
+        for (hour, project, category), delta in deltas.items()
+    ]
+    insert = DIALECT_INSERTS.get(session.bind.dialect.name)
+    if insert is not None:
+        statement = insert(MetricsRollup).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["hour", "project_name", "failure_category"],
+            set_={
+                column: getattr(MetricsRollup, column) + getattr(statement.excluded, column)
+                for column in COUNTER_COLUMNS
+            }
+        )
+        await session.execute(statement)
+        return
+
+    # Other databases: read-modify-write inside the caller's transaction
+    for value in values:
+        row = await session.get(MetricsRollup, (value["hour"], value["project_name"], value["failure_category"]))
+        if row is None:
+            session.add(MetricsRollup(**value))
+        else:
+            for column in COUNTER_COLUMNS:
+                setattr(row, column, (getattr(row, column) or 0) + value[column])
+
+
+async def record_failure_metrics(session: AsyncSession, failures: List[CIFailure]):
+    """Count new failures in the rollup, inside the transaction that inserts them."""
+    hour = hour_of(time.time())
+    await _apply(session, _aggregate(
+        (hour, f.project_name, f.failure_category, f.processing_time_ms, f.confidence)
+        for f in failures
+    ))
+
+
+async def backfill_rollups(session: AsyncSession, batch_size: int = 5000) -> int:
+    """Build the rollup from existing failures when it is empty (startup)."""
+    if await session.scalar(select(func.count()).select_from(MetricsRollup)):
+        return 0
+    result = await session.stream(
+        select(
+            CIFailure.created_at,
+            CIFailure.project_name,
+            CIFailure.failure_category,
+            CIFailure.processing_time_ms,
+            CIFailure.confidence
+        ).execution_options(yield_per=batch_size)
+    )
+    deltas: Dict[tuple, dict] = {}
+    total = 0
+    async for partition in result.partitions():
+        rows = [
+            (hour_of(_timestamp(created_at)), project, category, processing_time_ms, confidence)
+            for created_at, project, category, processing_time_ms, confidence in partition
+        ]
+        total += len(rows)
+        for key, delta in _aggregate(rows).items():
+            merged = deltas.setdefault(key, dict.fromkeys(COUNTER_COLUMNS, 0))
+            for column in COUNTER_COLUMNS:
+                merged[column] += delta[column]
+    await _apply(session, deltas)
+    await session.commit()
+    return total
+
+
+def _timestamp(created_at: Optional[datetime]) -> float:
+    if created_at is None:
+        return time.time()
+    if created_at.tzinfo is None:
+        # SQLite returns naive UTC timestamps
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+def histogram_percentile(counts: List[int], q: float) -> Optional[float]:
+    """Approximate percentile (ms) as the upper bound of the bin that contains it."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    for (bound, _), count in zip(LATENCY_BINS, counts):
+        cumulative += count
+        if cumulative >= rank:
+            # The unbounded bin reports the largest finite bound
+            return bound if bound != float("inf") else LATENCY_BINS[-2][0]
+    return LATENCY_BINS[-2][0]
+
+
+def _sums():
+    return [func.sum(getattr(MetricsRollup, column)).label(column) for column in COUNTER_COLUMNS]
+
+
+def _histogram(row) -> List[int]:
+    return [getattr(row, column) or 0 for _, column in LATENCY_BINS]
+
+
+async def rollup_summary(session: AsyncSession) -> dict:
+    """Totals, average latency, percentiles and category breakdown (one query over buckets)."""
+    rows = (await session.execute(
+        select(MetricsRollup.failure_category, *_sums()).group_by(MetricsRollup.failure_category)
+    )).all()
+
+    total = sum(row.failure_count or 0 for row in rows)
+    time_sum = sum(row.processing_time_sum or 0 for row in rows)
+    time_count = sum(row.processing_time_count or 0 for row in rows)
+    histogram = [sum(counts) for counts in zip(*(_histogram(row) for row in rows))] if rows else []
+    return {
+        "total_failures": total,
+        "avg_processing_time_ms": time_sum / time_count if time_count else 0.0,
+        "category_breakdown": {row.failure_category: row.failure_count for row in rows},
+        "p50_processing_time_ms": histogram_percentile(histogram, 0.5),
+        "p95_processing_time_ms": histogram_percentile(histogram, 0.95),
+    }
+
+
+async def rollup_timeseries(
+    session: AsyncSession,
+    start: int,
+    end: int,
+    step_seconds: int,
+    project: Optional[str] = None,
+    category: Optional[str] = None
+) -> List[dict]:
+    """Failure counts and latency per `step_seconds` bucket in [start, end)."""
+    bucket = (MetricsRollup.hour // step_seconds * step_seconds).label("bucket")
+    query = (
+        select(bucket, MetricsRollup.failure_category, *_sums())
+        .where(MetricsRollup.hour >= hour_of(start), MetricsRollup.hour < end)
+        .group_by(bucket, MetricsRollup.failure_category)
+        .order_by(bucket)
+    )
+    if project:
+        query = query.where(MetricsRollup.project_name == project)
+    if category:
+        query = query.where(MetricsRollup.failure_category == category)
+
+    points: Dict[int, dict] = {}
+    for row in (await session.execute(query)).all():
+        point = points.setdefault(int(row.bucket), {
+            "failures": 0, "time_sum": 0, "time_count": 0,
+            "histogram": [0] * len(LATENCY_BINS), "categories": {}
+        })
+        point["failures"] += row.failure_count or 0
+        point["time_sum"] += row.processing_time_sum or 0
+        point["time_count"] += row.processing_time_count or 0
+        point["histogram"] = [a + b for a, b in zip(point["histogram"], _histogram(row))]
+        point["categories"][row.failure_category] = row.failure_count or 0
+
+    return [
+        {
+            "bucket_start": datetime.fromtimestamp(bucket_start, timezone.utc).isoformat(),
+            "failures": point["failures"],
+            "avg_processing_time_ms": point["time_sum"] / point["time_count"] if point["time_count"] else None,
+            "p95_processing_time_ms": histogram_percentile(point["histogram"], 0.95),
+            "categories": point["categories"],
+        }
+        for bucket_start, point in sorted(points.items())
+    ]
@@ -0,0 +1,280 @@
+"""Full-text search over stored failures (SQLite FTS5 / PostgreSQL tsvector).
+
+The index lives next to ci_failures, keyed by CIFailure.id, and is written in
+the same transaction that inserts the failures. Indexed fields, by weight:
+error type and keywords, root cause, suggested fix and the log's error regions.
+"""
+import asyncio
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.blobstore import log_store
+from core.config import settings
+from core.log_extract import extract_error_regions
+from core.logs import get_logger
+from db.models import CIFailure
+
+logger = get_logger("db.search")
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_TOKENS = 24
+
+TERM_RE = re.compile(r"\w+\*?")
+
+# ============================================================
+# SCHEMA
+# ============================================================
+
+SQLITE_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS failure_search USING fts5(
+        error_type, root_cause, suggested_fix, error_keywords, log_text,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    # Column weights for ORDER BY rank (persisted in the FTS5 config table)
+    "INSERT INTO failure_search(failure_search, rank) VALUES ('rank', 'bm25(5.0, 3.0, 1.0, 4.0, 1.0)')",
+]
+
+POSTGRESQL_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS failure_search (
+        id INTEGER PRIMARY KEY REFERENCES ci_failures(id) ON DELETE CASCADE,
+        content TEXT,
+        document TSVECTOR
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_failure_search_document ON failure_search USING GIN (document)",
+]
+
+SQLITE_INSERT = """
+    INSERT INTO failure_search (rowid, error_type, root_cause, suggested_fix, error_keywords, log_text)
+    VALUES (:id, :error_type, :root_cause, :suggested_fix, :error_keywords, :log_text)
+"""
+
+POSTGRESQL_INSERT = """
+    INSERT INTO failure_search (id, content, document)
+    VALUES (
+        :id,
+        :root_cause || E'\\n' || :log_text,
+        setweight(to_tsvector('english', :error_type || ' ' || :error_keywords), 'A')
+        || setweight(to_tsvector('english', :root_cause), 'B')
+        || setweight(to_tsvector('english', :suggested_fix || ' ' || :log_text), 'C')
+    )
+    ON CONFLICT (id) DO NOTHING
+"""
+
+
+def create_search_index(conn):
+    """Create the dialect's full-text index (run from init_db)."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'failure_search'"
+        ).first()
+        if not exists:
+            for statement in SQLITE_SCHEMA:
+                conn.exec_driver_sql(statement)
+    elif dialect == "postgresql":
+        for statement in POSTGRESQL_SCHEMA:
+            conn.exec_driver_sql(statement)
+    else:
+        logger.warning("Full-text search is not supported on %s", dialect)
+
+
+def search_supported(session: AsyncSession) -> bool:
+    return session.bind.dialect.name in ("sqlite", "postgresql")
+
+# ============================================================
+# INDEXING
+# ============================================================
+
+def search_document(failure: CIFailure, raw_log: str) -> dict:
+    """Index row for a failure; the log is reduced to its error regions unless the budget is 0."""
+    budget = settings.search_log_token_budget
+    return {
+        "id": failure.id,
+        "error_type": failure.error_type or "",
+        "root_cause": failure.root_cause or "",
+        "suggested_fix": failure.suggested_fix or "",
+        "error_keywords": " ".join(failure.error_keywords or []),
+        "log_text": extract_error_regions(raw_log, token_budget=budget) if budget else raw_log,
+    }
+
+
+async def index_failures(session: AsyncSession, failures: List[Tuple[CIFailure, str]]):
+    """Add (failure, raw_log) pairs to the index inside the transaction that inserts them."""
+    if not failures or not search_supported(session):
+        return
+    await session.flush()  # Assigns CIFailure.id, the index key
+    documents = await asyncio.to_thread(
+        lambda: [search_document(failure, raw_log) for failure, raw_log in failures]
+    )
+    statement = SQLITE_INSERT if session.bind.dialect.name == "sqlite" else POSTGRESQL_INSERT
+    await session.execute(text(statement), documents)
+
+
+def _stored_log(failure: CIFailure) -> str:
+    if failure.log_ref:
+        try:
+            return log_store.read(failure.log_ref)
+        except FileNotFoundError:
+            pass
+    return failure.raw_log or ""
+
+
+async def backfill_search(session: AsyncSession, batch_size: int = 500) -> int:
+    """Index failures newer than the last indexed one (startup).
+
+    New failures are indexed on insert, so only rows stored before the index
+    existed (or by an interrupted backfill) are picked up. Commits per batch.
+    """
+    if not search_supported(session):
+        return 0
+    key = "rowid" if session.bind.dialect.name == "sqlite" else "id"
+    last_id = await session.scalar(text(f"SELECT coalesce(max({key}), 0) FROM failure_search"))
+
+    total = 0
+    while True:
+        failures = (await session.execute(
+            select(CIFailure).where(CIFailure.id > last_id).order_by(CIFailure.id).limit(batch_size)
+        )).scalars().all()
+        if not failures:
+            return total
+        logs = await asyncio.to_thread(lambda: [_stored_log(failure) for failure in failures])
+        await index_failures(session, list(zip(failures, logs)))
+        await session.commit()
+        last_id = failures[-1].id
+        total += len(failures)
+
+# ============================================================
+# QUERY
+# ============================================================
+
+def fts5_query(query: str) -> str:
+    """User input as an FTS5 query: every word must match; a trailing * matches prefixes."""
+    terms = []
+    for term in TERM_RE.findall(query):
+        prefix = term.endswith("*")
+        terms.append('"%s"%s' % (term.rstrip("*"), "*" if prefix else ""))
+    return " ".join(terms)
+
+
+# Ranking cost grows with the number of matches, so only the newest
+# `window` matches are ranked (rowid order is insert order).
+SQLITE_SEARCH = """
+    SELECT f.failure_id, f.project_name, f.job_name, f.error_type, f.failure_category,
+           f.created_at, failure_search.rank AS rank,
+           snippet(failure_search, -1, :start_sel, :stop_sel, ' … ', :tokens) AS snippet
+    FROM failure_search
+    JOIN ci_failures f ON f.id = failure_search.rowid
+    WHERE failure_search MATCH :query
+      AND failure_search.rowid >= coalesce((
+          SELECT rowid FROM failure_search WHERE failure_search MATCH :query
+          ORDER BY rowid DESC LIMIT 1 OFFSET :window - 1
+      ), 0) {filters}
+    ORDER BY failure_search.rank
+    LIMIT :limit OFFSET :offset
+"""
+
+# Headlines are computed in the outer query, only for the returned page
+POSTGRESQL_SEARCH = """
+    SELECT page.*, ts_headline('english', s.content, websearch_to_tsquery('english', :query), :headline) AS snippet
+    FROM (
+        SELECT f.id, f.failure_id, f.project_name, f.job_name, f.error_type, f.failure_category,
+               f.created_at, ts_rank_cd(s.document, q) AS rank
+        FROM (
+            SELECT id, document FROM failure_search
+            WHERE document @@ websearch_to_tsquery('english', :query)
+            ORDER BY id DESC
+            LIMIT :window
+        ) s
+        JOIN ci_failures f ON f.id = s.id,
+             websearch_to_tsquery('english', :query) q
+        WHERE TRUE {filters}
+        ORDER BY rank DESC, f.id DESC
+        LIMIT :limit OFFSET :offset
+    ) page
+    JOIN failure_search s ON s.id = page.id
+    ORDER BY page.rank DESC, page.id DESC
+"""
+
+
+SQLITE_WINDOW_EXCEEDED = """
+    SELECT 1 FROM failure_search WHERE failure_search MATCH :query
+    ORDER BY rowid DESC LIMIT 1 OFFSET :window
+"""
+
+POSTGRESQL_WINDOW_EXCEEDED = """
+    SELECT 1 FROM failure_search WHERE document @@ websearch_to_tsquery('english', :query)
+    ORDER BY id DESC LIMIT 1 OFFSET :window
+"""
+
+
+def _isoformat(value) -> Optional[str]:
+    # Raw SQL on SQLite returns the stored string, not a datetime
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+async def search_failures(
+    session: AsyncSession,
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    category: Optional[str] = None,
+    project: Optional[str] = None
+) -> List[dict]:
+    """Ranked matches with a highlighted snippet, best first."""
+    if not TERM_RE.search(query):
+        return []  # Nothing searchable (e.g. only punctuation)
+    sqlite = session.bind.dialect.name == "sqlite"
+    params = {
+        "query": fts5_query(query) if sqlite else query,
+        "limit": limit,
+        "offset": offset,
+        "window": settings.search_rank_window or 2 ** 62,
+    }
+    if sqlite:
+        params.update(start_sel=SNIPPET_START, stop_sel=SNIPPET_END, tokens=SNIPPET_TOKENS)
+    else:
+        params["headline"] = f"StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords={SNIPPET_TOKENS}, MinWords=8"
+    filters = ""
+    if category:
+        filters += " AND f.failure_category = :category"
+        params["category"] = category
+    if project:
+        filters += " AND f.project_name = :project"
+        params["project"] = project
+
+    statement = (SQLITE_SEARCH if sqlite else POSTGRESQL_SEARCH).format(filters=filters)
+    rows = (await session.execute(text(statement), params)).mappings().all()
+    return [
+        {
+            "failure_id": row["failure_id"],
+            "project_name": row["project_name"],
+            "job_name": row["job_name"],
+            "error_type": row["error_type"],
+            "failure_category": row["failure_category"],
+            "created_at": _isoformat(row["created_at"]),
+            # bm25() is lower-is-better; report higher-is-better on both backends
+            "score": round(-row["rank"] if sqlite else row["rank"], 4),
+            "snippet": row["snippet"],
+        }
+        for row in rows
+    ]
+
+
+async def rank_window_exceeded(session: AsyncSession, query: str) -> bool:
+    """Whether `query` matches more failures than SEARCH_RANK_WINDOW, so older ones were not ranked."""
+    if not settings.search_rank_window or not TERM_RE.search(query):
+        return False
+    sqlite = session.bind.dialect.name == "sqlite"
+    statement = SQLITE_WINDOW_EXCEEDED if sqlite else POSTGRESQL_WINDOW_EXCEEDED
+    params = {"query": fts5_query(query) if sqlite else query, "window": settings.search_rank_window}
+    return (await session.execute(text(statement), params)).first() is not None
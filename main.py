@@ -1,17 +1,43 @@
 """Main FastAPI application with GitLab integration and RCA agents."""
-from fastapi import FastAPI, BackgroundTasks, Depends
+from fastapi import FastAPI, Depends, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_
 from typing import List, Optional
-import requests
+import asyncio
+import base64
+import json
+import time
 import uuid
+from datetime import datetime, timezone
 
 from core.config import settings
-from db.database import init_db, get_session
-from db.models import CIFailure
-from agents.graph import run_rca_analysis
+from core.gitlab import gitlab_client, GitLabError
+from core.jobs import rca_queue, enqueue_rca, mark_job_done, waiting_jobs, QueueFullError
+from core.fingerprint import cluster_by_fingerprint
+from core.blobstore import log_store
+from core.logs import configure_logging, failure_id_var, get_logger
+from core.metrics import CONTENT_TYPE_LATEST, render_metrics, rca_jobs_by_status, webhook_events
+from core.webhooks import jobs_from_event, verify_token, webhook_coalescer
+from core.tailer import trace_tailer
+from core.scanner import project_scanner
+from core.events import TERMINAL_EVENTS, event_bus, format_sse
+from db.database import init_db, get_session, async_session_maker
+from db.models import CIFailure, RCAJob
+from db.rollups import record_failure_metrics, backfill_rollups, rollup_summary, rollup_timeseries
+from db.search import index_failures, backfill_search, search_failures, rank_window_exceeded
+from agents.llm import warm_up, close_llm_clients
+from agents.memo import llm_memo
+from rag.signatures import signature_engine
+from core.cache import rca_cache
+from rag.index import index_failure, load_failure_history
+from rag.store import knowledge_store
+from rag.minhash import failure_lsh, assign_failure_group, load_minhash_history, log_minhash
+
+configure_logging()
+logger = get_logger("main")
 
 app = FastAPI(title="CI/CD RCA System", version="1.0.0")
 
@@ -22,13 +48,60 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Log-Size"],
 )
 
 @app.on_event("startup")
 async def startup():
     """Initialize database on startup."""
     await init_db()
-    print("✅ Database initialized")
+    logger.info("Database initialized")
+    async with async_session_maker() as db:
+        backfilled = await backfill_rollups(db)
+        searchable = await backfill_search(db)
+    if backfilled:
+        logger.info("Metrics rollup backfilled (%d failures)", backfilled)
+    if searchable:
+        logger.info("Search index backfilled (%d failures)", searchable)
+    entries = await knowledge_store.load()
+    logger.info("Knowledge base loaded (%d entries)", entries)
+    indexed = await load_failure_history()
+    logger.info("Similarity index built (%d documents)", indexed)
+    grouped = await load_minhash_history()
+    logger.info("Near-duplicate index built (%d failures)", grouped)
+    await rca_queue.start(run_rca_job)
+    logger.info("RCA worker pool started (%d workers)", rca_queue.workers)
+    webhook_coalescer.start(analyze_webhook_failures)
+    if settings.trace_tailer_enabled:
+        trace_tailer.start(provisional_rca, confirm_provisional_rca, queue_tailed_failure)
+        logger.info("Trace tailer started (polling every %ss)", trace_tailer.poll_seconds)
+    if settings.scanner_enabled:
+        await project_scanner.start(settings.project_ids, queue_scanned_failures, skip_job=already_queued)
+        logger.info("Project scanner started (%d projects)", len(settings.project_ids))
+    if settings.llm_warm_up:
+        # Load the agents off the event loop so the app starts serving immediately
+        app.state.warm_up = asyncio.create_task(asyncio.to_thread(warm_up))
+        app.state.warm_up.add_done_callback(warm_up_done)
+
+def warm_up_done(task: asyncio.Task):
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        # Agents load on first use instead; report why warm-up did not get there
+        logger.error("RCA agent warm-up failed: %s", task.exception(), exc_info=task.exception())
+    else:
+        logger.info("RCA agents warmed up")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop scanning and tailing, flush webhook batches, stop workers and close pooled GitLab and LLM connections."""
+    await project_scanner.stop()
+    await trace_tailer.stop()
+    await webhook_coalescer.stop()
+    await rca_queue.stop()
+    await gitlab_client.close()
+    await close_llm_clients()
+    llm_memo.close()
 
 # ============================================================
 # MODELS
@@ -45,6 +118,8 @@ class JobLog(BaseModel):
     job_name: str
     job_status: str
     logs: str
+    log_chars: int = 0
+    truncated: bool = False
 
 class PipelineLogsResponse(BaseModel):
     pipeline_id: str
@@ -59,6 +134,9 @@ class RCARequest(BaseModel):
     raw_log: str
     job_status: str
 
+class RCABatchRequest(BaseModel):
+    items: List[RCARequest]
+
 class RCAResponse(BaseModel):
     failure_id: str
     error_type: str
@@ -70,28 +148,40 @@ class RCAResponse(BaseModel):
     seen_count: int
     processing_time_ms: int
 
+class KnowledgeEntryUpdate(BaseModel):
+    category: Optional[str] = None
+    description: Optional[str] = None
+    fix: Optional[str] = None
+    commands: Optional[List[str]] = None
+    status: Optional[str] = None
+
+class KnowledgeMergeRequest(BaseModel):
+    sources: List[str]
+    target: str
+
 class MetricsSummary(BaseModel):
     total_failures: int
     avg_processing_time_ms: float
     category_breakdown: dict
+    p50_processing_time_ms: Optional[float] = None
+    p95_processing_time_ms: Optional[float] = None
 
 # ============================================================
 # GITLAB ENDPOINTS (Your existing code, improved)
 # ============================================================
 
-def gitlab_headers():
-    return {"PRIVATE-TOKEN": settings.gitlab_token}
-
 @app.get("/api/latest-pipeline", response_model=PipelineInfo)
-def get_latest_pipeline():
-    """Get the latest pipeline for the configured project."""
-    url = f"{settings.api_base}/projects/{settings.project_id}/pipelines?per_page=1"
-    res = requests.get(url, headers=gitlab_headers())
+async def get_latest_pipeline(project_id: Optional[str] = None):
+    """Get the latest pipeline of a project (defaults to PROJECT_ID)."""
+    project_id = project_id or settings.project_id
+    try:
+        pipeline = await gitlab_client.latest_pipeline(project_id)
+    except GitLabError as e:
+        return {"error": e.detail}
     
-    if res.status_code != 200:
-        return {"error": res.text}
+    if pipeline is None:
+        return {"error": "No pipelines found"}
     
-    pipeline = res.json()[0]
     return {
         "pipeline_id": str(pipeline["id"]),
         "status": pipeline["status"],
@@ -100,57 +190,101 @@ def get_latest_pipeline():
     }
 
 @app.get("/api/latest-pipeline-logs", response_model=PipelineLogsResponse)
-def get_latest_pipeline_logs():
-    """Get logs for all jobs in the latest pipeline."""
+async def get_latest_pipeline_logs(statuses: Optional[str] = None, project_id: Optional[str] = None):
+    """Get logs for jobs in the latest pipeline of a project (defaults to PROJECT_ID).
+    
+    Traces are only downloaded for jobs whose status is in `statuses`
+    (comma-separated, defaults to GITLAB_TRACE_STATUSES); other jobs are
+    listed with empty logs.
+    """
+    project_id = project_id or settings.project_id
+    wanted = {s.strip() for s in statuses.split(",")} if statuses else settings.trace_statuses
+    
     # 1) Get latest pipeline
-    pipelines_url = f"{settings.api_base}/projects/{settings.project_id}/pipelines?per_page=1"
-    pipelines_res = requests.get(pipelines_url, headers=gitlab_headers())
+    try:
+        pipeline = await gitlab_client.latest_pipeline(project_id)
+    except GitLabError as e:
+        return {"error": "Failed to fetch pipelines", "details": e.detail}
     
-    if pipelines_res.status_code != 200:
-        return {"error": "Failed to fetch pipelines", "details": pipelines_res.text}
+    if pipeline is None:
+        return {"error": "No pipelines found"}
     
-    pipeline = pipelines_res.json()[0]
     pipeline_id = pipeline["id"]
     
     # 2) Get jobs of that pipeline
-    jobs_url = f"{settings.api_base}/projects/{settings.project_id}/pipelines/{pipeline_id}/jobs"
-    jobs_res = requests.get(jobs_url, headers=gitlab_headers())
+    try:
+        jobs = await gitlab_client.pipeline_jobs(project_id, pipeline_id)
+    except GitLabError as e:
+        return {"error": "Failed to fetch jobs", "details": e.detail}
     
-    if jobs_res.status_code != 200:
-        return {"error": "Failed to fetch jobs", "details": jobs_res.text}
+    # 3) Stream the traces we need in parallel (bounded by the client)
+    async def fetch_logs(job):
+        if job["status"] not in wanted:
+            return {"logs": ""}
+        try:
+            trace = await gitlab_client.stream_trace(project_id, job["id"])
+        except GitLabError as e:
+            return {"logs": f"ERROR: {e.detail}"}
+        return {
+            "logs": trace.render(),
+            "log_chars": trace.total_chars,
+            "truncated": trace.truncated
+        }
     
-    jobs = jobs_res.json()
+    logs = await asyncio.gather(*(fetch_logs(job) for job in jobs))
     
-    output = {
+    return {
         "pipeline_id": str(pipeline_id),
         "pipeline_status": pipeline["status"],
-        "jobs": []
+        "jobs": [
+            {
+                "job_id": job["id"],
+                "job_name": job["name"],
+                "job_status": job["status"],
+                **trace
+            }
+            for job, trace in zip(jobs, logs)
+        ]
     }
-    
-    # 3) For each job, fetch logs
-    for job in jobs:
-        job_id = job["id"]
-        job_name = job["name"]
-        job_status = job["status"]
-        
-        trace_url = f"{settings.api_base}/projects/{settings.project_id}/jobs/{job_id}/trace"
-        trace_res = requests.get(trace_url, headers=gitlab_headers())
-        
-        logs_text = trace_res.text if trace_res.status_code == 200 else f"ERROR: {trace_res.text}"
-        
-        output["jobs"].append({
-            "job_id": job_id,
-            "job_name": job_name,
-            "job_status": job_status,
-            "logs": logs_text
-        })
-    
-    return output
 
 # ============================================================
 # RCA ANALYSIS ENDPOINTS
 # ============================================================
 
+async def build_failure(failure_id: str, result: dict, rca_source_id: Optional[str] = None) -> CIFailure:
+    """CIFailure row for an RCA result, assigned to its near-duplicate group.
+    
+    The full log goes to the blob store (deduplicated); the row keeps its hash.
+    """
+    log_ref, log_size = await asyncio.to_thread(log_store.put, result["raw_log"])
+    failure = CIFailure(
+        failure_id=failure_id,
+        pipeline_id=result["pipeline_id"],
+        project_name=result["project_name"],
+        job_name=result["job_name"],
+        stage=result["stage"],
+        job_status=result["job_status"],
+        log_ref=log_ref,
+        log_size=log_size,
+        error_type=result["parsed_errors"].get("error_type", "Unknown"),
+        error_keywords=result["error_keywords"],
+        failure_category=result["failure_category"],
+        root_cause=result["parsed_errors"].get("error_message", ""),
+        suggested_fix=result["suggested_fix"],
+        fix_commands=result["fix_commands"],
+        confidence=result["total_confidence"],
+        similar_cases=[c["error_type"] for c in result["similar_cases"]],
+        similarity_scores={c["error_type"]: c.get("score") for c in result["similar_cases"]},
+        seen_count=result["seen_count"],
+        log_fingerprint=result["log_fingerprint"],
+        rca_source_id=rca_source_id,
+        processing_time_ms=result["processing_time_ms"],
+        # Clustered members did not run the agents themselves
+        agent_timings=result["node_timings"] if rca_source_id is None else None
+    )
+    assign_failure_group(failure, result["raw_log"])
+    return failure
+
 async def process_rca_background(
     failure_id: str,
     pipeline_id: str,
@@ -158,137 +292,506 @@ async def process_rca_background(
     job_name: str,
     stage: str,
     raw_log: str,
-    job_status: str,
-    db: AsyncSession
+    job_status: str
 ):
-    """Background task to run RCA analysis and save to DB."""
-    try:
-        # Run the agent pipeline
-        result = await run_rca_analysis(
-            pipeline_id=pipeline_id,
-            project_name=project_name,
-            job_name=job_name,
-            stage=stage,
-            raw_log=raw_log,
-            job_status=job_status
-        )
-        
-        # Save to database
-        failure = CIFailure(
-            failure_id=failure_id,
-            pipeline_id=pipeline_id,
-            project_name=project_name,
-            job_name=job_name,
-            stage=stage,
-            job_status=job_status,
-            raw_log=raw_log[:5000],  # Store first 5000 chars
-            error_type=result["parsed_errors"].get("error_type", "Unknown"),
-            error_keywords=result["error_keywords"],
-            failure_category=result["failure_category"],
-            root_cause=result["parsed_errors"].get("error_message", ""),
-            suggested_fix=result["suggested_fix"],
-            fix_commands=result["fix_commands"],
-            confidence=result["total_confidence"],
-            similar_cases=[c["error_type"] for c in result["similar_cases"]],
-            seen_count=result["seen_count"],
-            processing_time_ms=result["processing_time_ms"]
-        )
-        
+    """Run RCA analysis and save to DB (executed by the RCA worker pool).
+    
+    Opens its own session; exceptions propagate so the queue can retry.
+    """
+    from agents.graph import run_rca_analysis  # Deferred: heavy LLM imports
+    
+    event_bus.publish(failure_id, "started", {"job_name": job_name, "stage": stage})
+    
+    # Run the agent pipeline
+    result = await run_rca_analysis(
+        pipeline_id=pipeline_id,
+        project_name=project_name,
+        job_name=job_name,
+        stage=stage,
+        raw_log=raw_log,
+        job_status=job_status
+    )
+    
+    await save_rca_result(failure_id, result)
+
+async def save_rca_result(failure_id: str, result: dict):
+    """Store an RCA result (and the jobs clustered with it) in one transaction."""
+    raw_log = result["raw_log"]
+    failure = await build_failure(failure_id, result)
+    
+    async with async_session_maker() as db:
         db.add(failure)
-        await db.commit()
         
-        print(f"✅ RCA saved: {failure_id}")
+        # Jobs clustered with this one share its RCA (counted once in the KB)
+        members = await waiting_jobs(db, failure_id)
+        member_failures = [
+            await build_failure(job.id, {**result, **job.payload, "raw_log": job.raw_log}, rca_source_id=failure_id)
+            for job in members
+        ]
+        db.add_all(member_failures)
         
-    except Exception as e:
-        print(f"❌ RCA failed: {e}")
-        await db.rollback()
+        await record_failure_metrics(db, [failure] + member_failures)
+        await index_failures(db, [(failure, raw_log)] + [
+            (member, job.raw_log) for member, job in zip(member_failures, members)
+        ])
+        kb_update = await knowledge_store.record_failure(db, failure)
+        await mark_job_done(db, failure_id)
+        await db.commit()
+    
+    # Committed: an error from here on must not send the job back to the queue
+    try:
+        knowledge_store.apply(kb_update)
+        index_failure(failure)
+    except Exception:
+        logger.exception("RCA saved, but updating the in-memory indexes failed")
+    for saved in [failure] + member_failures:
+        event_bus.publish(saved.failure_id, "done", {"failure": saved.to_dict()})
+    
+    logger.info("RCA saved" + (f" (+{len(members)} clustered jobs)" if members else ""),
+                extra={"error_type": failure.error_type, "processing_time_ms": failure.processing_time_ms})
+
+async def run_rca_job(job: RCAJob):
+    """Worker pool handler: analyse a claimed job."""
+    await process_rca_background(failure_id=job.id, raw_log=job.raw_log, **job.payload)
+
+def queue_full_response(error: QueueFullError):
+    return JSONResponse(status_code=503, content={"error": str(error)})
 
 @app.post("/api/analyze", response_model=dict)
 async def analyze_failure(
     request: RCARequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_session)
 ):
     """Trigger RCA analysis for a CI failure."""
     failure_id = str(uuid.uuid4())
     
-    # Queue background processing
-    background_tasks.add_task(
-        process_rca_background,
+    # Queue durable processing
+    try:
+        await rca_queue.check_capacity(db)
+    except QueueFullError as e:
+        return queue_full_response(e)
+    
+    enqueue_rca(
+        db,
         failure_id=failure_id,
         pipeline_id=request.pipeline_id,
         project_name=request.project_name,
         job_name=request.job_name,
         stage=request.stage,
         raw_log=request.raw_log,
-        job_status=request.job_status,
-        db=db
+        job_status=request.job_status
     )
+    await db.commit()
+    rca_queue.notify()
     
     return {
         "failure_id": failure_id,
-        "status": "processing",
-        "message": "RCA analysis started. Check /api/failures/{failure_id} for results."
+        "status": "queued",
+        "message": "RCA analysis queued. Check /api/failures/{failure_id} for results."
     }
 
-@app.post("/api/analyze-latest")
-async def analyze_latest_pipeline(
-    background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_session)
-):
-    """Analyze all failed jobs in the latest pipeline."""
-    # Get latest pipeline logs
-    pipeline_data = get_latest_pipeline_logs()
+async def queue_pipeline_failures(db: AsyncSession, pipeline_id: str, project_name: str, failed_jobs: List[dict]) -> dict:
+    """Queue RCA for a pipeline's failed jobs (job_name, job_status, logs, optional stage).
+    
+    Jobs whose logs share a fingerprint (e.g. matrix shards with the same
+    cause) are analysed once; the other jobs in the cluster reuse that RCA.
+    Adds to the caller's transaction; raises QueueFullError.
+    """
+    clusters = cluster_by_fingerprint([job["logs"] for job in failed_jobs])
+    await rca_queue.check_capacity(db, incoming=len(clusters))
     
     results = []
-    for job in pipeline_data["jobs"]:
-        if job["job_status"] == "failed":
+    cluster_summaries = []
+    for fingerprint, members in clusters.items():
+        leader_id = None
+        cluster_jobs = []
+        for i in members:
+            job = failed_jobs[i]
             failure_id = str(uuid.uuid4())
             
-            background_tasks.add_task(
-                process_rca_background,
+            enqueue_rca(
+                db,
                 failure_id=failure_id,
-                pipeline_id=pipeline_data["pipeline_id"],
-                project_name=settings.project_id,
+                leader_id=leader_id,
+                pipeline_id=pipeline_id,
+                project_name=project_name,
                 job_name=job["job_name"],
-                stage="unknown",
+                stage=job.get("stage", "unknown"),
                 raw_log=job["logs"],
-                job_status=job["job_status"],
-                db=db
+                job_status=job["job_status"]
             )
+            leader_id = leader_id or failure_id
             
             results.append({
                 "failure_id": failure_id,
                 "job_name": job["job_name"],
-                "status": "processing"
+                "status": "queued",
+                "rca_source_id": leader_id
             })
+            cluster_jobs.append({"failure_id": failure_id, "job_name": job["job_name"]})
+        
+        cluster_summaries.append({
+            "log_fingerprint": fingerprint,
+            "rca_failure_id": leader_id,
+            "job_count": len(cluster_jobs),
+            "jobs": cluster_jobs
+        })
     
     return {
-        "pipeline_id": pipeline_data["pipeline_id"],
+        "pipeline_id": pipeline_id,
         "failures_queued": len(results),
+        "analyses_queued": len(clusters),
+        "clusters": cluster_summaries,
         "results": results
     }
 
+@app.post("/api/analyze-latest")
+async def analyze_latest_pipeline(project_id: Optional[str] = None, db: AsyncSession = Depends(get_session)):
+    """Analyze all failed jobs in the latest pipeline of a project (defaults to PROJECT_ID).
+    
+    Jobs whose logs share a fingerprint (e.g. matrix shards with the same
+    cause) are analysed once; the other jobs in the cluster reuse that RCA.
+    """
+    project_id = project_id or settings.project_id
+    # Get latest pipeline logs (failed jobs only)
+    pipeline_data = await get_latest_pipeline_logs(statuses="failed", project_id=project_id)
+    if "error" in pipeline_data:
+        return pipeline_data
+    
+    failed_jobs = [job for job in pipeline_data["jobs"] if job["job_status"] == "failed"]
+    try:
+        queued = await queue_pipeline_failures(db, pipeline_data["pipeline_id"], project_id, failed_jobs)
+    except QueueFullError as e:
+        return queue_full_response(e)
+    
+    await db.commit()
+    rca_queue.notify()
+    
+    return queued
+
+async def analyze_webhook_failures(project_id: str, pipeline_id: str, jobs: List[dict]) -> List:
+    """Webhook coalescer (and project scanner) handler: fetch the traces of newly failed jobs and queue their RCA.
+    
+    Returns the ids of jobs left out because their trace could not be fetched.
+    """
+    traces = await asyncio.gather(
+        *(gitlab_client.stream_trace(project_id, job["job_id"]) for job in jobs),
+        return_exceptions=True
+    )
+    failed_jobs = []
+    unavailable = []
+    for job, trace in zip(jobs, traces):
+        if isinstance(trace, BaseException):
+            # The client already retried transient errors; an RCA of the HTTP error would be noise
+            detail = trace.detail if isinstance(trace, GitLabError) else str(trace)
+            logger.warning("Trace of job %s unavailable, not queued: %s", job["job_id"], detail,
+                           extra={"project_id": project_id, "pipeline_id": pipeline_id})
+            unavailable.append(job["job_id"])
+            continue
+        failed_jobs.append({"job_name": job["job_name"], "stage": job["stage"], "job_status": "failed", "logs": trace.render()})
+    
+    # A later event for these jobs can still queue them
+    webhook_coalescer.forget(unavailable)
+    if not failed_jobs:
+        return unavailable
+    
+    async with async_session_maker() as db:
+        queued = await queue_pipeline_failures(db, pipeline_id, project_id, failed_jobs)
+        await db.commit()
+    rca_queue.notify()
+    
+    logger.info("Queued %d failed jobs of pipeline %s (%d analyses)",
+                queued["failures_queued"], pipeline_id, queued["analyses_queued"],
+                extra={"project_id": project_id, "pipeline_id": pipeline_id})
+    return unavailable
+
+def already_queued(job_id) -> bool:
+    """Project scanner filter: jobs a webhook or the trace tailer already handles."""
+    return webhook_coalescer.seen(job_id) or trace_tailer.watching(job_id)
+
+async def queue_scanned_failures(project_id: str, pipeline_id: str, jobs: List[dict]):
+    """Project scanner handler: queue like webhook failures, then ignore later webhook events for the queued jobs."""
+    unavailable = await analyze_webhook_failures(project_id, pipeline_id, jobs)
+    webhook_coalescer.remember(job["job_id"] for job in jobs if job["job_id"] not in unavailable)
+
+async def provisional_rca(live, log: str) -> dict:
+    """Trace tailer handler: analyse a still-running job from the log read so far."""
+    from agents.graph import run_rca_analysis  # Deferred: heavy LLM imports
+    
+    # Runs in its own task; the id is the one the confirmed RCA is saved under
+    failure_id_var.set(live.failure_id)
+    return await run_rca_analysis(
+        pipeline_id=live.pipeline_id,
+        project_name=live.project_id,
+        job_name=live.job_name,
+        stage=live.stage,
+        raw_log=log,
+        job_status="running"
+    )
+
+async def confirm_provisional_rca(live, result: dict, log: str):
+    """Trace tailer handler: the job failed, so save its provisional RCA with the final log."""
+    await save_rca_result(live.failure_id, {**result, "raw_log": log, "job_status": "failed"})
+
+async def queue_tailed_failure(live, log: str):
+    """Trace tailer handler: a failed job without a provisional RCA goes through the queue."""
+    async with async_session_maker() as db:
+        await queue_pipeline_failures(db, live.pipeline_id, live.project_id, [
+            {"job_name": live.job_name, "stage": live.stage, "job_status": "failed", "logs": log}
+        ])
+        await db.commit()
+    rca_queue.notify()
+
+@app.get("/api/live-jobs")
+def get_live_jobs():
+    """Running jobs being tailed, with their provisional RCA once a fatal line appeared."""
+    return {"enabled": trace_tailer.running, "jobs": trace_tailer.snapshot()}
+
+@app.get("/api/projects")
+def get_projects():
+    """Scanned projects with their cursor and schedule, and the GitLab rate-limit budget."""
+    return {
+        "enabled": project_scanner.running,
+        "rate_limit": {
+            "limit": gitlab_client.rate_limit,
+            "remaining": gitlab_client.rate_limit_remaining,
+            "reset_at": gitlab_client.rate_limit_reset_at,
+            "scanner_request_interval_seconds": gitlab_client.request_interval(project_scanner.rate_limit_reserve)
+        },
+        "projects": project_scanner.snapshot()
+    }
+
+@app.post("/api/webhooks/gitlab")
+async def gitlab_webhook(request: Request, x_gitlab_token: Optional[str] = Header(None)):
+    """Receive GitLab Job and Pipeline events.
+    
+    Newly failed jobs are collected per pipeline and queued together once the
+    burst of events is over (WEBHOOK_DEBOUNCE_SECONDS); only their traces are
+    fetched. Configure the webhook's secret token as GITLAB_WEBHOOK_SECRET.
+    """
+    if not settings.gitlab_webhook_secret:
+        webhook_events.labels(event="unknown", result="rejected").inc()
+        return JSONResponse(status_code=503, content={"error": "GITLAB_WEBHOOK_SECRET is not configured"})
+    if not verify_token(x_gitlab_token, settings.gitlab_webhook_secret):
+        webhook_events.labels(event="unknown", result="rejected").inc()
+        return JSONResponse(status_code=401, content={"error": "Invalid webhook token"})
+    
+    try:
+        event = await request.json()
+        jobs = jobs_from_event(event)
+        running = jobs_from_event(event, status="running")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        webhook_events.labels(event="unknown", result="rejected").inc()
+        return JSONResponse(status_code=400, content={"error": "Malformed webhook payload"})
+    
+    kind = event.get("object_kind")
+    if kind not in ("build", "pipeline"):
+        webhook_events.labels(event="other", result="ignored").inc()
+        return {"status": "ignored", "object_kind": kind}
+    
+    if trace_tailer.running:
+        for job in running:
+            trace_tailer.watch(job["project_id"], job["job_id"], job["job_name"], job["stage"], job["pipeline_id"])
+        # Tailed jobs are finished by the tailer (provisional RCA confirmed or queued)
+        jobs = [job for job in jobs if not trace_tailer.watching(job["job_id"])]
+    
+    new_jobs = webhook_coalescer.add(jobs)
+    webhook_events.labels(event=kind, result="accepted" if new_jobs else "ignored").inc()
+    return JSONResponse(status_code=202, content={
+        "status": "accepted",
+        "failed_jobs": len(jobs),
+        "new_failed_jobs": new_jobs
+    })
+
+# Batches share the LLM with the worker pool; only a few run at a time
+batch_slots = asyncio.Semaphore(settings.rca_batch_max_requests)
+
+@app.post("/api/analyze/batch", response_model=dict)
+async def analyze_batch(request: RCABatchRequest):
+    """Analyze many failures at once and store them in one transaction."""
+    if len(request.items) > settings.rca_batch_max_items:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"Batch too large (max {settings.rca_batch_max_items} items)"}
+        )
+    async with async_session_maker() as db:
+        try:
+            await rca_queue.check_capacity(db, incoming=len(request.items))
+        except QueueFullError as e:
+            return queue_full_response(e)
+    
+    from agents.batch import run_rca_batch  # Deferred: heavy LLM imports
+    
+    # Ids assigned up front, so the batch's logs carry them
+    failure_ids = [str(uuid.uuid4()) for _ in request.items]
+    async with batch_slots:
+        batch = await run_rca_batch([item.model_dump() for item in request.items], failure_ids=failure_ids)
+    
+    # Bulk insert every successful result
+    write_started = time.time()
+    results = []
+    failures = []
+    logs = []
+    for failure_id, item, result in zip(failure_ids, request.items, batch["results"]):
+        if "error" in result:
+            results.append({"job_name": item.job_name, "status": "failed", "error": result["error"]})
+            continue
+        failure = await build_failure(failure_id, result)
+        failures.append(failure)
+        logs.append(item.raw_log)
+        results.append({
+            "failure_id": failure.failure_id,
+            "job_name": item.job_name,
+            "status": "completed",
+            "error_type": failure.error_type,
+            "category": failure.failure_category,
+            "cache_hit": result["cache_hit"]
+        })
+    
+    async with async_session_maker() as db:
+        db.add_all(failures)
+        await record_failure_metrics(db, failures)
+        await index_failures(db, list(zip(failures, logs)))
+        kb_updates = [await knowledge_store.record_failure(db, failure) for failure in failures]
+        await db.commit()
+    
+    for failure, kb_update in zip(failures, kb_updates):
+        knowledge_store.apply(kb_update)
+        index_failure(failure)
+    
+    timing = batch["timing"]
+    timing["db_write_ms"] = int((time.time() - write_started) * 1000)
+    logger.info("Batch RCA saved: %d/%d failures", len(failures), len(results), extra={"timing": timing})
+    
+    return {
+        "total": len(results),
+        "completed": len(failures),
+        "results": results,
+        "timing": timing
+    }
+
+@app.get("/api/queue", response_model=dict)
+async def get_queue_status():
+    """Get RCA queue depth by job state."""
+    return await rca_queue.stats()
+
 # ============================================================
 # QUERY ENDPOINTS
 # ============================================================
 
+# Default list projection: everything except the large text/JSON columns
+LIST_FIELDS = [
+    "id", "failure_id", "pipeline_id", "project_name", "job_name", "stage", "job_status",
+    "error_type", "failure_category", "confidence", "seen_count", "failure_group_id",
+    "rca_source_id", "processing_time_ms", "created_at",
+]
+SELECTABLE_FIELDS = LIST_FIELDS + [
+    "error_keywords", "root_cause", "suggested_fix", "fix_commands",
+    "similar_cases", "similarity_scores", "log_fingerprint",
+]
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str):
+    created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    return datetime.fromisoformat(created_at), int(row_id)
+
 @app.get("/api/failures", response_model=List[dict])
 async def get_failures(
+    response: Response,
     category: Optional[str] = None,
+    project: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: AsyncSession = Depends(get_session)
 ):
-    """Get list of analyzed failures."""
-    query = select(CIFailure).order_by(CIFailure.created_at.desc()).limit(limit)
+    """Get list of analyzed failures, newest first.
+    
+    Keyset-paginated on (created_at, id): pass the X-Next-Cursor response
+    header back as `cursor` for the next page. `fields` is a comma-separated
+    projection (default: LIST_FIELDS, without the large columns).
+    """
+    selected = fields.split(",") if fields else LIST_FIELDS
+    unknown = [name for name in selected if name not in SELECTABLE_FIELDS]
+    if unknown:
+        return JSONResponse(status_code=400, content={"error": f"Unknown fields: {', '.join(unknown)}"})
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    # id and created_at are always read for the cursor
+    columns = list(dict.fromkeys(["id", "created_at"] + selected))
+    query = (
+        select(*[getattr(CIFailure, name) for name in columns])
+        .order_by(CIFailure.created_at.desc(), CIFailure.id.desc())
+        .limit(limit + 1)
+    )
     
     if category:
         query = query.where(CIFailure.failure_category == category)
+    if project:
+        query = query.where(CIFailure.project_name == project)
+    if since:
+        query = query.where(CIFailure.created_at >= since)
+    if until:
+        query = query.where(CIFailure.created_at < until)
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return JSONResponse(status_code=400, content={"error": "Invalid cursor"})
+        query = query.where(tuple_(CIFailure.created_at, CIFailure.id) < tuple_(*after))
     
-    result = await db.execute(query)
-    failures = result.scalars().all()
+    rows = (await db.execute(query)).all()
     
-    return [f.to_dict() for f in failures]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    
+    return [
+        {
+            name: (value.isoformat() if name == "created_at" and value else value)
+            for name, value in zip(columns, row)
+            if name in selected
+        }
+        for row in rows
+    ]
+
+@app.get("/api/search", response_model=dict)
+async def search(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    category: Optional[str] = None,
+    project: Optional[str] = None,
+    db: AsyncSession = Depends(get_session)
+):
+    """Full-text search over error type, keywords, root cause, fix and log text.
+    
+    Results are ranked best first with a highlighted snippet; pass
+    `next_offset` back as `offset` for the next page. `truncated` is true when
+    only the newest SEARCH_RANK_WINDOW matches were ranked.
+    """
+    if not q.strip():
+        return JSONResponse(status_code=400, content={"error": "Empty query"})
+    limit = max(1, min(limit, settings.search_max_page_size))
+    offset = max(0, offset)
+    
+    started = time.time()
+    results = await search_failures(db, q, limit=limit + 1, offset=offset, category=category, project=project)
+    truncated = await rank_window_exceeded(db, q)
+    
+    return {
+        "query": q,
+        "results": results[:limit],
+        "next_offset": offset + limit if len(results) > limit else None,
+        "truncated": truncated,
+        "took_ms": int((time.time() - started) * 1000)
+    }
 
 @app.get("/api/failures/{failure_id}", response_model=dict)
 async def get_failure_detail(
@@ -301,37 +804,315 @@ async def get_failure_detail(
     failure = result.scalar_one_or_none()
     
     if not failure:
+        # Still pending? Report the queue state instead
+        job = await db.get(RCAJob, failure_id)
+        if job:
+            return job.to_dict()
         return {"error": "Failure not found"}
     
     return failure.to_dict()
 
+async def failure_status_event(failure_id: str) -> Optional[tuple]:
+    """(event, data) describing a failure's current state from the DB; None if unknown."""
+    async with async_session_maker() as db:
+        failure = (await db.execute(
+            select(CIFailure).where(CIFailure.failure_id == failure_id)
+        )).scalar_one_or_none()
+        if failure:
+            return "done", {"failure_id": failure_id, "failure": failure.to_dict()}
+        job = await db.get(RCAJob, failure_id)
+        if job is None:
+            return None
+        if job.status == "failed":
+            return "failed", {"failure_id": failure_id, "error": job.last_error}
+        return "status", {"failure_id": failure_id, **job.to_dict()}
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # Don't let nginx buffer the stream
+    })
+
+@app.get("/api/failures/{failure_id}/events")
+async def get_failure_events(failure_id: str):
+    """Server-Sent Events for one failure: status, started, stage, token, then done or failed.
+    
+    Replaces polling /api/failures/{failure_id}; the stream ends after the
+    terminal event (immediately if the RCA is already stored).
+    """
+    # Subscribe before reading the DB so a result saved in between is not missed
+    queue = event_bus.subscribe(failure_id)
+    current = await failure_status_event(failure_id)
+    if current is None:
+        event_bus.unsubscribe(queue, failure_id)
+        return JSONResponse(status_code=404, content={"error": "Failure not found"})
+    
+    async def stream():
+        try:
+            yield format_sse(*current)
+            if current[0] in TERMINAL_EVENTS:
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=settings.events_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Keep-alive; also picks up results stored by another replica
+                    latest = await failure_status_event(failure_id)
+                    if latest and latest[0] in TERMINAL_EVENTS:
+                        yield format_sse(*latest)
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data)
+                if event in TERMINAL_EVENTS:
+                    return
+        finally:
+            event_bus.unsubscribe(queue, failure_id)
+    
+    return sse_response(stream())
+
+@app.get("/api/events")
+async def get_failure_firehose():
+    """Server-Sent Events for every failure as it is stored (done) or gives up (failed)."""
+    queue = event_bus.subscribe()
+    
+    async def stream():
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=settings.events_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data)
+        finally:
+            event_bus.unsubscribe(queue)
+    
+    return sse_response(stream())
+
+async def read_failure_log(failure: CIFailure, start: int = 0, end: Optional[int] = None) -> str:
+    """Bytes [start, end) of a failure's log; legacy rows only have a truncated raw_log."""
+    if failure.log_ref:
+        return await asyncio.to_thread(log_store.read, failure.log_ref, start, end)
+    return (failure.raw_log or "").encode("utf-8")[start:end].decode("utf-8", errors="replace")
+
+@app.get("/api/failures/{failure_id}/log")
+async def get_failure_log(
+    failure_id: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    db: AsyncSession = Depends(get_session)
+):
+    """Full job log, or the byte range [start, end) of it (only the chunks it spans are decompressed)."""
+    failure = (await db.execute(
+        select(CIFailure).where(CIFailure.failure_id == failure_id)
+    )).scalar_one_or_none()
+    if not failure:
+        return JSONResponse(status_code=404, content={"error": "Failure not found"})
+    if start < 0 or (end is not None and end < start):
+        return JSONResponse(status_code=400, content={"error": "Invalid byte range"})
+    
+    try:
+        text = await read_failure_log(failure, start, end)
+    except FileNotFoundError:
+        return JSONResponse(status_code=404, content={"error": "Log blob missing from the log store"})
+    
+    size = failure.log_size if failure.log_ref else len((failure.raw_log or "").encode("utf-8"))
+    return PlainTextResponse(text, headers={"X-Log-Size": str(size)})
+
+@app.get("/api/failures/{failure_id}/similar", response_model=dict)
+async def get_similar_failures(
+    failure_id: str,
+    limit: int = 20,
+    threshold: Optional[float] = None,
+    db: AsyncSession = Depends(get_session)
+):
+    """Near-duplicate failures (estimated Jaccard similarity of error regions)."""
+    failure = (await db.execute(
+        select(CIFailure).where(CIFailure.failure_id == failure_id)
+    )).scalar_one_or_none()
+    if not failure:
+        return {"error": "Failure not found"}
+    
+    # Rows stored before MinHash existed fall back to their stored log
+    signature = failure.minhash or log_minhash(await read_failure_log(failure))
+    matches = failure_lsh.query(signature, threshold=threshold, exclude=failure_id)[:limit]
+    similarity = dict(matches)
+    
+    rows = (await db.execute(
+        select(
+            CIFailure.failure_id,
+            CIFailure.pipeline_id,
+            CIFailure.job_name,
+            CIFailure.error_type,
+            CIFailure.failure_category,
+            CIFailure.failure_group_id,
+            CIFailure.created_at
+        ).where(CIFailure.failure_id.in_(list(similarity)))
+    )).all() if similarity else []
+    
+    similar = sorted([
+        {
+            "failure_id": row.failure_id,
+            "pipeline_id": row.pipeline_id,
+            "job_name": row.job_name,
+            "error_type": row.error_type,
+            "failure_category": row.failure_category,
+            "failure_group_id": row.failure_group_id,
+            "similarity": round(similarity[row.failure_id], 3),
+            "created_at": row.created_at.isoformat() if row.created_at else None
+        }
+        for row in rows
+    ], key=lambda item: item["similarity"], reverse=True)
+    
+    return {
+        "failure_id": failure_id,
+        "failure_group_id": failure.failure_group_id,
+        "similar": similar
+    }
+
+@app.get("/api/failure-groups", response_model=List[dict])
+async def get_failure_groups(
+    min_size: int = 2,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_session)
+):
+    """Near-duplicate failure groups, largest first."""
+    size = func.count(CIFailure.id)
+    query = (
+        select(
+            CIFailure.failure_group_id,
+            size.label("size"),
+            func.max(CIFailure.error_type).label("error_type"),
+            func.max(CIFailure.failure_category).label("failure_category"),
+            func.min(CIFailure.created_at).label("first_seen"),
+            func.max(CIFailure.created_at).label("last_seen")
+        )
+        .where(CIFailure.failure_group_id.isnot(None))
+        .group_by(CIFailure.failure_group_id)
+        .having(size >= min_size)
+        .order_by(size.desc())
+        .limit(limit)
+    )
+    rows = (await db.execute(query)).all()
+    
+    return [
+        {
+            "failure_group_id": row.failure_group_id,
+            "size": row.size,
+            "error_type": row.error_type,
+            "failure_category": row.failure_category,
+            "first_seen": row.first_seen.isoformat() if row.first_seen else None,
+            "last_seen": row.last_seen.isoformat() if row.last_seen else None
+        }
+        for row in rows
+    ]
+
 @app.get("/api/metrics/summary", response_model=MetricsSummary)
 async def get_metrics_summary(db: AsyncSession = Depends(get_session)):
-    """Get aggregate metrics."""
-    # Total failures
-    total_query = select(func.count(CIFailure.id))
-    total_result = await db.execute(total_query)
-    total = total_result.scalar()
-    
-    # Avg processing time
-    avg_query = select(func.avg(CIFailure.processing_time_ms))
-    avg_result = await db.execute(avg_query)
-    avg_time = avg_result.scalar() or 0
-    
-    # Category breakdown
-    category_query = select(
-        CIFailure.failure_category,
-        func.count(CIFailure.id)
-    ).group_by(CIFailure.failure_category)
-    category_result = await db.execute(category_query)
-    categories = {cat: count for cat, count in category_result.all()}
+    """Get aggregate metrics (from the hourly rollup, not the failures table)."""
+    return await rollup_summary(db)
+
+@app.get("/api/metrics/timeseries", response_model=dict)
+async def get_metrics_timeseries(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    step_hours: int = 1,
+    project: Optional[str] = None,
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_session)
+):
+    """Failure counts and latency over time, downsampled to `step_hours` buckets.
+    
+    Defaults to the last 24 hours.
+    """
+    end_ts = end.timestamp() if end else time.time()
+    start_ts = start.timestamp() if start else end_ts - 24 * 3600
+    if step_hours < 1 or start_ts >= end_ts:
+        return {"error": "step_hours must be >= 1 and start must be before end"}
+    if (end_ts - start_ts) / (step_hours * 3600) > settings.metrics_max_points:
+        return {"error": f"Too many points; increase step_hours (max {settings.metrics_max_points} points)"}
     
+    points = await rollup_timeseries(db, int(start_ts), int(end_ts), step_hours * 3600, project, category)
     return {
-        "total_failures": total,
-        "avg_processing_time_ms": float(avg_time),
-        "category_breakdown": categories
+        "start": datetime.fromtimestamp(start_ts, timezone.utc).isoformat(),
+        "end": datetime.fromtimestamp(end_ts, timezone.utc).isoformat(),
+        "step_hours": step_hours,
+        "points": points
     }
 
+@app.get("/api/metrics/signatures")
+def get_signature_metrics():
+    """Get hit ratio of the rule-based log parser fast path."""
+    return signature_engine.stats()
+
+@app.get("/api/metrics/cache")
+def get_cache_metrics():
+    """Get hit/miss counters of the fingerprint-keyed RCA result cache."""
+    return rca_cache.stats()
+
+@app.get("/api/metrics/llm-memo")
+def get_llm_memo_metrics():
+    """Get per-agent hit rates of the classifier / fix suggester response memo."""
+    return llm_memo.stats()
+
+# ============================================================
+# KNOWLEDGE BASE ADMIN
+# ============================================================
+
+def admin_denied(x_admin_token: Optional[str]) -> Optional[JSONResponse]:
+    """Rejection for an admin request without a valid X-Admin-Token, else None."""
+    if not settings.admin_token:
+        return JSONResponse(status_code=503, content={"error": "ADMIN_TOKEN is not configured"})
+    if not verify_token(x_admin_token, settings.admin_token):
+        return JSONResponse(status_code=401, content={"error": "Invalid admin token"})
+    return None
+
+@app.get("/api/admin/knowledge-base", response_model=List[dict])
+async def list_knowledge_base(status: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """List knowledge base entries (active, candidate, merged, retired)."""
+    denied = admin_denied(x_admin_token)
+    if denied:
+        return denied
+    return await knowledge_store.list_entries(status)
+
+@app.put("/api/admin/knowledge-base/{error_type}", response_model=dict)
+async def update_knowledge_entry(
+    error_type: str,
+    changes: KnowledgeEntryUpdate,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Curate an entry: edit its fix/description or change its status."""
+    denied = admin_denied(x_admin_token)
+    if denied:
+        return denied
+    try:
+        entry = await knowledge_store.update_entry(error_type, changes.model_dump())
+    except ValueError as e:
+        return JSONResponse(status_code=422, content={"error": str(e)})
+    if not entry:
+        return JSONResponse(status_code=404, content={"error": "Knowledge entry not found"})
+    return entry
+
+@app.post("/api/admin/knowledge-base/merge", response_model=dict)
+async def merge_knowledge_entries(request: KnowledgeMergeRequest, x_admin_token: Optional[str] = Header(None)):
+    """Merge duplicate entries into a target entry."""
+    denied = admin_denied(x_admin_token)
+    if denied:
+        return denied
+    entry = await knowledge_store.merge(request.sources, request.target)
+    if not entry:
+        return JSONResponse(status_code=404, content={"error": "Target knowledge entry not found"})
+    return entry
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics (agents, LLM calls and tokens, cache, GitLab, queue)."""
+    stats = await rca_queue.stats()
+    for status in ["queued", "running", "waiting", "done", "failed"]:
+        rca_jobs_by_status.labels(status=status).set(stats["jobs"].get(status, 0))
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
@@ -0,0 +1,192 @@
+"""In-memory BM25 inverted index over the knowledge base and past failures."""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from core.config import settings
+from db.database import async_session_maker
+from db.models import CIFailure
+from rag.knowledge_base import KNOWLEDGE_BASE, on_knowledge_base_change
+
+TOKEN_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; CamelCase identifiers are split into words."""
+    return [token.lower() for token in TOKEN_RE.findall(text or "")]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index, supporting incremental add/remove."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lens: Dict[str, int] = {}
+        self._payloads: Dict[str, dict] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id: str, text: str, payload: dict):
+        """Index a document (replacing any previous version with the same id)."""
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        self._doc_terms[doc_id] = terms
+        self._payloads[doc_id] = payload
+        self._doc_lens[doc_id] = sum(terms.values())
+        self._total_len += self._doc_lens[doc_id]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._payloads.pop(doc_id, None)
+        self._total_len -= self._doc_lens.pop(doc_id)
+        for term in terms:
+            docs = self._postings[term]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self._postings[term]
+
+    def payload(self, doc_id: str) -> Optional[dict]:
+        return self._payloads.get(doc_id)
+
+    def doc_ids(self, prefix: str = "") -> List[str]:
+        return [doc_id for doc_id in self._doc_terms if doc_id.startswith(prefix)]
+
+    def search(self, query: str, k: int = 3) -> List[dict]:
+        """Top-k documents as {"doc_id", "score", "payload"}, best first."""
+        n_docs = len(self._doc_terms)
+        if not n_docs:
+            return []
+        avg_len = self._total_len / n_docs
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self._postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self._doc_lens[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            {"doc_id": doc_id, "score": score, "payload": self._payloads[doc_id]}
+            for doc_id, score in top
+        ]
+
+
+# ============================================================
+# DOCUMENTS
+# ============================================================
+
+def kb_document(kb_item: dict) -> str:
+    # Error type is repeated so exact-type matches outrank description overlap
+    return " ".join([kb_item["error_type"]] * 2 + [kb_item["category"], kb_item["description"]])
+
+
+def history_document(entry: dict) -> str:
+    return " ".join([
+        entry["error_type"],
+        entry["error_type"],
+        entry["category"] or "",
+        " ".join(sorted(entry["keywords"])),
+        entry["root_cause"] or "",
+    ])
+
+
+similarity_index = BM25Index()
+
+
+def index_knowledge_base(error_types=None):
+    """(Re)index knowledge base entries; payloads reference the live entries.
+    
+    With `error_types`, only those entries are re-indexed (or dropped when
+    they are no longer in the knowledge base).
+    """
+    live = {kb_item["error_type"]: kb_item for kb_item in KNOWLEDGE_BASE}
+    if error_types is None:
+        for doc_id in similarity_index.doc_ids("kb:"):
+            similarity_index.remove(doc_id)
+        error_types = live.keys()
+    for error_type in error_types:
+        kb_item = live.get(error_type)
+        if kb_item is None:
+            similarity_index.remove(f"kb:{error_type}")
+        else:
+            similarity_index.add(f"kb:{error_type}", kb_document(kb_item), kb_item)
+
+
+# Past failures are folded into one document per error type, so the index
+# grows with the number of distinct failures rather than with table size.
+_history: Dict[str, dict] = {}
+MAX_HISTORY_KEYWORDS = 50
+
+
+def index_failure(failure: CIFailure):
+    """Add a newly analysed failure to the index."""
+    if not failure.error_type:
+        return
+    entry = _history.setdefault(failure.error_type, {
+        "error_type": failure.error_type,
+        "keywords": set(),
+        "seen_count": 0,
+    })
+    entry["seen_count"] += 1
+    entry["category"] = failure.failure_category
+    entry["root_cause"] = failure.root_cause
+    entry["fix"] = failure.suggested_fix
+    entry["commands"] = failure.fix_commands or []
+    entry["failure_id"] = failure.failure_id
+    if len(entry["keywords"]) < MAX_HISTORY_KEYWORDS:
+        entry["keywords"].update(kw.lower() for kw in failure.error_keywords or [])
+
+    similarity_index.add(f"history:{failure.error_type}", history_document(entry), {
+        "source": "history",
+        "failure_id": entry["failure_id"],
+        "error_type": entry["error_type"],
+        "category": entry["category"],
+        "fix": entry["fix"],
+        "commands": entry["commands"],
+        "seen_count": entry["seen_count"],
+    })
+
+
+async def load_failure_history(limit: int = settings.similarity_history_limit):
+    """Index past analysed failures (called once at startup)."""
+    columns = [
+        CIFailure.failure_id,
+        CIFailure.error_type,
+        CIFailure.failure_category,
+        CIFailure.error_keywords,
+        CIFailure.root_cause,
+        CIFailure.suggested_fix,
+        CIFailure.fix_commands,
+    ]
+    async with async_session_maker() as session:
+        rows = await session.execute(
+            select(*columns).order_by(CIFailure.id.desc()).limit(limit)
+        )
+        # Oldest first, so each error type ends up with its latest fix
+        for row in reversed(rows.all()):
+            index_failure(row)
+    return len(similarity_index)
+
+
+index_knowledge_base()
+on_knowledge_base_change(lambda version, error_types: index_knowledge_base(error_types))
@@ -1,4 +1,6 @@
 """Sample knowledge base - past CI failures and fixes for RAG."""
+import hashlib
+import json
 
 KNOWLEDGE_BASE = [
     {
@@ -82,3 +84,54 @@ KNOWLEDGE_BASE = [
         "seen_count": 10
     }
 ]
+
+
+# Error types whose entry was retired or merged (kept in sync by rag.store)
+INACTIVE_ERROR_TYPES = set()
+
+def find_entry(error_type: str):
+    """Knowledge base entry for an error type, or None."""
+    for item in KNOWLEDGE_BASE:
+        if item["error_type"] == error_type:
+            return item
+    return None
+
+def category_for(error_type: str):
+    """Category of a known error type, or None."""
+    item = find_entry(error_type)
+    return item["category"] if item else None
+
+# ============================================================
+# CHANGE TRACKING
+# ============================================================
+
+_listeners = []
+_version = None
+
+def knowledge_base_version() -> str:
+    """Content hash of the knowledge base (seen counts excluded)."""
+    global _version
+    if _version is None:
+        content = [
+            {k: v for k, v in item.items() if k != "seen_count"}
+            for item in KNOWLEDGE_BASE
+        ]
+        _version = hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()[:16]
+    return _version
+
+def on_knowledge_base_change(callback):
+    """Register a callback invoked after the knowledge base is modified.
+    
+    Callbacks receive the new version and the changed error types (None when
+    the whole knowledge base may have changed).
+    """
+    _listeners.append(callback)
+    return callback
+
+def notify_knowledge_base_changed(error_types=None):
+    """Recompute the KB version and notify listeners (e.g. result caches)."""
+    global _version
+    _version = None
+    version = knowledge_base_version()
+    for callback in _listeners:
+        callback(version, error_types)
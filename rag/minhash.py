@@ -0,0 +1,159 @@
+"""MinHash signatures and an LSH index for near-duplicate failure detection."""
+import hashlib
+import random
+import re
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from core.config import settings
+from core.fingerprint import error_region
+from db.database import async_session_maker
+from db.models import CIFailure
+
+MERSENNE_PRIME = (1 << 61) - 1
+WORD_RE = re.compile(r"\w+")
+# File paths and source file names; masked so the same error in another file still matches
+PATH_RE = re.compile(
+    r"(?:[\w.-]+/)+[\w.-]+|\b[\w-]+\.(?:py|java|kt|scala|js|jsx|ts|tsx|go|rb|rs|c|cc|cpp|h|hpp|cs|php|sh|tf|ya?ml|json|xml|gradle)\b"
+)
+
+# Fixed seed: stored signatures must stay comparable across processes and restarts
+_rng = random.Random(20240101)
+_PERMUTATIONS = [
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+    for _ in range(settings.minhash_num_perm)
+]
+
+
+def shingles(lines: List[str], size: int = 3) -> Set[str]:
+    """Word k-shingles of normalized log lines.
+
+    File paths and digits are collapsed, so the same error reported for
+    another file or line number produces the same shingles.
+    """
+    words = []
+    for line in lines:
+        line = PATH_RE.sub(" path ", line)
+        words.extend("0" if word.isdigit() else word.lower() for word in WORD_RE.findall(line))
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(lines: List[str]) -> List[int]:
+    """MinHash of a failure's normalized error region."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for shingle in shingles(lines, settings.minhash_shingle_size)
+    ]
+    if not hashes:
+        return [MERSENNE_PRIME] * len(_PERMUTATIONS)
+    return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def log_minhash(raw_log: str) -> List[int]:
+    return minhash_signature(error_region(raw_log))
+
+
+def estimate_similarity(left, right) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+
+class MinHashLSH:
+    """Banded LSH over MinHash signatures with incremental add/remove.
+
+    Signatures that agree on every row of at least one band share a bucket,
+    so candidates are found without comparing against every stored failure.
+    """
+
+    def __init__(self, bands: int = 16, threshold: float = 0.8):
+        self.bands = bands
+        self.threshold = threshold
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self._signatures: Dict[str, array] = {}
+        self._groups: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature) -> List[Tuple[int, int]]:
+        rows = len(signature) // self.bands
+        return [(band, hash(tuple(signature[band * rows:(band + 1) * rows]))) for band in range(self.bands)]
+
+    def add(self, failure_id: str, signature: List[int], group_id: Optional[str] = None):
+        if failure_id in self._signatures:
+            self.remove(failure_id)
+        self._signatures[failure_id] = array("Q", signature)
+        self._groups[failure_id] = group_id or failure_id
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(failure_id)
+
+    def remove(self, failure_id: str):
+        signature = self._signatures.pop(failure_id, None)
+        if signature is None:
+            return
+        self._groups.pop(failure_id, None)
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(failure_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def query(self, signature: List[int], threshold: Optional[float] = None, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Stored failures at or above `threshold` similarity, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        candidates.discard(exclude)
+
+        matches = []
+        for failure_id in candidates:
+            similarity = estimate_similarity(signature, self._signatures[failure_id])
+            if similarity >= threshold:
+                matches.append((failure_id, similarity))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def group_for(self, signature: List[int]) -> Optional[str]:
+        """Group of the most similar stored failure, if any is similar enough."""
+        matches = self.query(signature)
+        return self._groups[matches[0][0]] if matches else None
+
+
+failure_lsh = MinHashLSH(bands=settings.minhash_bands, threshold=settings.minhash_threshold)
+
+
+def assign_failure_group(failure: CIFailure, raw_log: str):
+    """Set a new failure's MinHash and near-duplicate group, and index it.
+
+    Called before insert so failures saved in one transaction can group with
+    each other; ids whose transaction is rolled back are dropped by callers'
+    DB lookups.
+    """
+    failure.minhash = log_minhash(raw_log)
+    failure.failure_group_id = failure_lsh.group_for(failure.minhash) or failure.failure_id
+    index_failure_minhash(failure)
+
+
+def index_failure_minhash(failure: CIFailure):
+    if failure.minhash:
+        failure_lsh.add(failure.failure_id, failure.minhash, failure.failure_group_id)
+
+
+async def load_minhash_history(limit: int = settings.similarity_history_limit) -> int:
+    """Index the MinHash of recent failures (called once at startup)."""
+    async with async_session_maker() as session:
+        rows = await session.execute(
+            select(CIFailure.failure_id, CIFailure.minhash, CIFailure.failure_group_id)
+            .where(CIFailure.minhash.isnot(None))
+            .order_by(CIFailure.id.desc())
+            .limit(limit)
+        )
+        for row in rows.all():
+            index_failure_minhash(row)
+    return len(failure_lsh)
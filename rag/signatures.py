@@ -0,0 +1,262 @@
+"""Deterministic signature engine - rule-based fast path in front of the log parser LLM."""
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from core.config import settings
+from core.metrics import signature_fast_path_hits
+from rag.knowledge_base import INACTIVE_ERROR_TYPES, KNOWLEDGE_BASE, on_knowledge_base_change
+
+# One rule per KNOWLEDGE_BASE error_type. Each pattern carries a weight; a rule
+# fires with high confidence once the weights of the distinct patterns it
+# matched reach `settings.signature_min_score`. Built-in rules only fire while
+# their knowledge base entry is active.
+DEFAULT_RULES = [
+    {
+        "error_type": "TerraformFormatError",
+        "failing_tool": "terraform",
+        "keywords": ["terraform", "fmt", "formatting"],
+        "patterns": [
+            {"pattern": r"Files in the working directory are not formatted", "weight": 1.0},
+            {"pattern": r"terraform fmt -check", "weight": 0.5},
+            {"pattern": r"Run `terraform fmt` to fix", "weight": 0.5},
+        ],
+    },
+    {
+        "error_type": "VaultNamespaceMismatch",
+        "failing_tool": "vault",
+        "keywords": ["vault", "namespace", "403"],
+        "patterns": [
+            {"pattern": r"namespace not authorized", "weight": 1.0},
+            {"pattern": r"namespace claim does not match", "weight": 1.0},
+            {"pattern": r"vault\.[\w.-]+/v1/", "weight": 0.25},
+        ],
+    },
+    {
+        "error_type": "VaultTokenExpired",
+        "failing_tool": "vault",
+        "keywords": ["vault", "token", "expired"],
+        "patterns": [
+            {"pattern": r"token is expired", "weight": 1.0},
+            {"pattern": r"X-Vault-Token", "weight": 0.25},
+            {"pattern": r"\* permission denied", "weight": 0.25},
+        ],
+    },
+    {
+        "error_type": "NexusPermissionDenied",
+        "failing_tool": "nexus",
+        "keywords": ["nexus", "maven", "deploy", "403", "forbidden"],
+        "patterns": [
+            {"pattern": r"Return code is: 403, ReasonPhrase: Forbidden", "weight": 1.0},
+            {"pattern": r"maven-deploy-plugin", "weight": 0.5},
+            {"pattern": r"Failed to deploy artifacts", "weight": 0.5},
+        ],
+    },
+    {
+        "error_type": "MavenDependencyNotFound",
+        "failing_tool": "maven",
+        "keywords": ["maven", "dependency", "artifact", "nexus"],
+        "patterns": [
+            {"pattern": r"Could not resolve dependencies for project", "weight": 1.0},
+            {"pattern": r"Could not find artifact", "weight": 0.75},
+        ],
+    },
+    {
+        "error_type": "DockerPullTimeout",
+        "failing_tool": "docker",
+        "keywords": ["docker", "pull", "registry", "timeout"],
+        "patterns": [
+            {"pattern": r"error pulling image", "weight": 0.75},
+            {"pattern": r"Client\.Timeout exceeded while awaiting headers", "weight": 0.75},
+            {"pattern": r"request canceled while waiting for connection", "weight": 0.5},
+        ],
+    },
+    {
+        "error_type": "OutOfMemory",
+        "failing_tool": "runner",
+        "keywords": ["oom", "memory", "killed", "137"],
+        "patterns": [
+            {"pattern": r"insufficient memory for the Java Runtime Environment", "weight": 1.0},
+            {"pattern": r"java\.lang\.OutOfMemoryError", "weight": 1.0},
+            {"pattern": r"exit code 137", "weight": 0.75},
+            {"pattern": r"^Killed$", "weight": 0.5},
+        ],
+    },
+    {
+        "error_type": "JUnitAssertionFailure",
+        "failing_tool": "junit",
+        "keywords": ["junit", "test", "assertion", "failure"],
+        "patterns": [
+            {"pattern": r"AssertionFailedError", "weight": 1.0},
+            {"pattern": r"java\.lang\.AssertionError", "weight": 1.0},
+            {"pattern": r"Tests run: \d+, Failures: [1-9]", "weight": 0.5},
+            {"pattern": r"<<< FAILURE!", "weight": 0.5},
+        ],
+    },
+    {
+        "error_type": "RunnerJobTimeout",
+        "failing_tool": "gitlab-runner",
+        "keywords": ["runner", "timeout", "execution"],
+        "patterns": [
+            {"pattern": r"execution took longer than", "weight": 1.0},
+        ],
+    },
+    {
+        "error_type": "YAMLSyntaxError",
+        "failing_tool": "gitlab-ci",
+        "keywords": ["yaml", "gitlab-ci", "syntax"],
+        "patterns": [
+            {"pattern": r"yaml invalid", "weight": 1.0},
+            {"pattern": r"config should be a string or an array of strings", "weight": 0.5},
+        ],
+    },
+]
+
+
+class SignatureRule:
+    """Weighted patterns identifying a single error type."""
+
+    def __init__(self, error_type: str, failing_tool: str, keywords: List[str], patterns: List[dict],
+                 builtin: bool = False):
+        self.error_type = error_type
+        self.failing_tool = failing_tool
+        self.keywords = keywords
+        self.builtin = builtin
+        self.sources = [p["pattern"] for p in patterns]
+        self.weights = [float(p.get("weight", 1.0)) for p in patterns]
+        self.matchers = [re.compile(src, re.IGNORECASE | re.MULTILINE) for src in self.sources]
+
+    @classmethod
+    def from_dict(cls, data: dict, builtin: bool = False) -> "SignatureRule":
+        return cls(
+            error_type=data["error_type"],
+            failing_tool=data.get("failing_tool", "unknown"),
+            keywords=list(data.get("keywords", [])),
+            patterns=data["patterns"],
+            builtin=builtin,
+        )
+
+    def active(self, live_types: Set[str]) -> bool:
+        """Built-in rules need a live KB entry; custom ones only stop once their entry is retired or merged."""
+        if self.builtin:
+            return self.error_type in live_types
+        return self.error_type in live_types or self.error_type not in INACTIVE_ERROR_TYPES
+
+
+class SignatureEngine:
+    """Matches a log against every active rule and reports the best confident match.
+
+    Every pattern is searched on its own, so rules whose patterns overlap the
+    same span (e.g. a 403 line two tools would print) all get scored.
+    """
+
+    def __init__(self, rules: List[SignatureRule], min_score: float = 1.0):
+        self.all_rules = rules
+        self.min_score = min_score
+        self.hits = 0
+        self.misses = 0
+        self.refresh()
+
+    def refresh(self):
+        """Re-select the active rules from the live knowledge base (run on every KB change)."""
+        live_types = {item["error_type"] for item in KNOWLEDGE_BASE}
+        self.rules = [rule for rule in self.all_rules if rule.active(live_types)]
+
+    def add_rule(self, rule: SignatureRule):
+        """Register a new rule (replacing any rule with the same error type)."""
+        self.all_rules = [r for r in self.all_rules if r.error_type != rule.error_type] + [rule]
+        self.refresh()
+
+    def record(self, agent: str, used: bool):
+        """Count one fast-path attempt by `agent`; `used` when the match replaced its LLM call."""
+        if used:
+            self.hits += 1
+            signature_fast_path_hits.labels(agent=agent).inc()
+        else:
+            self.misses += 1
+
+    def match(self, log: str) -> Optional[dict]:
+        """Return parsed error fields when a rule matches with high confidence.
+
+        Not counted: the caller records whether it actually used the match.
+        """
+        if not log:
+            return None
+
+        matched: Dict[int, Dict[int, re.Match]] = {}
+        for r_idx, rule in enumerate(self.rules):
+            for p_idx, matcher in enumerate(rule.matchers):
+                m = matcher.search(log)
+                if m is not None:
+                    matched.setdefault(r_idx, {})[p_idx] = m
+
+        scores = {
+            r_idx: sum(self.rules[r_idx].weights[p_idx] for p_idx in patterns)
+            for r_idx, patterns in matched.items()
+        }
+        confident = [r_idx for r_idx, score in scores.items() if score >= self.min_score]
+        if not confident:
+            return None
+
+        best = max(confident, key=lambda r_idx: scores[r_idx])
+        # Two different rules equally sure of themselves: let the LLM decide
+        if sum(1 for r_idx in confident if scores[r_idx] == scores[best]) > 1:
+            return None
+
+        rule = self.rules[best]
+        patterns = matched[best]
+        strongest = max(patterns, key=lambda p_idx: (rule.weights[p_idx], -patterns[p_idx].start()))
+        m = patterns[strongest]
+
+        return {
+            "error_type": rule.error_type,
+            "keywords": list(rule.keywords),
+            "failing_tool": rule.failing_tool,
+            "error_message": _line_at(log, m.start(), m.end()),
+            "confidence": min(scores[best] / self.min_score, 1.0) if self.min_score else 1.0,
+            "source": "signature",
+        }
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "rules": len(self.rules),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+def _line_at(log: str, start: int, end: int) -> str:
+    """Return the full log line(s) containing the span [start, end)."""
+    line_start = log.rfind("\n", 0, start) + 1
+    line_end = log.find("\n", end)
+    if line_end == -1:
+        line_end = len(log)
+    return log[line_start:line_end].strip()
+
+
+def load_rules(path: str = "") -> List[SignatureRule]:
+    """Load default rules plus any extra rules from a JSON file.
+
+    The file holds a list of rules in the same shape as DEFAULT_RULES. A rule
+    whose error_type already exists replaces the built-in one.
+    """
+    rules = {r["error_type"]: SignatureRule.from_dict(r, builtin=True) for r in DEFAULT_RULES}
+
+    if path:
+        extra = json.loads(Path(path).read_text())
+        for data in extra:
+            rules[data["error_type"]] = SignatureRule.from_dict(data)
+
+    return list(rules.values())
+
+
+signature_engine = SignatureEngine(
+    load_rules(settings.signature_rules_path),
+    min_score=settings.signature_min_score,
+)
+
+# Promoted, retired and merged entries take effect without a restart
+on_knowledge_base_change(lambda version, error_types: signature_engine.refresh())
@@ -0,0 +1,247 @@
+"""Persisted knowledge base that grows from analysed failures."""
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.logs import get_logger
+from db.database import async_session_maker
+from db.models import CIFailure, KnowledgeEntry
+from rag.knowledge_base import INACTIVE_ERROR_TYPES, KNOWLEDGE_BASE, notify_knowledge_base_changed
+
+logger = get_logger("rag.store")
+
+# Parser outputs that never describe a real failure signature
+IGNORED_ERROR_TYPES = {"ParseError", "Unknown", ""}
+
+EDITABLE_FIELDS = ["category", "description", "fix", "commands", "status"]
+# Statuses a curator may set directly; "merged" is only set by merge()
+CURATED_STATUSES = {"active", "candidate", "retired"}
+
+
+class KnowledgeStore:
+    """Keeps KNOWLEDGE_BASE in sync with the knowledge_entries table.
+
+    KNOWLEDGE_BASE is updated in place, so every reader (similar_finder, the
+    BM25 index payloads, category lookups) sees live seen counts and newly
+    promoted entries without re-importing or rebuilding anything.
+    """
+
+    def __init__(self, promote_threshold: int = 3):
+        self.promote_threshold = promote_threshold
+        self._aliases = {}  # merged error_type -> surviving error_type
+
+    async def load(self):
+        """Seed the table on first run, then load active entries (startup)."""
+        async with async_session_maker() as session:
+            rows = (await session.execute(select(KnowledgeEntry))).scalars().all()
+            if not rows:
+                rows = [KnowledgeEntry(**item, status="active") for item in KNOWLEDGE_BASE]
+                session.add_all(rows)
+                await session.commit()
+
+        self._aliases = {row.error_type: row.merged_into for row in rows if row.status == "merged"}
+        KNOWLEDGE_BASE[:] = [row.to_kb_item() for row in rows if row.status == "active"]
+        INACTIVE_ERROR_TYPES.clear()
+        INACTIVE_ERROR_TYPES.update(row.error_type for row in rows if row.status in ("retired", "merged"))
+        notify_knowledge_base_changed()
+        return len(KNOWLEDGE_BASE)
+
+    def _live(self, error_type: str) -> Optional[dict]:
+        for item in KNOWLEDGE_BASE:
+            if item["error_type"] == error_type:
+                return item
+        return None
+
+    def resolve(self, error_type: str) -> str:
+        """Follow merge aliases to the surviving error type."""
+        seen = set()
+        while error_type in self._aliases and error_type not in seen:
+            seen.add(error_type)
+            error_type = self._aliases[error_type]
+        return error_type
+
+    # ============================================================
+    # INCREMENTAL UPDATES
+    # ============================================================
+
+    async def record_failure(self, session: AsyncSession, failure: CIFailure) -> Optional[dict]:
+        """Count a recurrence inside the caller's transaction.
+
+        Returns a pending update to pass to `apply()` once the transaction has
+        committed, or None when there is nothing to record.
+        """
+        if failure.error_type in IGNORED_ERROR_TYPES:
+            return None
+        error_type = self.resolve(failure.error_type)
+
+        result = await session.execute(
+            update(KnowledgeEntry)
+            .where(KnowledgeEntry.error_type == error_type)
+            .values(seen_count=KnowledgeEntry.seen_count + 1)
+            .returning(KnowledgeEntry.status, KnowledgeEntry.seen_count)
+        )
+        row = result.first()
+
+        if row is None:
+            try:
+                # Savepoint: a concurrent insert of the same candidate must not
+                # roll back the caller's CIFailure row
+                async with session.begin_nested():
+                    session.add(KnowledgeEntry(
+                        error_type=error_type,
+                        category=failure.failure_category,
+                        description=failure.root_cause,
+                        fix=failure.suggested_fix,
+                        commands=failure.fix_commands,
+                        seen_count=1,
+                        status="candidate"
+                    ))
+                status, seen_count = "candidate", 1
+            except IntegrityError:
+                result = await session.execute(
+                    update(KnowledgeEntry)
+                    .where(KnowledgeEntry.error_type == error_type)
+                    .values(seen_count=KnowledgeEntry.seen_count + 1)
+                    .returning(KnowledgeEntry.status, KnowledgeEntry.seen_count)
+                )
+                status, seen_count = result.first()
+        else:
+            status, seen_count = row
+
+        promoted = status == "candidate" and seen_count >= self.promote_threshold
+        if promoted:
+            # Refresh the candidate with the latest analysis before it goes live
+            await session.execute(
+                update(KnowledgeEntry)
+                .where(KnowledgeEntry.error_type == error_type)
+                .values(
+                    status="active",
+                    category=failure.failure_category,
+                    description=failure.root_cause,
+                    fix=failure.suggested_fix,
+                    commands=failure.fix_commands
+                )
+            )
+
+        return {"error_type": error_type, "seen_count": seen_count, "promoted": promoted, "failure": failure}
+
+    def apply(self, pending: Optional[dict]):
+        """Mirror a committed update into the in-memory knowledge base."""
+        if pending is None:
+            return
+
+        error_type = pending["error_type"]
+        if pending["promoted"]:
+            failure = pending["failure"]
+            KNOWLEDGE_BASE.append({
+                "error_type": error_type,
+                "category": failure.failure_category,
+                "description": failure.root_cause,
+                "fix": failure.suggested_fix,
+                "commands": failure.fix_commands or [],
+                "seen_count": pending["seen_count"]
+            })
+            logger.info("Knowledge base: promoted %s", error_type, extra={"error_type": error_type})
+            notify_knowledge_base_changed([error_type])
+            return
+
+        item = self._live(error_type)
+        if item is not None:
+            item["seen_count"] += 1
+
+    # ============================================================
+    # CURATION
+    # ============================================================
+
+    async def list_entries(self, status: Optional[str] = None) -> List[dict]:
+        async with async_session_maker() as session:
+            query = select(KnowledgeEntry).order_by(KnowledgeEntry.seen_count.desc())
+            if status:
+                query = query.where(KnowledgeEntry.status == status)
+            rows = (await session.execute(query)).scalars().all()
+        return [row.to_dict() for row in rows]
+
+    async def update_entry(self, error_type: str, changes: dict) -> Optional[dict]:
+        """Edit an entry by hand; it is marked curated.
+        
+        Raises ValueError for a status outside CURATED_STATUSES.
+        """
+        status = changes.get("status")
+        if status == "merged":
+            raise ValueError("Entries are merged with POST /api/admin/knowledge-base/merge")
+        if status is not None and status not in CURATED_STATUSES:
+            raise ValueError(f"Unknown status {status!r} (expected one of {sorted(CURATED_STATUSES)})")
+        async with async_session_maker() as session:
+            row = (await session.execute(
+                select(KnowledgeEntry).where(KnowledgeEntry.error_type == error_type)
+            )).scalar_one_or_none()
+            if row is None:
+                return None
+            if status is not None and row.status == "merged":
+                # Un-merged: the entry stands on its own again
+                row.merged_into = None
+                self._aliases.pop(error_type, None)
+            for field in EDITABLE_FIELDS:
+                if changes.get(field) is not None:
+                    setattr(row, field, changes[field])
+            row.curated = True
+            await session.commit()
+            await session.refresh(row)
+            entry = row.to_dict()
+
+        self._sync_live(row)
+        notify_knowledge_base_changed([error_type])
+        return entry
+
+    async def merge(self, sources: List[str], target: str) -> Optional[dict]:
+        """Fold duplicate entries into `target`, summing their seen counts."""
+        sources = [s for s in sources if s != target]
+        async with async_session_maker() as session:
+            rows = (await session.execute(
+                select(KnowledgeEntry).where(KnowledgeEntry.error_type.in_(sources + [target]))
+            )).scalars().all()
+            by_type = {row.error_type: row for row in rows}
+            if target not in by_type:
+                return None
+
+            survivor = by_type[target]
+            for source in sources:
+                row = by_type.get(source)
+                if row is None or row.status == "merged":
+                    continue
+                survivor.seen_count = (survivor.seen_count or 0) + (row.seen_count or 0)
+                row.status = "merged"
+                row.merged_into = target
+                self._aliases[source] = target
+            survivor.status = "active"
+            survivor.curated = True
+            await session.commit()
+            await session.refresh(survivor)
+            entry = survivor.to_dict()
+            merged_rows = [by_type[s] for s in sources if s in by_type]
+
+        for row in merged_rows + [survivor]:
+            self._sync_live(row)
+        notify_knowledge_base_changed(sources + [target])
+        return entry
+
+    def _sync_live(self, row: KnowledgeEntry):
+        """Update, add or drop the in-memory copy of an entry."""
+        item = self._live(row.error_type)
+        if row.status in ("retired", "merged"):
+            INACTIVE_ERROR_TYPES.add(row.error_type)
+        else:
+            INACTIVE_ERROR_TYPES.discard(row.error_type)
+        if row.status != "active":
+            if item is not None:
+                KNOWLEDGE_BASE.remove(item)
+        elif item is None:
+            KNOWLEDGE_BASE.append(row.to_kb_item())
+        else:
+            item.update(row.to_kb_item())
+
+
+knowledge_store = KnowledgeStore(promote_threshold=settings.kb_promote_threshold)
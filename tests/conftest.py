@@ -0,0 +1,18 @@
+"""Test settings: scratch database and log store, dummy Azure credentials, no network."""
+import os
+import tempfile
+
+# Settings are read when core.config is first imported, so this runs before any app module
+_scratch = tempfile.mkdtemp(prefix="ci_rca_tests_")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_scratch}/test.db",
+    "LOG_STORE_PATH": os.path.join(_scratch, "log_store"),
+    "AZURE_OPENAI_API_KEY": "test",
+    "AZURE_OPENAI_ENDPOINT": "https://test.openai.azure.com/",
+    "GITLAB_TOKEN": "test",
+    "PROJECT_ID": "1",
+    "LLM_WARM_UP": "false",
+    "LLM_MEMO_PATH": "",
+    "SIGNATURE_RULES_PATH": "",
+    "LOG_FORMAT": "text",
+})
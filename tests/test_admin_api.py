@@ -0,0 +1,46 @@
+import asyncio
+
+import httpx
+
+from core.config import settings
+from db.database import init_db
+from main import app
+
+
+def request(method, path, **kwargs):
+    async def scenario():
+        await init_db()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(scenario())
+
+
+def test_admin_api_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "")
+    response = request("GET", "/api/admin/knowledge-base", headers={"X-Admin-Token": ""})
+    assert response.status_code == 503
+
+
+def test_admin_api_rejects_wrong_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    for method, path, body in [
+        ("GET", "/api/admin/knowledge-base", None),
+        ("PUT", "/api/admin/knowledge-base/OutOfMemory", {"fix": "x"}),
+        ("POST", "/api/admin/knowledge-base/merge", {"sources": ["A"], "target": "B"}),
+    ]:
+        missing = request(method, path, json=body)
+        wrong = request(method, path, json=body, headers={"X-Admin-Token": "guess"})
+        assert missing.status_code == wrong.status_code == 401
+        assert "error" in wrong.json()
+
+
+def test_unknown_entries_return_404(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+    update = request("PUT", "/api/admin/knowledge-base/NoSuchError", json={"fix": "x"}, headers=headers)
+    assert update.status_code == 404
+    merge = request("POST", "/api/admin/knowledge-base/merge",
+                    json={"sources": ["A"], "target": "NoSuchError"}, headers=headers)
+    assert merge.status_code == 404
@@ -0,0 +1,26 @@
+import asyncio
+
+import httpx
+
+from core.jobs import rca_queue
+from db.database import init_db
+from main import app
+
+ITEM = {
+    "pipeline_id": "1", "project_name": "proj", "job_name": "test", "stage": "test",
+    "raw_log": "npm ERR! code E404", "job_status": "failed",
+}
+
+
+def test_batch_rejected_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(rca_queue, "max_pending", 1)
+
+    async def scenario():
+        await init_db()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/analyze/batch", json={"items": [ITEM, ITEM]})
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 503
+    assert "queue is full" in response.json()["error"]
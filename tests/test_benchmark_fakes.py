@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from benchmarks.fakes import FakeChatModel, FakeGitLab
+from benchmarks.samples import load_samples
+from core.gitlab import GitLabClient
+
+
+@pytest.fixture(scope="module")
+def gitlab():
+    server = FakeGitLab(trace_bytes=4096, jobs_per_pipeline=5, failed_ratio=0.4).start()
+    yield server
+    server.stop()
+
+
+def get(gitlab, path, **kwargs):
+    return httpx.get(f"{gitlab.url}/api/v4/projects/1{path}", **kwargs)
+
+
+def test_pipelines_and_paginated_jobs(gitlab):
+    pipeline = get(gitlab, "/pipelines").json()[0]
+    assert pipeline["status"] == "failed"
+    assert get(gitlab, "/pipelines").json()[0]["id"] == pipeline["id"] + 1
+
+    first = get(gitlab, f"/pipelines/{pipeline['id']}/jobs", params={"per_page": 3, "page": 1})
+    second = get(gitlab, f"/pipelines/{pipeline['id']}/jobs", params={"per_page": 3, "page": 2})
+    assert first.headers["X-Next-Page"] == "2" and "X-Next-Page" not in second.headers
+    jobs = first.json() + second.json()
+    assert [job["status"] for job in jobs] == ["failed", "failed", "success", "success", "success"]
+
+
+def test_trace_ranges(gitlab):
+    full = get(gitlab, "/jobs/7/trace")
+    assert full.status_code == 200
+    data = full.content
+    assert data.endswith(b"ERROR: Job failed: exit code 1\n")
+
+    suffix = get(gitlab, "/jobs/7/trace", headers={"Range": "bytes=-100"})
+    assert suffix.status_code == 206 and suffix.content == data[-100:]
+    assert suffix.headers["Content-Range"] == f"bytes {len(data) - 100}-{len(data) - 1}/{len(data)}"
+
+    offset = get(gitlab, "/jobs/7/trace", headers={"Range": "bytes=10-"})
+    assert offset.status_code == 206 and offset.content == data[10:]
+
+    for start in [len(data), len(data) + 50]:
+        past_end = get(gitlab, "/jobs/7/trace", headers={"Range": f"bytes={start}-"})
+        assert past_end.status_code == 416
+        assert past_end.headers["Content-Range"] == f"bytes */{len(data)}"
+
+
+def test_tailing_client_reads_nothing_new_past_the_end(gitlab):
+    async def scenario():
+        client = GitLabClient(f"{gitlab.url}/api/v4", "token")
+        data, start = await client.trace_range("1", 7, last_bytes=64)
+        rest, rest_start = await client.trace_range("1", 7, start=start + len(data))
+        await client.close()
+        return data, start, rest, rest_start
+
+    data, start, rest, rest_start = asyncio.run(scenario())
+    assert len(data) == 64
+    assert rest == b"" and rest_start == start + 64
+
+
+def test_fake_chat_model_answers_each_agent():
+    sample = load_samples()[0]
+    model = FakeChatModel(latency_ms=0, jitter_ms=0, samples=load_samples())
+    user = HumanMessage(content=f"Job: {sample['job_name']} | Stage: {sample['stage']}")
+
+    async def scenario():
+        parsed = await model.ainvoke([SystemMessage(content="You are a log analyzer."), user])
+        classified = await model.ainvoke([SystemMessage(content="You are a classification expert."), user])
+        chunks = [chunk.content async for chunk in model.astream([SystemMessage(content="troubleshooting expert"), user])]
+        return json.loads(parsed.content), json.loads(classified.content), json.loads("".join(chunks))
+
+    parsed, classified, fix = asyncio.run(scenario())
+    assert parsed["error_type"] == sample["expected_error_type"]
+    assert classified["category"] == sample["expected_category"]
+    assert fix["commands"] and fix["confidence"] == 0.8
+    assert model.calls == 3
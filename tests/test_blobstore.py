@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from core.blobstore import LogBlobStore, zstandard
+
+CODECS = ["zlib"] + (["zstd"] if zstandard is not None else [])
+
+
+def sample_log() -> str:
+    # Multi-byte characters straddle chunk boundaries
+    return "".join(f"line {n}: résumé ✓ build step output\n" for n in range(5000))
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip_and_range_reads(tmp_path, codec):
+    store = LogBlobStore(str(tmp_path), codec=codec, chunk_bytes=1024)
+    text = sample_log()
+    data = text.encode("utf-8")
+
+    ref, size = store.put(text)
+    assert size == len(data) == store.size(ref)
+    assert store.read(ref) == text
+
+    for start, end in [(0, 10), (1000, 1050), (1020, 3100), (len(data) - 7, None), (5, 5), (len(data) + 10, None)]:
+        assert store.read_bytes(ref, start, end) == data[start:end]
+
+
+def test_identical_logs_are_stored_once(tmp_path):
+    store = LogBlobStore(str(tmp_path), codec="zlib", chunk_bytes=4096)
+    ref, _ = store.put(sample_log())
+    mtime = os.stat(store.path(ref)).st_mtime_ns
+
+    assert store.put(sample_log())[0] == ref
+    assert os.stat(store.path(ref)).st_mtime_ns == mtime
+    assert store.put(sample_log() + "x")[0] != ref
+
+
+def test_empty_log(tmp_path):
+    store = LogBlobStore(str(tmp_path), codec="zlib")
+    ref, size = store.put("")
+    assert size == 0 and store.read(ref) == ""
+
+
+def test_partial_characters_are_replaced(tmp_path):
+    store = LogBlobStore(str(tmp_path), codec="zlib", chunk_bytes=16)
+    ref, _ = store.put("ab✓cd")
+    assert store.read(ref, 0, 3) == "ab�"
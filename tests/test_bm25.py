@@ -0,0 +1,46 @@
+from rag.index import BM25Index, kb_document, tokenize
+
+
+def test_tokenize_splits_camel_case():
+    assert tokenize("VaultTokenExpired: HTTP 403") == ["vault", "token", "expired", "http", "403"]
+
+
+def test_exact_match_ranks_first():
+    index = BM25Index()
+    index.add("nexus", "NexusPermissionDenied maven deploy 403 forbidden", {"error_type": "NexusPermissionDenied"})
+    index.add("vault", "VaultTokenExpired vault token expired permission denied", {"error_type": "VaultTokenExpired"})
+    index.add("docker", "DockerPullTimeout docker pull registry timeout", {"error_type": "DockerPullTimeout"})
+
+    results = index.search("vault token expired", k=3)
+    assert results[0]["doc_id"] == "vault"
+    assert results[0]["payload"] == {"error_type": "VaultTokenExpired"}
+    assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = BM25Index()
+    for n in range(5):
+        index.add(f"common-{n}", "error build failed", {})
+    index.add("rare", "error terraform", {})
+
+    assert index.search("error terraform", k=1)[0]["doc_id"] == "rare"
+
+
+def test_remove_and_replace_keep_statistics_consistent():
+    index = BM25Index()
+    index.add("a", "disk full", {})
+    index.add("b", "disk quota exceeded", {})
+    index.add("a", "network unreachable", {"v": 2})
+    index.remove("b")
+
+    assert len(index) == 1 and "b" not in index
+    assert index.search("disk") == []
+    assert index.search("network")[0]["payload"] == {"v": 2}
+    fresh = BM25Index()
+    fresh.add("a", "network unreachable", {"v": 2})
+    assert index.search("network")[0]["score"] == fresh.search("network")[0]["score"]
+
+
+def test_kb_documents_repeat_the_error_type():
+    doc = kb_document({"error_type": "OutOfMemory", "category": "Infrastructure", "description": "Job killed"})
+    assert tokenize(doc).count("memory") == 2
@@ -0,0 +1,33 @@
+import asyncio
+
+from core.cache import RCAResultCache
+from db.database import init_db
+
+RESULT = {
+    "error_signatures": ["boom"],
+    "error_keywords": ["boom"],
+    "parsed_errors": {"error_type": "Boom"},
+    "failure_category": "Test",
+    "category_confidence": 0.9,
+    "suggested_fix": "fix it",
+    "fix_commands": [],
+    "similar_cases": [],
+    "seen_count": 1,
+}
+
+
+def test_entries_are_per_mode():
+    async def scenario():
+        await init_db()
+        cache = RCAResultCache(max_entries=10, ttl_seconds=60)
+        await cache.put("fp-mode", RESULT, "chain")
+
+        assert (await cache.get("fp-mode", "chain"))["failure_category"] == "Test"
+        assert await cache.get("fp-mode", "fused") is None
+
+        cache.invalidate_memory()
+        assert (await cache.get("fp-mode", "chain"))["suggested_fix"] == "fix it"  # From the table
+        await cache.invalidate("fp-mode")
+        assert await cache.get("fp-mode", "chain") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,16 @@
+import pytest
+from pydantic import ValidationError
+
+from core.config import RCA_MODE_NAMES, Settings
+
+
+def test_rca_mode_is_validated():
+    assert Settings(rca_mode="fused").rca_mode == "fused"
+    with pytest.raises(ValidationError, match="RCA_MODE must be one of"):
+        Settings(rca_mode="fusd")
+
+
+def test_mode_names_match_the_graphs():
+    from agents.graph import RCA_MODES
+
+    assert set(RCA_MODES) == set(RCA_MODE_NAMES)
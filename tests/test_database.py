@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, inspect, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from db.database import (
+    SQLITE_DATETIMES_NORMALIZED, _add_missing_columns, _create_missing_indexes, _normalize_sqlite_datetimes
+)
+from db.models import Base, CIFailure
+
+LEGACY_SCHEMA = """
+CREATE TABLE ci_failures (
+    id INTEGER PRIMARY KEY, failure_id VARCHAR UNIQUE, pipeline_id VARCHAR, project_name VARCHAR,
+    job_name VARCHAR, stage VARCHAR, job_status VARCHAR, raw_log TEXT, error_type VARCHAR,
+    error_keywords JSON, failure_category VARCHAR, root_cause TEXT, suggested_fix TEXT,
+    fix_commands JSON, confidence FLOAT, similar_cases JSON, seen_count INTEGER,
+    processing_time_ms INTEGER, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+)
+"""
+
+
+def test_existing_tables_get_new_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_SCHEMA))
+        conn.execute(text(
+            "INSERT INTO ci_failures (failure_id, project_name, error_type, raw_log) "
+            "VALUES ('old-1', 'proj', 'OutOfMemory', 'Killed')"
+        ))
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        _add_missing_columns(conn)
+        _create_missing_indexes(conn)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("ci_failures")}
+    assert {"log_fingerprint", "similarity_scores", "rca_source_id", "minhash",
+            "failure_group_id", "log_ref", "log_size", "agent_timings"} <= columns
+    indexes = {index["name"] for index in inspect(engine).get_indexes("ci_failures")}
+    assert "ix_ci_failures_created_id" in indexes
+
+    with Session(engine) as session:
+        old = session.execute(select(CIFailure)).scalar_one()
+        assert old.failure_id == "old-1" and old.log_ref is None
+        session.add(CIFailure(failure_id="new-1", log_fingerprint="abc", agent_timings={}))
+        session.commit()
+        assert session.execute(select(CIFailure.failure_id).order_by(CIFailure.id)).scalars().all() == ["old-1", "new-1"]
+
+
+def test_up_to_date_tables_are_left_alone(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/current.db")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        _add_missing_columns(conn)
+        _add_missing_columns(conn)
+    assert "agent_timings" in {column["name"] for column in inspect(engine).get_columns("ci_failures")}
+
+
+def test_legacy_timestamps_compare_with_keyset_cursors(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_SCHEMA))
+        for failure_id in ["old-1", "old-2"]:
+            conn.execute(text(
+                "INSERT INTO ci_failures (failure_id, created_at) VALUES (:id, '2024-01-01 10:00:00')"
+            ), {"id": failure_id})
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        _add_missing_columns(conn)
+        _normalize_sqlite_datetimes(conn)
+
+    with Session(engine) as session:
+        # Cursor of the first page, which ended at old-2
+        after = (datetime(2024, 1, 1, 10, 0, 0), 2)
+        rest = session.execute(
+            select(CIFailure.failure_id).where(tuple_(CIFailure.created_at, CIFailure.id) < tuple_(*after))
+        ).scalars().all()
+        assert rest == ["old-1"]
+        assert session.execute(select(CIFailure.created_at)).scalars().first() == datetime(2024, 1, 1, 10, 0, 0)
+
+
+def test_datetimes_are_normalized_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/once.db")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        _normalize_sqlite_datetimes(conn)
+        assert conn.execute(text("PRAGMA user_version")).scalar() == SQLITE_DATETIMES_NORMALIZED
+        conn.execute(text(
+            "INSERT INTO ci_failures (failure_id, created_at) VALUES ('late', '2024-01-01 10:00:00')"
+        ))
+        _normalize_sqlite_datetimes(conn)
+        # Already migrated: no further table scans
+        assert conn.execute(text("SELECT created_at FROM ci_failures")).scalar() == "2024-01-01 10:00:00"
@@ -0,0 +1,33 @@
+from core.fingerprint import cluster_by_fingerprint, log_fingerprint
+
+
+def shard_log(n: int) -> str:
+    return (
+        f"\x1b[0KRunning on runner-{n}abc via gitlab-runner {n}\n"
+        f"section_start:17000000{n}:step_script\r\x1b[0K$ docker pull registry/app:latest\n"
+        f"2024-05-0{n}T10:1{n}:0{n}.123Z Pulling layer {n}f3a9c2e1b7d4\n"
+        f"ERROR: job {n}000{n} failed: pull timed out after 300s for /builds/team/shard-{n}/app\n"
+        f"Cleaning up /tmp/build-{n}-{n * 7}/cache\n"
+    )
+
+
+def test_masked_variants_cluster_together():
+    logs = [shard_log(n) for n in range(1, 6)]
+    assert len({log_fingerprint(log) for log in logs}) == 1
+    assert list(cluster_by_fingerprint(logs).values()) == [[0, 1, 2, 3, 4]]
+
+
+def test_uuids_and_pipeline_ids_are_masked():
+    a = "Deploy 3f2b8c1e-1d2a-4c3b-9e8f-0a1b2c3d4e5f failed in pipeline #81234 at 12:00:01\n"
+    b = "Deploy 9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d failed in pipeline #99871 at 23:59:59\n"
+    assert log_fingerprint(a) == log_fingerprint(b)
+
+
+def test_different_errors_stay_apart():
+    logs = [
+        shard_log(1),
+        "npm ERR! code E404\nnpm ERR! 404 Not Found - GET https://registry/left-pad\n",
+        shard_log(2),
+        "Error: Files in the working directory are not formatted\n",
+    ]
+    assert list(cluster_by_fingerprint(logs).values()) == [[0, 2], [1], [3]]
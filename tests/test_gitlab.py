@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+import pytest
+
+import core.gitlab
+from core.gitlab import GitLabClient, GitLabError
+
+
+def run(responses, monkeypatch, max_retries=3):
+    """Serve `responses` in order to one GET; returns (result or error, request count, backoff delays)."""
+    calls = []
+    delays = []
+
+    def handler(request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    async def no_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(core.gitlab.asyncio, "sleep", no_sleep)
+
+    async def scenario():
+        client = GitLabClient("https://gitlab.test/api/v4", "token", max_retries=max_retries, backoff_seconds=0.01)
+        client._client = httpx.AsyncClient(base_url=client.api_base, transport=httpx.MockTransport(handler))
+        try:
+            return await client.get_json("/projects/1/pipelines")
+        except GitLabError as e:
+            return e
+        finally:
+            await client.close()
+
+    return asyncio.run(scenario()), len(calls), delays
+
+
+def test_429_waits_for_retry_after(monkeypatch):
+    result, calls, delays = run([
+        httpx.Response(429, headers={"Retry-After": "7"}, text="slow down"),
+        httpx.Response(200, json=[{"id": 1}]),
+    ], monkeypatch)
+    assert result == [{"id": 1}]
+    assert calls == 2
+    assert delays == [7.0]
+
+
+def test_5xx_is_retried_with_backoff_until_it_gives_up(monkeypatch):
+    result, calls, delays = run([httpx.Response(502, text="bad gateway")], monkeypatch, max_retries=2)
+    assert isinstance(result, GitLabError) and result.status_code == 502
+    assert calls == 3
+    assert len(delays) == 2 and delays[1] > delays[0] > 0
+
+
+def test_5xx_then_success(monkeypatch):
+    result, calls, _ = run([httpx.Response(503), httpx.Response(200, json=[])], monkeypatch)
+    assert result == [] and calls == 2
+
+
+@pytest.mark.parametrize("status", [400, 401, 404])
+def test_4xx_is_not_retried(monkeypatch, status):
+    result, calls, delays = run([httpx.Response(status, text="nope")], monkeypatch)
+    assert isinstance(result, GitLabError) and result.status_code == status
+    assert calls == 1
+    assert delays == []
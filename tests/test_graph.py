@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from agents import batch
+from agents.graph import critical_path, create_rca_graph, initial_rca_state
+
+STATE = {"pipeline_id": "1", "project_name": "demo", "job_name": "test", "stage": "test",
+         "raw_log": "ERROR: boom\n", "job_status": "failed"}
+
+
+def sleeping(seconds, update=None):
+    async def agent(state):
+        await asyncio.sleep(seconds)
+        return dict(update or {})
+    return agent
+
+
+def nodes(classifier_seconds, similar_seconds):
+    return {
+        "log_parser": (sleeping(0.01, {"parsed_errors": {"error_type": "Boom"}}), []),
+        "classifier": (sleeping(classifier_seconds, {"failure_category": "Test"}), ["log_parser"]),
+        "similar_finder": (sleeping(similar_seconds, {"seen_count": 2}), ["log_parser"]),
+        "fix_suggester": (sleeping(0.01, {"suggested_fix": "fix"}), ["classifier", "similar_finder"]),
+    }
+
+
+@pytest.mark.parametrize("classifier_seconds, similar_seconds, slower", [
+    (0.15, 0.02, "classifier"),
+    (0.02, 0.15, "similar_finder"),
+])
+def test_branches_run_in_parallel_and_the_longer_one_is_critical(classifier_seconds, similar_seconds, slower):
+    graph_nodes = nodes(classifier_seconds, similar_seconds)
+    result = asyncio.run(create_rca_graph(graph_nodes).ainvoke(initial_rca_state(**STATE)))
+    t = result["node_timings"]
+
+    assert set(t) == set(graph_nodes)
+    for branch in ["classifier", "similar_finder"]:
+        assert t[branch]["start"] >= t["log_parser"]["end"]
+    # Fan-out: both branches overlap instead of running one after the other
+    assert t["classifier"]["start"] < t["similar_finder"]["end"]
+    assert t["similar_finder"]["start"] < t["classifier"]["end"]
+    # Fan-in: the fix suggester waits for both
+    assert t["fix_suggester"]["start"] >= max(t["classifier"]["end"], t["similar_finder"]["end"])
+    assert result["failure_category"] == "Test" and result["seen_count"] == 2
+
+    assert critical_path(t, graph_nodes) == ["log_parser", slower, "fix_suggester"]
+
+
+def test_batched_nodes_publish_stage_events(monkeypatch):
+    published = []
+    monkeypatch.setattr(batch.event_bus, "publish", lambda *event: published.append(event))
+    states = [initial_rca_state(**STATE) for _ in range(3)]
+    errors = [None, "log_parser: failed", None]
+
+    asyncio.run(batch.run_batched_node(
+        "similar_finder", sleeping(0, {"seen_count": 4, "similar_cases": [{"error_type": "Boom"}]}),
+        states, errors, max_concurrency=2, failure_ids=["a", "b", "c"]
+    ))
+
+    assert [(failure_id, event) for failure_id, event, _ in published] == [("a", "stage"), ("c", "stage")]
+    assert published[0][2]["node"] == "similar_finder"
+    assert published[0][2]["similar_cases"] == ["Boom"]
+    assert "similar_finder" in states[0]["node_timings"] and not states[1]["node_timings"]
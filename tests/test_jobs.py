@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import delete
+
+from core.jobs import QueueFullError, RCAWorkerPool, enqueue_rca, mark_job_done
+from db.database import async_session_maker, init_db
+from db.models import RCAJob
+
+
+def run(scenario):
+    async def with_empty_queue():
+        await init_db()
+        async with async_session_maker() as session:
+            await session.execute(delete(RCAJob))
+            await session.commit()
+        return await scenario()
+
+    return asyncio.run(with_empty_queue())
+
+
+async def add_jobs(*jobs):
+    async with async_session_maker() as session:
+        for failure_id, leader_id in jobs:
+            enqueue_rca(session, failure_id, "log", leader_id=leader_id)
+        await session.commit()
+
+
+async def get_job(failure_id):
+    async with async_session_maker() as session:
+        return await session.get(RCAJob, failure_id)
+
+
+def test_claim_takes_each_queued_job_once():
+    async def scenario():
+        await add_jobs(("a", None), ("b", None), ("member", "a"))
+        pool = RCAWorkerPool(workers=2)
+        claimed = [await pool._claim(), await pool._claim(), await pool._claim()]
+        return claimed
+
+    first, second, third = run(scenario)
+    assert {first.id, second.id} == {"a", "b"}
+    assert first.status == "running" and first.attempts == 1
+    assert third is None  # Waiting members are never claimed
+
+
+def test_failed_job_is_retried_with_backoff_then_failed():
+    async def scenario():
+        await add_jobs(("a", None), ("member", "a"))
+        pool = RCAWorkerPool(max_attempts=2, retry_backoff_seconds=60)
+        job = await pool._claim()
+        await pool._finish_failed(job, RuntimeError("boom"))
+        retried = await get_job("a")
+        too_early = await pool._claim()
+
+        async with async_session_maker() as session:
+            (await session.get(RCAJob, "a")).available_at = 0
+            await session.commit()
+        job = await pool._claim()
+        await pool._finish_failed(job, RuntimeError("boom again"))
+        return retried, too_early, job, await get_job("a"), await get_job("member")
+
+    retried, too_early, second, failed, member = run(scenario)
+    assert retried.status == "queued" and retried.available_at > time.time() + 50
+    assert too_early is None
+    assert second.attempts == 2
+    assert failed.status == "failed" and failed.last_error == "boom again"
+    assert member.status == "failed"
+
+
+def test_expired_lease_is_reclaimed_until_attempts_run_out():
+    async def scenario():
+        await add_jobs(("a", None), ("member", "a"))
+        pool = RCAWorkerPool(max_attempts=2, lease_seconds=-1)  # Every lease is already expired
+        first = await pool._claim()
+        second = await pool._claim()
+        third = await pool._claim()
+        return first, second, third, await get_job("a"), await get_job("member")
+
+    first, second, third, job, member = run(scenario)
+    assert (first.attempts, second.attempts) == (1, 2)
+    assert third is None
+    assert job.status == "failed" and "Lease expired" in job.last_error
+    assert member.status == "failed"
+
+
+def test_check_capacity_rejects_beyond_max_pending():
+    async def scenario():
+        await add_jobs(("a", None), ("b", None), ("member", "a"))
+        pool = RCAWorkerPool(max_pending=3)
+        async with async_session_maker() as session:
+            await pool.check_capacity(session, incoming=1)
+            with pytest.raises(QueueFullError):
+                await pool.check_capacity(session, incoming=2)
+
+    run(scenario)
+
+
+def test_done_job_is_not_requeued_by_a_late_error():
+    async def scenario():
+        await add_jobs(("a", None))
+        pool = RCAWorkerPool()
+        job = await pool._claim()
+        async with async_session_maker() as session:
+            await mark_job_done(session, "a")
+            await session.commit()
+        await pool._finish_failed(job, RuntimeError("index update failed"))
+        return await get_job("a")
+
+    assert run(scenario).status == "done"
+
+
+def test_worker_survives_errors_while_recording_a_failure(monkeypatch):
+    async def scenario():
+        handled = []
+
+        async def handler(job):
+            handled.append(job.id)
+            raise RuntimeError("analysis failed")
+
+        async def broken_finish(job, error):
+            raise RuntimeError("database is locked")
+
+        await add_jobs(("a", None), ("b", None))
+        pool = RCAWorkerPool(workers=1, poll_seconds=1)
+        monkeypatch.setattr(pool, "_finish_failed", broken_finish)
+        await pool.start(handler)
+        for _ in range(100):
+            if len(handled) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)  # Back to waiting for work, not mid-query
+        alive = not pool._tasks[0].done()
+        await pool.stop()
+        return handled, alive
+
+    handled, alive = run(scenario)
+    assert sorted(handled) == ["a", "b"]
+    assert alive
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete
+
+from core.config import settings
+from db.database import async_session_maker, init_db
+from db.models import CIFailure, KnowledgeEntry
+from rag.knowledge_base import INACTIVE_ERROR_TYPES, KNOWLEDGE_BASE, notify_knowledge_base_changed
+from rag.store import KnowledgeStore
+from test_admin_api import request
+
+
+def live(error_type):
+    return next((item for item in KNOWLEDGE_BASE if item["error_type"] == error_type), None)
+
+
+async def reset(*error_types):
+    await init_db()
+    async with async_session_maker() as db:
+        await db.execute(delete(KnowledgeEntry).where(KnowledgeEntry.error_type.in_(error_types)))
+        await db.commit()
+
+
+@pytest.fixture
+def curated_entry():
+    async def create():
+        await reset("CuratedError")
+        async with async_session_maker() as db:
+            db.add(KnowledgeEntry(error_type="CuratedError", category="Misconfiguration",
+                                  description="d", fix="f", commands=[], seen_count=1, status="active"))
+            await db.commit()
+
+    asyncio.run(create())
+    yield "CuratedError"
+    KNOWLEDGE_BASE[:] = [item for item in KNOWLEDGE_BASE if item["error_type"] != "CuratedError"]
+    INACTIVE_ERROR_TYPES.discard("CuratedError")
+    notify_knowledge_base_changed(["CuratedError"])
+
+
+def test_status_edits_follow_the_live_knowledge_base(curated_entry):
+    store = KnowledgeStore()
+
+    retired = asyncio.run(store.update_entry(curated_entry, {"status": "retired"}))
+    assert retired["status"] == "retired" and retired["curated"]
+    assert live(curated_entry) is None and curated_entry in INACTIVE_ERROR_TYPES
+
+    asyncio.run(store.update_entry(curated_entry, {"status": "active"}))
+    assert live(curated_entry) is not None and curated_entry not in INACTIVE_ERROR_TYPES
+
+
+@pytest.mark.parametrize("status", ["merged", "archived"])
+def test_invalid_status_is_rejected(monkeypatch, curated_entry, status):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    response = request("PUT", f"/api/admin/knowledge-base/{curated_entry}",
+                       json={"status": status}, headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 422
+    if status == "merged":
+        assert "/api/admin/knowledge-base/merge" in response.json()["error"]
+
+    with pytest.raises(ValueError):
+        asyncio.run(KnowledgeStore().update_entry(curated_entry, {"status": status}))
+
+
+def test_recurrences_are_promoted_once_committed():
+    store = KnowledgeStore(promote_threshold=2)
+
+    async def record():
+        async with async_session_maker() as db:
+            failure = CIFailure(error_type="GrowingError", failure_category="Dependency",
+                                root_cause="r", suggested_fix="fix it", fix_commands=["make"])
+            pending = await store.record_failure(db, failure)
+            await db.commit()
+        store.apply(pending)
+        return pending
+
+    async def scenario():
+        await reset("GrowingError")
+        first = await record()
+        assert not first["promoted"] and live("GrowingError") is None
+        second = await record()
+        assert second["promoted"] and second["seen_count"] == 2
+        return await store.list_entries("active")
+
+    try:
+        active = asyncio.run(scenario())
+        assert live("GrowingError")["fix"] == "fix it"
+        assert "GrowingError" in {entry["error_type"] for entry in active}
+    finally:
+        KNOWLEDGE_BASE[:] = [item for item in KNOWLEDGE_BASE if item["error_type"] != "GrowingError"]
+        notify_knowledge_base_changed(["GrowingError"])
@@ -0,0 +1,44 @@
+from core.log_extract import clean_line, estimate_tokens, extract_error_regions, score_line
+
+
+def build_log(noise_lines: int = 2000) -> str:
+    lines = [f"Downloading module {n} from the cache" for n in range(noise_lines)]
+    lines[1200] = "\x1b[31;1mERROR: Could not resolve dependencies for project com.example:service\x1b[0m"
+    lines.append("section_end:1700000000:step_script\r\x1b[0K")
+    lines.append("ERROR: Job failed: exit code 1")
+    return "\n".join(lines)
+
+
+def test_budget_is_respected_and_hit_line_kept():
+    for budget in (200, 600):
+        excerpt = extract_error_regions(build_log(), token_budget=budget, context_lines=3)
+        kept = [line for line in excerpt.split("\n") if "lines skipped" not in line]
+        assert sum(estimate_tokens(line) for line in kept) <= budget
+        assert "ERROR: Could not resolve dependencies for project com.example:service" in kept
+        assert "\x1b" not in excerpt
+
+
+def test_window_larger_than_budget_keeps_its_hit_not_its_leading_context():
+    excerpt = extract_error_regions(build_log(), token_budget=30, context_lines=3)
+    kept = [line for line in excerpt.split("\n") if "lines skipped" not in line]
+    assert sum(estimate_tokens(line) for line in kept) <= 30
+    # Both hits score the same; the earlier one wins and starts the excerpt
+    assert kept[0] == "ERROR: Could not resolve dependencies for project com.example:service"
+
+
+def test_context_tail_and_skip_markers():
+    excerpt = extract_error_regions(build_log(), token_budget=600, context_lines=2)
+    lines = excerpt.split("\n")
+
+    hit = lines.index("ERROR: Could not resolve dependencies for project com.example:service")
+    assert lines[hit - 1] == "Downloading module 1199 from the cache"
+    assert lines[hit + 1] == "Downloading module 1201 from the cache"
+    assert lines[-1] == "ERROR: Job failed: exit code 1"
+    assert lines[0].startswith("... [") and lines[0].endswith("lines skipped] ...")
+
+
+def test_line_scoring():
+    assert score_line("ERROR: Job failed: exit code 1") > score_line("warning: could not stat file")
+    assert score_line("Uploading artifacts for failed job") == 0.0
+    assert score_line("Compiling 12 source files") == 0.0
+    assert clean_line("\x1b[32;1mok\x1b[0m\r\n") == "ok"
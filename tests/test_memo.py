@@ -0,0 +1,112 @@
+import asyncio
+import types
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from agents import memo
+from agents.memo import LLMMemo
+
+INPUTS = {"error_type": "OutOfMemory", "keywords": "heap, java"}
+RESPONSE = '{"category": "Infrastructure", "confidence": 0.9}'
+
+
+def clock(monkeypatch, start=1000.0):
+    now = [start]
+    monkeypatch.setattr(memo, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_keys_ignore_whitespace_and_keyword_order():
+    cache = LLMMemo(max_entries=10, ttl_seconds=60)
+    assert cache.key("classifier", INPUTS) == cache.key(
+        "classifier", {"error_type": " OutOfMemory ", "keywords": "Java,  heap"}
+    )
+    assert cache.key("classifier", INPUTS) != cache.key("fix_suggester", INPUTS)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = clock(monkeypatch)
+    cache = LLMMemo(max_entries=10, ttl_seconds=60)
+
+    async def scenario():
+        await cache.put("classifier", INPUTS, RESPONSE)
+        now[0] += 59
+        fresh = await cache.get("classifier", INPUTS)
+        now[0] += 2
+        return fresh, await cache.get("classifier", INPUTS)
+
+    fresh, expired = asyncio.run(scenario())
+    assert fresh.content == RESPONSE
+    assert expired is None
+    assert cache.stats()["entries_in_memory"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LLMMemo(max_entries=2, ttl_seconds=60)
+    inputs = [{"error_type": name} for name in ("A", "B", "C")]
+
+    async def scenario():
+        await cache.put("classifier", inputs[0], RESPONSE)
+        await cache.put("classifier", inputs[1], RESPONSE)
+        await cache.get("classifier", inputs[0])  # A is now the most recent
+        await cache.put("classifier", inputs[2], RESPONSE)
+        return [await cache.get("classifier", i) is not None for i in inputs]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert cache.stats()["agents"]["classifier"]["evictions"] == 1
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path, monkeypatch):
+    now = clock(monkeypatch)
+    path = str(tmp_path / "memo.db")
+
+    async def scenario():
+        first = LLMMemo(max_entries=10, ttl_seconds=60, path=path)
+        await first.put("fix_suggester", INPUTS, RESPONSE)
+        first.close()
+
+        second = LLMMemo(max_entries=10, ttl_seconds=60, path=path)
+        restored = await second.get("fix_suggester", INPUTS)
+        cached = await second.get("fix_suggester", INPUTS)
+        stats = second.stats()["agents"]["fix_suggester"]
+        second.close()
+
+        now[0] += 61
+        third = LLMMemo(max_entries=10, ttl_seconds=60, path=path)
+        expired = await third.get("fix_suggester", INPUTS)
+        third.close()
+        return restored, cached, stats, expired
+
+    restored, cached, stats, expired = asyncio.run(scenario())
+    assert restored.content == cached.content == RESPONSE
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+    assert expired is None
+
+
+def test_prompt_edits_invalidate_entries():
+    before = ChatPromptTemplate.from_messages([("system", "Classify."), ("user", "{error_type}")])
+    after = ChatPromptTemplate.from_messages([("system", "Classify carefully."), ("user", "{error_type}")])
+    cache = LLMMemo(max_entries=10, ttl_seconds=60)
+
+    async def scenario():
+        await cache.put("classifier", INPUTS, RESPONSE, prompt=before)
+        return await cache.get("classifier", INPUTS, prompt=before), await cache.get("classifier", INPUTS, prompt=after)
+
+    same, edited = asyncio.run(scenario())
+    assert same is not None
+    assert edited is None
+
+
+def test_only_json_responses_are_stored(tmp_path):
+    cache = LLMMemo(max_entries=10, ttl_seconds=60, path=str(tmp_path / "memo.db"))
+
+    async def scenario():
+        await cache.put("classifier", {"error_type": "A"}, "Sorry, I cannot classify this log.")
+        await cache.put("classifier", {"error_type": "B"}, '["not", "an", "object"]')
+        await cache.put("classifier", {"error_type": "C"}, "```json\n" + RESPONSE + "\n```")
+        return [await cache.get("classifier", {"error_type": name}) is not None for name in "ABC"]
+
+    assert asyncio.run(scenario()) == [False, False, True]
+    stored = cache._connection().execute("SELECT count(*) FROM llm_memo").fetchone()[0]
+    cache.close()
+    assert stored == 1
@@ -0,0 +1,48 @@
+from rag.minhash import MinHashLSH, estimate_similarity, minhash_signature, shingles
+
+BASE = [
+    "[ERROR] Failed to execute goal org.apache.maven.plugins:maven-deploy-plugin:2.8.2:deploy",
+    "Return code is: 403, ReasonPhrase: Forbidden",
+    "Could not transfer artifact com.example:service:jar:1.4.2 from/to nexus-releases",
+    "Access denied to repository nexus-releases for user ci-bot",
+    "BUILD FAILURE total time 42 s",
+]
+
+
+def test_paths_and_numbers_are_masked():
+    left = shingles(["Error in src/main/App.java line 42"])
+    right = shingles(["Error in lib/other/Util.java line 7"])
+    assert left == right
+
+
+def test_identical_regions_have_identical_signatures():
+    assert estimate_similarity(minhash_signature(BASE), minhash_signature(list(BASE))) == 1.0
+
+
+def test_lsh_finds_near_duplicates_above_threshold():
+    lsh = MinHashLSH(bands=16, threshold=0.6)
+    lsh.add("original", minhash_signature(BASE))
+    lsh.add("unrelated", minhash_signature([
+        "npm ERR! code E404",
+        "npm ERR! 404 Not Found - GET https://registry.npmjs.org/left-padd",
+        "npm ERR! 404 'left-padd@latest' is not in this registry.",
+    ]))
+
+    # Same failure, another artifact version and user
+    near = BASE[:3] + ["Access denied to repository nexus-releases for user release-bot", BASE[4]]
+    matches = lsh.query(minhash_signature(near))
+
+    assert [failure_id for failure_id, _ in matches] == ["original"]
+    assert matches[0][1] >= 0.6
+    assert lsh.group_for(minhash_signature(near)) == "original"
+
+
+def test_dissimilar_logs_are_not_grouped_and_remove_works():
+    lsh = MinHashLSH(bands=16, threshold=0.8)
+    signature = minhash_signature(BASE)
+    lsh.add("a", signature, group_id="group-1")
+    assert lsh.group_for(signature) == "group-1"
+    assert lsh.group_for(minhash_signature(["Segmentation fault (core dumped)", "exit code 139"])) is None
+
+    lsh.remove("a")
+    assert len(lsh) == 0 and lsh.query(signature) == []
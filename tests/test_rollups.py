@@ -0,0 +1,100 @@
+import asyncio
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, func, select, text
+
+from db.database import async_session_maker, init_db
+from db.models import CIFailure, MetricsRollup
+from db.rollups import (
+    HOUR, LATENCY_BINS, backfill_rollups, histogram_percentile, hour_of, latency_column, record_failure_metrics
+)
+from test_admin_api import request
+
+NOW = time.time()
+# (hours ago, project, category, processing_time_ms, confidence)
+HISTORY = [
+    (5, "web", "Dependency", 120, 0.9),
+    (5, "web", "Dependency", 4000, 0.7),
+    (5, "api", "Infrastructure", 80, 0.5),
+    (3, "api", "Dependency", 900, 0.8),
+    (3, "web", "Misconfiguration", None, 0.4),
+    (1, "web", "Infrastructure", 45000, 0.6),
+]
+NEW = [("api", "Dependency", 300, 0.9), ("web", "Misconfiguration", 2000, 0.95)]
+
+
+def failure(n, project, category, processing_time_ms, confidence, created_at=None):
+    return CIFailure(failure_id=f"rollup-{n}", project_name=project, failure_category=category,
+                     processing_time_ms=processing_time_ms, confidence=confidence, created_at=created_at)
+
+
+async def populate():
+    await init_db()
+    async with async_session_maker() as db:
+        await db.execute(delete(CIFailure))
+        await db.execute(delete(MetricsRollup))
+        await db.execute(text("DELETE FROM failure_search"))
+        db.add_all([
+            failure(n, project, category, ms, confidence,
+                    created_at=datetime.fromtimestamp(NOW - hours * HOUR, timezone.utc))
+            for n, (hours, project, category, ms, confidence) in enumerate(HISTORY)
+        ])
+        await db.commit()
+        # Rows that predate the rollup
+        assert await backfill_rollups(db) == len(HISTORY)
+
+        # Failures saved afterwards are counted in their own transaction
+        new = [failure(len(HISTORY) + n, *row) for n, row in enumerate(NEW)]
+        db.add_all(new)
+        await record_failure_metrics(db, new)
+        await db.commit()
+        return (await db.execute(select(
+            CIFailure.created_at, CIFailure.failure_category, CIFailure.processing_time_ms
+        ))).all()
+
+
+def hour_start(created_at) -> int:
+    return hour_of(created_at.replace(tzinfo=timezone.utc).timestamp())
+
+
+def test_rollup_matches_a_direct_aggregate():
+    rows = asyncio.run(populate())
+    timed = [ms for _, _, ms in rows if ms is not None]
+    histogram = Counter(latency_column(ms) for ms in timed)
+    counts = [histogram[column] for _, column in LATENCY_BINS]
+
+    summary = request("GET", "/api/metrics/summary").json()
+    assert summary["total_failures"] == len(rows) == len(HISTORY) + len(NEW)
+    assert summary["avg_processing_time_ms"] == sum(timed) / len(timed)
+    assert summary["category_breakdown"] == dict(Counter(category for _, category, _ in rows))
+    assert summary["p50_processing_time_ms"] == histogram_percentile(counts, 0.5)
+    assert summary["p95_processing_time_ms"] == histogram_percentile(counts, 0.95)
+
+    by_hour = defaultdict(list)
+    for created_at, category, ms in rows:
+        by_hour[hour_start(created_at)].append((category, ms))
+    series = request("GET", "/api/metrics/timeseries", params={"step_hours": 1}).json()["points"]
+    assert [point["bucket_start"] for point in series] == [
+        datetime.fromtimestamp(hour, timezone.utc).isoformat() for hour in sorted(by_hour)
+    ]
+    for point, hour in zip(series, sorted(by_hour)):
+        bucket = by_hour[hour]
+        bucket_times = [ms for _, ms in bucket if ms is not None]
+        assert point["failures"] == len(bucket)
+        assert point["categories"] == dict(Counter(category for category, _ in bucket))
+        assert point["avg_processing_time_ms"] == (sum(bucket_times) / len(bucket_times) if bucket_times else None)
+
+
+def test_backfill_only_runs_on_an_empty_rollup():
+    async def scenario():
+        await populate()
+        async with async_session_maker() as db:
+            again = await backfill_rollups(db)
+            total = await db.scalar(select(func.sum(MetricsRollup.failure_count)))
+        return again, total
+
+    again, total = asyncio.run(scenario())
+    assert again == 0
+    assert total == len(HISTORY) + len(NEW)
@@ -0,0 +1,105 @@
+import asyncio
+
+from sqlalchemy import delete, select, text
+
+import main
+from core.jobs import enqueue_rca
+from db.database import async_session_maker, init_db
+from db.models import CIFailure, MetricsRollup, RCAJob
+from rag.store import knowledge_store
+
+
+def rca_result(**overrides) -> dict:
+    result = {
+        "pipeline_id": "100",
+        "project_name": "demo",
+        "job_name": "test",
+        "stage": "test",
+        "job_status": "failed",
+        "raw_log": "ERROR: ModuleNotFoundError: No module named 'requests'\n",
+        "parsed_errors": {"error_type": "ModuleNotFoundError", "error_message": "No module named 'requests'"},
+        "error_keywords": ["module", "requests"],
+        "failure_category": "dependency",
+        "suggested_fix": "Add requests to requirements.txt",
+        "fix_commands": ["pip install requests"],
+        "total_confidence": 0.9,
+        "similar_cases": [{"error_type": "ImportError", "score": 0.5}],
+        "seen_count": 1,
+        "log_fingerprint": "fp",
+        "processing_time_ms": 10,
+        "node_timings": {"log_parser": 1.0},
+    }
+    result.update(overrides)
+    return result
+
+
+async def reset_tables():
+    await init_db()
+    async with async_session_maker() as db:
+        await db.execute(delete(RCAJob))
+        await db.execute(delete(CIFailure))
+        await db.execute(delete(MetricsRollup))
+        await db.execute(text("DELETE FROM failure_search"))
+        await db.commit()
+
+
+def test_error_after_commit_keeps_the_job_done(monkeypatch):
+    def broken_apply(pending):
+        raise RuntimeError("in-memory index broke")
+
+    monkeypatch.setattr(knowledge_store, "apply", broken_apply)
+
+    async def scenario():
+        await reset_tables()
+        result = rca_result()
+        async with async_session_maker() as db:
+            enqueue_rca(db, failure_id="f-1", raw_log=result["raw_log"])
+            await db.commit()
+        await main.save_rca_result("f-1", result)
+        async with async_session_maker() as db:
+            failure = await db.scalar(select(CIFailure).where(CIFailure.failure_id == "f-1"))
+            return await db.get(RCAJob, "f-1"), failure
+
+    job, failure = asyncio.run(scenario())
+    assert job.status == "done"
+    assert failure is not None and failure.error_type == "ModuleNotFoundError"
+
+
+def test_cluster_members_wait_for_and_share_the_leader_rca():
+    jobs = [
+        {"job_name": f"shard-{n}", "stage": "test", "job_status": "failed",
+         "logs": f"ERROR: job {n}0001 failed: pull timed out at 2024-05-01T10:0{n}:00Z\n"}
+        for n in range(1, 4)
+    ] + [{"job_name": "lint", "stage": "test", "job_status": "failed", "logs": "npm ERR! code E404\n"}]
+
+    async def scenario():
+        await reset_tables()
+        async with async_session_maker() as db:
+            queued = await main.queue_pipeline_failures(db, "100", "demo", jobs)
+            await db.commit()
+        by_name = {r["job_name"]: r for r in queued["results"]}
+        leader_id = by_name["shard-1"]["failure_id"]
+
+        async with async_session_maker() as db:
+            before = {job.id: job.status for job in (await db.scalars(select(RCAJob))).all()}
+        await main.save_rca_result(leader_id, rca_result(job_name="shard-1"))
+        async with async_session_maker() as db:
+            after = {job.id: job.status for job in (await db.scalars(select(RCAJob))).all()}
+            failures = (await db.scalars(select(CIFailure))).all()
+        return by_name, leader_id, before, after, failures
+
+    by_name, leader_id, before, after, failures = asyncio.run(scenario())
+    members = [by_name[f"shard-{n}"]["failure_id"] for n in (2, 3)]
+    lint_id = by_name["lint"]["failure_id"]
+
+    assert before[leader_id] == "queued" and before[lint_id] == "queued"
+    assert [before[m] for m in members] == ["waiting", "waiting"]
+    assert all(after[id_] == "done" for id_ in [leader_id, *members])
+    assert after[lint_id] == "queued"
+
+    saved = {f.failure_id: f for f in failures}
+    assert set(saved) == {leader_id, *members}
+    assert saved[leader_id].rca_source_id is None
+    assert {saved[m].rca_source_id for m in members} == {leader_id}
+    assert {saved[m].job_name for m in members} == {"shard-2", "shard-3"}
+    assert all(saved[m].agent_timings is None for m in members)
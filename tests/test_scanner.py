@@ -0,0 +1,93 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy import delete
+
+from core.gitlab import GitLabClient, request_pacer
+from core.scanner import ProjectScanner
+from db.database import async_session_maker, init_db
+from db.models import ProjectCursor
+
+
+def iso(seconds_ago: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)).isoformat().replace("+00:00", "Z")
+
+
+def test_every_page_is_paced():
+    def pages(request):
+        page = int(request.url.params["page"])
+        headers = {"X-Next-Page": "2"} if page == 1 else {}
+        return httpx.Response(200, json=[{"id": 30 - page * 10, "status": "success"}], headers=headers)
+
+    async def scenario():
+        paced = []
+
+        async def pace():
+            paced.append(time.monotonic())
+
+        client = GitLabClient("https://gitlab.test/api/v4", "token")
+        client._client = httpx.AsyncClient(base_url=client.api_base, transport=httpx.MockTransport(pages))
+        request_pacer.set(pace)
+        pipelines = await client.pipelines_after("1", 0)
+        await client.close()
+        return pipelines, paced
+
+    pipelines, paced = asyncio.run(scenario())
+    assert [p["id"] for p in pipelines] == [20, 10]
+    assert len(paced) == 2
+
+
+def test_only_one_replica_claims_a_due_scan():
+    async def scenario():
+        await init_db()
+        async with async_session_maker() as db:
+            await db.execute(delete(ProjectCursor))
+            db.add(ProjectCursor(project_id="42", interval_seconds=60, next_scan_at=time.time() - 1,
+                                 last_pipeline_id=7, seen_pipeline_ids=[]))
+            await db.commit()
+        first, second = ProjectScanner(), ProjectScanner()
+        first._cursors["42"] = second._cursors["42"] = ProjectCursor(project_id="42", next_scan_at=0)
+        return await first._claim("42"), await second._claim("42"), second._cursors["42"]
+
+    claimed, rejected, reloaded = asyncio.run(scenario())
+    assert claimed is not None and claimed.last_pipeline_id == 7
+    assert rejected is None
+    assert reloaded.next_scan_at > time.time()
+
+
+def test_old_active_pipeline_stops_holding_the_cursor(monkeypatch):
+    from core import scanner as scanner_module
+
+    async def pipelines_after(project_id, after_id):
+        return [
+            {"id": 11, "status": "running", "created_at": iso(3 * 86400)},  # Stuck on a manual job
+            {"id": 12, "status": "failed", "created_at": iso(600)},
+            {"id": 13, "status": "running", "created_at": iso(60)},
+            {"id": 14, "status": "success", "created_at": iso(30)},
+        ]
+
+    async def pipeline_jobs(project_id, pipeline_id):
+        return [{"id": 120, "name": "test", "stage": "test", "status": "failed"}]
+
+    monkeypatch.setattr(scanner_module.gitlab_client, "pipelines_after", pipelines_after)
+    monkeypatch.setattr(scanner_module.gitlab_client, "pipeline_jobs", pipeline_jobs)
+
+    async def scenario():
+        handled = []
+
+        async def handler(project_id, pipeline_id, jobs):
+            handled.append(pipeline_id)
+
+        scanner = ProjectScanner(max_active_age=86400)
+        scanner.handler = handler
+        cursor = ProjectCursor(project_id="1", last_pipeline_id=10, seen_pipeline_ids=[])
+        settled = await scanner.scan(cursor)
+        return settled, handled, cursor
+
+    settled, handled, cursor = asyncio.run(scenario())
+    assert handled == ["12"]
+    assert settled == 3
+    assert cursor.last_pipeline_id == 12  # The recent running pipeline still holds it
+    assert cursor.seen_pipeline_ids == [14]
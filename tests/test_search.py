@@ -0,0 +1,67 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from core.config import settings
+from db.models import Base, CIFailure
+from db.search import create_search_index, fts5_query, index_failures, rank_window_exceeded, search_failures
+
+
+def run_search(tmp_path, scenario, failures=()):
+    async def with_index():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/search.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(create_search_index)
+        async with AsyncSession(engine) as session:
+            rows = [(CIFailure(failure_id=failure_id, error_type=error_type, root_cause=root_cause), log)
+                    for failure_id, error_type, root_cause, log in failures]
+            session.add_all([failure for failure, _ in rows])
+            await index_failures(session, rows)
+            await session.commit()
+            try:
+                return await scenario(session)
+            finally:
+                await engine.dispose()
+
+    return asyncio.run(with_index())
+
+
+FAILURES = [
+    ("f1", "NpmPackageNotFound", "Package left-pad was unpublished", "npm ERR! 404 left-pad"),
+    ("f2", "OutOfMemory", "The test runner ran out of memory", "Killed java heap space"),
+    ("f3", "NpmPackageNotFound", "Registry returned 404 for a scoped package", "npm ERR! 404 @scope/pkg"),
+]
+
+
+def test_fts5_query_quotes_terms_and_keeps_prefixes():
+    assert fts5_query('npm "ERR!" pack*') == '"npm" "ERR" "pack"*'
+    assert fts5_query("!!! ---") == ""
+
+
+def test_search_ranks_matches_with_snippets(tmp_path):
+    async def scenario(session):
+        return await search_failures(session, "npm 404")
+
+    results = run_search(tmp_path, scenario, FAILURES)
+    assert {result["failure_id"] for result in results} == {"f1", "f3"}
+    assert all("<mark>" in result["snippet"] for result in results)
+
+
+def test_punctuation_only_query_returns_nothing(tmp_path):
+    async def scenario(session):
+        return await search_failures(session, "!!!"), await rank_window_exceeded(session, "!!!")
+
+    assert run_search(tmp_path, scenario, FAILURES) == ([], False)
+
+
+def test_truncated_when_matches_exceed_rank_window(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "search_rank_window", 1)
+
+    async def scenario(session):
+        ranked = await search_failures(session, "npm")
+        return ranked, await rank_window_exceeded(session, "npm"), await rank_window_exceeded(session, "memory")
+
+    ranked, npm_truncated, memory_truncated = run_search(tmp_path, scenario, FAILURES)
+    assert [result["failure_id"] for result in ranked] == ["f3"]  # Only the newest match is ranked
+    assert npm_truncated and not memory_truncated
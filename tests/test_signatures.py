@@ -0,0 +1,104 @@
+from rag.knowledge_base import INACTIVE_ERROR_TYPES, KNOWLEDGE_BASE, notify_knowledge_base_changed
+from rag.signatures import SignatureEngine, SignatureRule, signature_engine
+
+
+def rule(error_type, *patterns, builtin=False):
+    return SignatureRule(error_type, "tool", [error_type.lower()], [
+        {"pattern": pattern, "weight": weight} for pattern, weight in patterns
+    ], builtin=builtin)
+
+
+def test_weights_add_up_to_min_score():
+    engine = SignatureEngine([rule("Deploy", ("upload failed", 0.5), ("status 403", 0.5))], min_score=1.0)
+
+    assert engine.match("upload failed") is None
+    result = engine.match("step 1\nupload failed\nserver said status 403\n")
+    assert result["error_type"] == "Deploy"
+    assert result["confidence"] == 1.0
+    assert result["error_message"] == "upload failed"
+
+
+def test_min_score_gates_weak_matches():
+    weak = [rule("Flaky", ("timed out", 0.75))]
+
+    assert SignatureEngine(weak, min_score=1.0).match("request timed out") is None
+    assert SignatureEngine(weak, min_score=0.5).match("request timed out")["error_type"] == "Flaky"
+
+
+def test_equal_scores_of_different_rules_is_a_tie():
+    engine = SignatureEngine([rule("A", ("boom", 1.0)), rule("B", ("bang", 1.0))], min_score=1.0)
+
+    assert engine.match("boom\nbang") is None
+    assert engine.match("boom")["error_type"] == "A"
+
+
+def test_overlapping_patterns_score_every_rule():
+    # Nexus' pattern covers the span Vault's "Forbidden" matches; Vault must still get its 0.5
+    engine = SignatureEngine([
+        rule("Nexus", ("403, ReasonPhrase: Forbidden", 1.0)),
+        rule("Vault", ("Forbidden", 0.5), ("vault token", 1.0)),
+    ], min_score=1.0)
+
+    result = engine.match("vault token rejected\nReturn code is: 403, ReasonPhrase: Forbidden")
+    assert result["error_type"] == "Vault"
+
+
+def test_retired_entries_stop_firing():
+    log = "Error: Files in the working directory are not formatted\nterraform fmt -check"
+    assert signature_engine.match(log)["error_type"] == "TerraformFormatError"
+
+    entry = next(item for item in KNOWLEDGE_BASE if item["error_type"] == "TerraformFormatError")
+    KNOWLEDGE_BASE.remove(entry)
+    INACTIVE_ERROR_TYPES.add("TerraformFormatError")
+    notify_knowledge_base_changed(["TerraformFormatError"])
+    try:
+        assert signature_engine.match(log) is None
+    finally:
+        KNOWLEDGE_BASE.append(entry)
+        INACTIVE_ERROR_TYPES.discard("TerraformFormatError")
+        notify_knowledge_base_changed(["TerraformFormatError"])
+
+    assert signature_engine.match(log)["error_type"] == "TerraformFormatError"
+
+
+def test_custom_rules_fire_until_their_entry_is_retired():
+    custom = rule("NpmNotFound", ("npm ERR! code E404", 1.0))
+    engine = SignatureEngine([custom], min_score=1.0)
+    assert engine.match("npm ERR! code E404")["error_type"] == "NpmNotFound"
+
+    INACTIVE_ERROR_TYPES.add("NpmNotFound")
+    try:
+        engine.refresh()
+        assert engine.match("npm ERR! code E404") is None
+    finally:
+        INACTIVE_ERROR_TYPES.discard("NpmNotFound")
+
+
+def test_only_used_matches_count_as_hits(monkeypatch):
+    from agents import log_parser
+    from core.metrics import signature_fast_path_hits
+
+    engine = SignatureEngine([rule("NpmNotFound", ("npm ERR! code E404", 1.0))], min_score=1.0)
+    monkeypatch.setattr(log_parser, "signature_engine", engine)
+    monkeypatch.setattr(log_parser.settings, "signature_fast_path", True)
+    counter = signature_fast_path_hits.labels(agent="log_parser")
+    before = counter._value.get()
+
+    engine.match("npm ERR! code E404")
+    assert engine.stats()["hits"] == 0
+
+    assert log_parser.signature_update({"raw_log": "npm ERR! code E404"}) is not None
+    assert log_parser.signature_update({"raw_log": "all good"}) is None
+    assert engine.stats()["hits"] == 1 and engine.stats()["misses"] == 1
+    assert counter._value.get() - before == 1
+
+
+def test_fused_match_without_category_is_a_miss(monkeypatch):
+    from agents import fused_parser
+
+    engine = SignatureEngine([rule("NoSuchEntry", ("weird failure", 1.0))], min_score=1.0)
+    monkeypatch.setattr(fused_parser, "signature_engine", engine)
+    monkeypatch.setattr(fused_parser.settings, "signature_fast_path", True)
+
+    assert fused_parser.signature_update({"raw_log": "weird failure"}) is None
+    assert engine.stats()["hits"] == 0 and engine.stats()["misses"] == 1
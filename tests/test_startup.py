@@ -0,0 +1,7 @@
+from benchmarks.startup_time import STARTUP_BUDGET_SECONDS, measure_once
+
+
+def test_import_main_within_budget_and_defers_llm_libraries():
+    run = measure_once()
+    assert run["loaded"] == []
+    assert run["seconds"] < STARTUP_BUDGET_SECONDS
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+from agents import batch, fix_suggester
+from core.events import event_bus
+from core.logs import failure_id_var
+
+STATE = {
+    "parsed_errors": {"error_type": "OutOfMemory"},
+    "failure_category": "infrastructure",
+    "error_keywords": ["Killed"],
+    "similar_cases": [],
+}
+CHUNKS = ['{"suggested_fix": "Raise the memory limit", ', '"commands": ["kubectl edit"], ', '"confidence": 0.9}']
+
+
+def test_subscriber_joining_mid_generation_gets_every_token(monkeypatch):
+    received = {}
+
+    async def fake_ainvoke(agent, chain, inputs, config, key_inputs=None, prompt=None, on_token=None):
+        on_token(CHUNKS[0])
+        received["queue"] = event_bus.subscribe("late-subscriber")  # Connects after the first chunk
+        for chunk in CHUNKS[1:]:
+            on_token(chunk)
+        return SimpleNamespace(content="".join(CHUNKS))
+
+    monkeypatch.setattr(fix_suggester.llm_memo, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(fix_suggester, "fix_chain", lambda: None)
+
+    async def scenario():
+        failure_id_var.set("late-subscriber")
+        return await fix_suggester.fix_suggester_agent(dict(STATE))
+
+    update = asyncio.run(scenario())
+    queue = received["queue"]
+    event_bus.unsubscribe(queue, "late-subscriber")
+    texts = [queue.get_nowait()[1]["text"] for _ in range(queue.qsize())]
+    assert "".join(texts) == "".join(CHUNKS)
+    assert update["fix_commands"] == ["kubectl edit"]
+
+
+def test_batched_nodes_log_under_each_jobs_failure_id():
+    async def agent(state):
+        await asyncio.sleep(0)
+        return {"seen_failure_id": failure_id_var.get()}
+
+    states = [{"node_timings": {}} for _ in range(3)]
+    asyncio.run(batch.run_batched_node("custom", agent, states, [None] * 3, 2, ["a", "b", "c"]))
+    assert [state["seen_failure_id"] for state in states] == ["a", "b", "c"]
+    assert failure_id_var.get() is None
@@ -0,0 +1,98 @@
+import asyncio
+
+from core.gitlab import GitLabError, gitlab_client
+from core.tailer import LiveTrace, TraceTailer
+from core.webhooks import webhook_coalescer
+
+
+def test_fatal_line_found_through_ansi_colours_and_sections():
+    live = LiveTrace("1", 7, "test", "test", "100")
+    assert not live.feed(b"section_start:1700000000:step_script\r\x1b[0Krunning tests\n", 0)
+    assert live.feed(b"\x1b[31;1mnpm ERR! code E404\x1b[0m\n", 60)
+    assert live.fatal_line == "npm ERR! code E404"
+
+
+def test_missing_job_is_dropped_and_others_keep_finishing(monkeypatch):
+    async def running_jobs(project_id):
+        return []  # Every tailed job has left the running list
+
+    async def job(project_id, job_id):
+        if job_id == 2:
+            raise GitLabError(404, "404 Job Not Found")
+        return {"id": job_id, "status": "failed"}
+
+    async def trace_range(project_id, job_id, start=0, last_bytes=None):
+        return f"job {job_id}\nERROR: Job failed: exit code 1\n".encode(), 0
+
+    monkeypatch.setattr(gitlab_client, "running_jobs", running_jobs)
+    monkeypatch.setattr(gitlab_client, "job", job)
+    monkeypatch.setattr(gitlab_client, "trace_range", trace_range)
+
+    async def scenario():
+        queued = []
+
+        async def queue(live, log):
+            queued.append(live.job_id)
+
+        tailer = TraceTailer(discover=False)
+        tailer.queue = queue
+        for job_id in [1, 2, 3]:
+            tailer.watch("1", job_id, f"job-{job_id}", "test", "100")
+        await tailer.poll_once()
+        await asyncio.gather(*tailer._finishing)
+        return tailer, queued
+
+    tailer, queued = asyncio.run(scenario())
+    assert sorted(queued) == [1, 3]
+    assert tailer.snapshot() == []
+    assert webhook_coalescer.seen(1) and webhook_coalescer.seen(3)
+
+
+def test_ended_job_is_remembered_before_it_leaves_the_watch_set(monkeypatch):
+    async def running_jobs(project_id):
+        return []
+
+    async def job(project_id, job_id):
+        return {"id": job_id, "status": "success"}
+
+    async def trace_range(project_id, job_id, start=0, last_bytes=None):
+        return b"ok\n", 0
+
+    monkeypatch.setattr(gitlab_client, "running_jobs", running_jobs)
+    monkeypatch.setattr(gitlab_client, "job", job)
+    monkeypatch.setattr(gitlab_client, "trace_range", trace_range)
+    tailer = TraceTailer(discover=False)
+    watched_when_remembered = []
+    monkeypatch.setattr(webhook_coalescer, "remember",
+                        lambda job_ids: watched_when_remembered.extend(tailer.watching(j) for j in job_ids))
+
+    async def scenario():
+        tailer.watch("1", 5, "build", "build", "100")
+        await tailer.poll_once()
+        await asyncio.gather(*tailer._finishing)
+
+    asyncio.run(scenario())
+    assert watched_when_remembered[0] is True
+    assert not tailer.watching(5)
+
+
+def test_discovery_covers_every_configured_project(monkeypatch):
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "gitlab_project_ids", "10, 20")
+    polled = []
+
+    async def running_jobs(project_id):
+        polled.append(project_id)
+        return [{"id": int(project_id) + 1, "name": "test", "stage": "test", "pipeline": {"id": 7}}]
+
+    async def trace_range(project_id, job_id, start=0, last_bytes=None):
+        return b"running\n", 0
+
+    monkeypatch.setattr(gitlab_client, "running_jobs", running_jobs)
+    monkeypatch.setattr(gitlab_client, "trace_range", trace_range)
+    tailer = TraceTailer(discover=True)
+    asyncio.run(tailer.poll_once())
+
+    assert sorted(polled) == ["10", "20"]
+    assert tailer.watching(11) and tailer.watching(21)
@@ -0,0 +1,64 @@
+from core.trace_reader import TraceBuffer
+
+
+def feed_lines(buffer, lines, chunk_size=None):
+    text = "".join(f"{line}\n" for line in lines)
+    step = chunk_size or len(text)
+    for start in range(0, len(text), step):
+        buffer.feed(text[start:start + step])
+    buffer.close()
+    return buffer
+
+
+def test_tail_is_bounded_and_starts_on_a_line():
+    buffer = feed_lines(TraceBuffer(tail_chars=100), [f"line {i:05d}" for i in range(10000)], chunk_size=37)
+
+    tail = buffer.tail()
+    assert len(tail) <= 100
+    assert tail.startswith("line ") and tail.endswith("line 09999\n")
+    assert sum(len(chunk) for chunk in buffer._tail) < 100 + 37
+    assert buffer.truncated
+
+
+def test_short_trace_is_rendered_whole():
+    lines = ["step 1", "ERROR: boom", "step 2"]
+    buffer = feed_lines(TraceBuffer(tail_chars=1000), lines)
+    assert not buffer.truncated
+    assert buffer.render() == "step 1\nERROR: boom\nstep 2\n"
+
+
+def test_early_error_regions_survive_with_their_context():
+    lines = (
+        [f"setup {i}" for i in range(20)]
+        + ["npm ERR! 404 Not Found - left-pad"]
+        + [f"noise {i}" for i in range(2000)]
+    )
+    rendered = feed_lines(TraceBuffer(tail_chars=200, context_lines=2), lines, chunk_size=64).render()
+
+    lines = rendered.split("\n")
+    assert lines[0].startswith("... [") and "chars omitted" in lines[0]
+    assert lines[1:6] == ["setup 18", "setup 19", "npm ERR! 404 Not Found - left-pad", "noise 0", "noise 1"]
+    assert lines[6] == "... [log tail] ..."
+    assert rendered.endswith("noise 1999\n")
+
+
+def test_region_split_across_chunks_is_found():
+    text = "setup\n" * 50 + "fatal: could not read from remote\n" + "noise\n" * 500
+    split = text.index("fatal") + 3
+    buffer = TraceBuffer(tail_chars=100, context_lines=1)
+    buffer.feed(text[:split])
+    buffer.feed(text[split:])
+    buffer.close()
+
+    assert buffer._regions == [["setup", "fatal: could not read from remote", "noise"]]
+    assert "fatal: could not read from remote" in buffer.render()
+
+
+def test_regions_are_capped():
+    lines = []
+    for i in range(10):
+        lines += [f"ERROR: failure {i}"] + ["ok"] * 20
+    buffer = feed_lines(TraceBuffer(tail_chars=50, max_regions=3, context_lines=1), lines, chunk_size=10)
+
+    assert len(buffer._regions) == 3
+    assert [region[-2] for region in buffer._regions] == ["ERROR: failure 0", "ERROR: failure 1", "ERROR: failure 2"]
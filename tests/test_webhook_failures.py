@@ -0,0 +1,43 @@
+import asyncio
+
+from sqlalchemy import delete, select
+
+import main
+from core.gitlab import GitLabError, gitlab_client
+from core.trace_reader import TraceBuffer
+from core.webhooks import webhook_coalescer
+from db.database import async_session_maker, init_db
+from db.models import RCAJob
+
+JOBS = [
+    {"job_id": 1, "job_name": "build", "stage": "build"},
+    {"job_id": 2, "job_name": "test", "stage": "test"},
+    {"job_id": 3, "job_name": "lint", "stage": "test"},
+]
+
+
+async def fake_stream_trace(project_id, job_id):
+    if job_id == 2:
+        raise GitLabError(404, "404 Not found")
+    trace = TraceBuffer()
+    trace.feed(f"job {job_id}\nERROR: step {job_id} failed\n")
+    return trace
+
+
+def test_missing_trace_is_left_out_and_not_remembered(monkeypatch):
+    monkeypatch.setattr(gitlab_client, "stream_trace", fake_stream_trace)
+
+    async def scenario():
+        await init_db()
+        async with async_session_maker() as db:
+            await db.execute(delete(RCAJob))
+            await db.commit()
+        await main.queue_scanned_failures("1", "100", JOBS)
+        async with async_session_maker() as db:
+            return (await db.scalars(select(RCAJob))).all()
+
+    queued = {job.payload["job_name"]: job.raw_log for job in asyncio.run(scenario())}
+    assert set(queued) == {"build", "lint"}
+    assert "step 1 failed" in queued["build"]
+    assert webhook_coalescer.seen(1) and webhook_coalescer.seen(3)
+    assert not webhook_coalescer.seen(2)